@@ -0,0 +1,75 @@
+import os
+import pytest
+
+from generators import make_photo_folder, make_tag_filenames
+from photoCleanerCore import CowPhotoOrganizer
+from photoQuality import sharpness_score
+
+# Parsing one folder's worth of names is too quick to time reliably
+PARSE_REPEATS = 20
+
+# Phone-sized originals for bench_organize_photos_downscaled, and the long edge they are capped at
+LARGE_PHOTO_COUNT = 20
+LARGE_PHOTO_SIZE = (4000, 3000)
+INGEST_LONG_EDGE = 1600
+
+
+@pytest.fixture
+def source_folder(tmp_path, bench_sizes):
+    folder = os.path.join(tmp_path, "source")
+    make_photo_folder(folder, bench_sizes['photos'])
+    return folder
+
+
+def bench_parse_cow_tag(bench, bench_sizes):
+    organizer = CowPhotoOrganizer()
+    filenames = make_tag_filenames(bench_sizes['photos'] * PARSE_REPEATS)
+
+    bench(lambda: [organizer.parse_cow_tag(filename) for filename in filenames])
+
+
+def bench_scan_photos(bench, source_folder):
+    def setup():
+        organizer = CowPhotoOrganizer()
+        organizer.source_folder = source_folder
+        return (organizer,)
+
+    bench(lambda organizer: organizer.scan_photos(), setup)
+
+
+def bench_organize_photos(bench, source_folder, tmp_path):
+    rounds = iter(range(1000))
+
+    def setup():
+        organizer = CowPhotoOrganizer()
+        organizer.source_folder = source_folder
+        organizer.destination_folder = os.path.join(tmp_path, f"destination_{next(rounds)}")
+        organizer.scan_photos()
+        return (organizer,)
+
+    organizer = bench(lambda organizer: organizer.organize_photos() or organizer, setup)
+    assert not organizer.skipped_files
+
+
+def bench_organize_photos_downscaled(bench, tmp_path):
+    source = os.path.join(tmp_path, "large_source")
+    make_photo_folder(source, LARGE_PHOTO_COUNT, size=LARGE_PHOTO_SIZE)
+    rounds = iter(range(1000))
+
+    def setup():
+        organizer = CowPhotoOrganizer(source, os.path.join(tmp_path, f"destination_{next(rounds)}"),
+                                      max_long_edge=INGEST_LONG_EDGE)
+        organizer.scan_photos()
+        return (organizer,)
+
+    organizer = bench(lambda organizer: organizer.organize_photos() or organizer, setup)
+    assert not organizer.skipped_files
+
+
+def bench_sharpness_score(bench, tmp_path):
+    folder = os.path.join(tmp_path, "large_photos")
+    paths = [os.path.join(folder, filename)
+             for filename in make_photo_folder(folder, LARGE_PHOTO_COUNT, size=LARGE_PHOTO_SIZE)]
+
+    scores = bench(lambda: [sharpness_score(path) for path in paths])
+    assert len(scores) == LARGE_PHOTO_COUNT
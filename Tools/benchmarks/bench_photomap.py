@@ -0,0 +1,146 @@
+import os
+import random
+import pytest
+
+from editJournal import EditJournal, empty_state, read_journal
+from generators import make_map_data, make_map_image, to_editor_fields
+from mapEdges import EdgeMap
+from mapGeometry import calculate_field_radius, find_field_center
+from mapRender import field_display_box, render_field_overlays, render_field_region
+from minimapBuilder import MinimapBuilder
+from pastureIndex import PastureIndex
+
+# Collar pings classified per batch in bench_locate_pastures
+PING_COUNT = 20000
+
+# Clicks snapped per round in bench_snap_points
+SNAP_COUNT = 500
+
+# Same display size cap the editor uses in update_display_image()
+EDITOR_MAX_DISPLAY_SIZE = 2048
+
+
+@pytest.fixture(scope='module')
+def map_image(bench_sizes):
+    return make_map_image(bench_sizes['map_width'], bench_sizes['map_height'])
+
+
+@pytest.fixture
+def map_data(bench_sizes):
+    return make_map_data(bench_sizes['map_width'], bench_sizes['map_height'],
+                         bench_sizes['fields'], bench_sizes['vertices'])
+
+
+@pytest.fixture
+def builder(map_image, map_data):
+    builder = MinimapBuilder()
+    builder.map_data = map_data
+    builder.original_image = map_image
+    return builder
+
+
+def bench_find_field_center(bench, map_data):
+    fields = map_data['fields']
+
+    centers = bench(lambda: [find_field_center(field['points']) for field in fields])
+    assert all(centers)
+
+
+def bench_calculate_field_radius(bench, map_data, bench_sizes):
+    fields = map_data['fields']
+    width, height = bench_sizes['map_width'], bench_sizes['map_height']
+
+    radii = bench(lambda: [calculate_field_radius(field['pinpoint'], field['points'], width, height)
+                           for field in fields])
+    assert all(radius > 0 for radius in radii)
+
+
+def bench_create_minimap(bench, builder, map_data):
+    fields = map_data['fields']
+
+    def setup():
+        # Start every round with cold overlay masks
+        builder.mask_cache.clear()
+        builder.mask_cache_bytes = 0
+        return ()
+
+    minimaps = bench(lambda: [builder.create_minimap(field) for field in fields], setup)
+    assert all(minimaps)
+
+
+def bench_create_minimap_cached_masks(bench, builder, map_data):
+    fields = map_data['fields']
+
+    minimaps = bench(lambda: [builder.create_minimap(field) for field in fields])
+    assert all(minimaps)
+
+
+def bench_redraw_fields(bench, map_image, map_data):
+    # Same base image the editor redraws onto when fully zoomed out
+    scale = min(EDITOR_MAX_DISPLAY_SIZE / map_image.width, EDITOR_MAX_DISPLAY_SIZE / map_image.height, 1.0)
+    base_image = map_image.resize((int(map_image.width * scale), int(map_image.height * scale)))
+    fields = to_editor_fields(map_data)
+
+    display_image = bench(lambda: render_field_overlays(base_image, fields, scale))
+    assert display_image.size == base_image.size
+
+
+def bench_redraw_field_region(bench, map_image, map_data):
+    # What the editor redraws after moving one pin
+    scale = min(EDITOR_MAX_DISPLAY_SIZE / map_image.width, EDITOR_MAX_DISPLAY_SIZE / map_image.height, 1.0)
+    base_image = map_image.resize((int(map_image.width * scale), int(map_image.height * scale)))
+    fields = to_editor_fields(map_data)
+    display_image = render_field_overlays(base_image, fields, scale)
+    box = field_display_box(fields[len(fields) // 2], scale)
+
+    bench(lambda: render_field_region(display_image, base_image, fields, scale, box))
+    assert display_image.size == base_image.size
+
+
+def bench_locate_pastures(bench, map_data, bench_sizes):
+    rng = random.Random(0)
+    pings = [(rng.uniform(0, bench_sizes['map_width']), rng.uniform(0, bench_sizes['map_height']))
+             for _ in range(PING_COUNT)]
+    index = PastureIndex.from_map_data(map_data)
+
+    located = bench(lambda: index.locate_many(pings))
+    assert len(located) == PING_COUNT
+
+
+def bench_edge_map(bench, map_image):
+    # Full resolution level, the slowest one to build
+    magnitude = bench(lambda: EdgeMap(map_image).magnitude(0))
+    assert magnitude.shape == (map_image.height, map_image.width)
+
+
+def bench_snap_points(bench, map_image, map_data):
+    edge_map = EdgeMap(map_image)
+    edge_map.magnitude(0)
+    clicks = [point for field in map_data['fields'] for point in field['points']][:SNAP_COUNT]
+
+    snapped = bench(lambda: [edge_map.snap(x, y, 1.0) for x, y in clicks])
+    assert len(snapped) == len(clicks)
+
+
+def bench_journal_edits(bench, map_data, tmp_path):
+    # Every click of tracing the whole map, one journal record each
+    path = os.path.join(tmp_path, "map.png.edits.jsonl")
+    fields = to_editor_fields(map_data)
+
+    def setup():
+        journal = EditJournal(path)
+        journal.start(empty_state())
+        return (journal,)
+
+    def trace(journal):
+        for field in fields:
+            journal.append('new_field', name=field['name'], color=field['color'])
+            journal.append('pin', x=field['pin_location'][0], y=field['pin_location'][1])
+            for x, y in field['points']:
+                journal.append('point', x=x, y=y)
+            journal.append('finish_field')
+        journal.close()
+
+    bench(trace, setup)
+    state, _ = read_journal(path)
+    assert len(state['fields']) == len(fields)
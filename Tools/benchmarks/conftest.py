@@ -0,0 +1,145 @@
+# Benchmark harness for the Tools package.
+#
+#   python -m pytest Tools/benchmarks                      compare against baselines.json
+#   python -m pytest Tools/benchmarks --bench-save         record new baselines
+#   python -m pytest Tools/benchmarks --bench-threshold 2  only fail on 2x slowdowns
+#
+# A slowdown also has to exceed --bench-min-slowdown (1ms) to fail, and fast
+# benchmarks are repeated for --bench-min-time, so timer noise can't fail them.
+#
+# Input sizes can be changed with --bench-photos, --bench-map-size WxH,
+# --bench-fields and --bench-vertices. Baselines are stored per size, so
+# non-default sizes are only compared against baselines saved at those sizes.
+# Baselines are machine specific: re-save them when moving to new hardware.
+
+import json
+import os
+import sys
+import time
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+BASELINES_PATH = os.path.join(BENCH_DIR, 'baselines.json')
+
+# Slowdown (vs. baseline) that fails a benchmark
+DEFAULT_THRESHOLD = 1.5
+
+# ...and it has to be at least this much slower too, so timer jitter on
+# sub-millisecond benchmarks can't fail them
+DEFAULT_MIN_SLOWDOWN_MS = 1.0
+
+# Fast benchmarks keep running rounds until this much time is spent on them,
+# the best of many short rounds is much steadier than the best of five
+DEFAULT_MIN_TIME = 0.25
+MAX_ROUNDS = 1000
+
+# Best time in seconds per benchmark key, collected over the session
+results = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', "Tools benchmarks")
+    group.addoption('--bench-save', action='store_true', help="Write this run's timings to baselines.json")
+    group.addoption('--bench-threshold', type=float, default=DEFAULT_THRESHOLD,
+                    help=f"Fail when the best time exceeds baseline by this factor (default {DEFAULT_THRESHOLD})")
+    group.addoption('--bench-min-slowdown', type=float, default=DEFAULT_MIN_SLOWDOWN_MS,
+                    help=f"Only fail when also this many ms slower than baseline (default {DEFAULT_MIN_SLOWDOWN_MS})")
+    group.addoption('--bench-rounds', type=int, default=5,
+                    help="Least timed rounds per benchmark (after one warmup)")
+    group.addoption('--bench-min-time', type=float, default=DEFAULT_MIN_TIME,
+                    help=f"Keep timing rounds until this many seconds are spent (default {DEFAULT_MIN_TIME}, "
+                         f"at most {MAX_ROUNDS} rounds)")
+    group.addoption('--bench-photos', type=int, default=500, help="Photos in the synthetic source folder")
+    group.addoption('--bench-map-size', default='4000x3000', help="Synthetic map resolution, WIDTHxHEIGHT")
+    group.addoption('--bench-fields', type=int, default=40, help="Fields in the synthetic map data")
+    group.addoption('--bench-vertices', type=int, default=60, help="Vertices per synthetic field")
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, 'r') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='session')
+def bench_sizes(request):
+    """Input sizes for this run"""
+    config = request.config
+    width, height = (int(value) for value in config.getoption('--bench-map-size').lower().split('x'))
+    return {
+        'photos': config.getoption('--bench-photos'),
+        'map_width': width,
+        'map_height': height,
+        'fields': config.getoption('--bench-fields'),
+        'vertices': config.getoption('--bench-vertices'),
+    }
+
+
+@pytest.fixture
+def bench(request, bench_sizes):
+    """Time a function and compare its best round against the stored baseline
+
+    The best (minimum) round is used rather than the mean or median, it is the
+    least affected by other load on the machine.
+
+    bench(func, setup=None) calls setup() (untimed) before every round and passes
+    its return value as func's arguments. Returns func's last result.
+
+    A benchmark fails when its best round is both threshold times and
+    min-slowdown ms slower than the baseline.
+    """
+    config = request.config
+    rounds = config.getoption('--bench-rounds')
+    min_time = config.getoption('--bench-min-time')
+    threshold = config.getoption('--bench-threshold')
+    min_slowdown = config.getoption('--bench-min-slowdown') / 1000
+    sizes_key = ",".join(f"{name}={value}" for name, value in sorted(bench_sizes.items()))
+    key = f"{request.node.name}[{sizes_key}]"
+
+    def run(func, setup=None):
+        timings = []
+        result = None
+
+        # The first round is a warmup and is not counted
+        while len(timings) <= rounds or (sum(timings[1:]) < min_time and len(timings) <= MAX_ROUNDS):
+            args = setup() if setup else ()
+            start = time.perf_counter()
+            result = func(*args)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings[1:])
+        results[key] = best
+
+        baseline = load_baselines().get(key)
+        if (baseline and not config.getoption('--bench-save')
+                and best > max(baseline * threshold, baseline + min_slowdown)):
+            pytest.fail(f"{key}: {best * 1000:.2f}ms is more than {threshold}x (and {min_slowdown * 1000:g}ms "
+                        f"over) the {baseline * 1000:.2f}ms baseline")
+        return result
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not results:
+        return
+
+    baselines = load_baselines()
+    terminalreporter.section("benchmarks")
+    for key, best in sorted(results.items()):
+        baseline = baselines.get(key)
+        ratio = f"{best / baseline:6.2f}x baseline" if baseline else "  no baseline"
+        terminalreporter.write_line(f"{best * 1000:10.2f}ms  {ratio}  {key}")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not results or not session.config.getoption('--bench-save'):
+        return
+
+    baselines = load_baselines()
+    baselines.update(results)
+    with open(BASELINES_PATH, 'w') as f:
+        json.dump(dict(sorted(baselines.items())), f, indent=2)
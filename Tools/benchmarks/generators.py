@@ -0,0 +1,120 @@
+# Synthetic inputs for the Tools benchmarks. Everything is seeded so runs are reproducible.
+
+import math
+import os
+import random
+from PIL import Image
+
+# Filenames in the shapes photoCleaner sees from the phones
+TAG_FILENAME_PATTERNS = [
+    "{num}{letter} BODY.JPG",
+    "{num}{letter} HEAD.JPG",
+    "{num} BODY.jpg",
+    "{letter}{num} HEAD.jpeg",
+    "{letter}{letter}{num} PROFILE.JPG",
+    "{num}{letter} CALF.JPG",
+    "NT SPOT BODY.JPG",
+    "NT {letter}{num} HEAD.JPG",
+    "IMG_{num}{num}.JPG",
+    "UNKNOWN {num} BODY.JPG",
+    "DONKEY HEAD.JPG",
+    "GRASS LOL.JPG",
+]
+
+
+def make_tag_filenames(count, seed=0):
+    """Realistic cow photo filenames, unique within the list"""
+    rng = random.Random(seed)
+    filenames = []
+    for i in range(count):
+        pattern = rng.choice(TAG_FILENAME_PATTERNS)
+        name = pattern.format(num=rng.randint(1, 999), letter=rng.choice("ABCDEKRT"))
+        stem, extension = os.path.splitext(name)
+        # Phones add a counter when the same cow is shot twice
+        filenames.append(f"{stem} ({i}){extension}")
+    return filenames
+
+
+def make_photo_folder(folder, count, seed=0, size=(64, 48)):
+    """Folder of JPEGs (small by default) with tag filenames, returns the filenames"""
+    os.makedirs(folder, exist_ok=True)
+
+    # Every file gets the same bytes, the benchmarks care about the file handling
+    photo_path = os.path.join(folder, "_template.jpg")
+    Image.new('RGB', size, (90, 70, 50)).save(photo_path, quality=80)
+    with open(photo_path, 'rb') as f:
+        photo_bytes = f.read()
+    os.remove(photo_path)
+
+    filenames = make_tag_filenames(count, seed)
+    for filename in filenames:
+        with open(os.path.join(folder, filename), 'wb') as f:
+            f.write(photo_bytes)
+    return filenames
+
+
+def make_map_image(width, height, seed=0):
+    """Noisy green map image, noise keeps encoders and resamplers honest"""
+    noise = Image.effect_noise((width, height), 40)
+    green = Image.new('RGB', (width, height), (70, 120, 60))
+    return Image.blend(green, noise.convert('RGB'), 0.3)
+
+
+def make_field_points(center_x, center_y, radius, vertex_count, rng):
+    """Star-shaped (always simple) polygon around a center"""
+    points = []
+    for i in range(vertex_count):
+        angle = 2 * math.pi * i / vertex_count
+        distance = radius * rng.uniform(0.45, 1.0)
+        points.append([center_x + distance * math.cos(angle), center_y + distance * math.sin(angle)])
+    return points
+
+
+def make_horseshoe_points(center_x, center_y, radius, vertex_count, rng):
+    """Concave C-shaped polygon whose vertex centroid falls outside it"""
+    arc_count = max(2, vertex_count // 2)
+    outer = []
+    inner = []
+    for i in range(arc_count):
+        angle = math.radians(30 + 300 * i / (arc_count - 1))
+        outer.append([center_x + radius * math.cos(angle), center_y + radius * math.sin(angle)])
+        inner.append([center_x + radius * 0.5 * math.cos(angle), center_y + radius * 0.5 * math.sin(angle)])
+    return outer + inner[::-1]
+
+
+def make_map_data(width, height, field_count, vertex_count, seed=0):
+    """MapData.json contents with fields laid out on a grid over the map
+
+    Every fourth field is a horseshoe, so center finding has to fall back to its grid search.
+    """
+    rng = random.Random(seed)
+    columns = math.ceil(math.sqrt(field_count))
+    rows = math.ceil(field_count / columns)
+    cell_width = width / columns
+    cell_height = height / rows
+    radius = min(cell_width, cell_height) / 2 * 0.9
+
+    fields = []
+    for i in range(field_count):
+        center_x = (i % columns + 0.5) * cell_width
+        center_y = (i // columns + 0.5) * cell_height
+        make_points = make_horseshoe_points if i % 4 == 3 else make_field_points
+        fields.append({
+            'fieldname': f"Field {i}",
+            'color': "#%02X%02X%02X" % (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)),
+            'pinpoint': [center_x, center_y],
+            'points': make_points(center_x, center_y, radius, vertex_count, rng),
+            'radius': radius,
+        })
+
+    return {'map_size': {'width': width, 'height': height}, 'fields': fields}
+
+
+def to_editor_fields(map_data):
+    """Convert MapData fields to the editor's in-memory field shape"""
+    return [{
+        'name': field['fieldname'],
+        'color': field['color'],
+        'pin_location': field['pinpoint'],
+        'points': field['points'],
+    } for field in map_data['fields']]
@@ -0,0 +1,201 @@
+# Contact sheets of the herd: the latest HEAD and BODY photo of every cow, a page
+# of cows at a time, so a few hundred cows can be reviewed without opening folders.
+#
+# Ex;
+#   python contactSheet.py --photos "D:/Cow Photos" --out D:/sheets
+#   python contactSheet.py --photos "D:/Cow Photos" --out D:/sheets --views HEAD --columns 10
+#
+# The latest photo of a view is picked by the DDMonYYYY date organize_photos()
+# writes into the filename (later " (n)" duplicates of the same day win). Only the
+# picked photos are opened: thumbnails are decoded in JPEG draft mode (DCT scaling,
+# 1/2-1/8 size straight out of the decoder) across a process pool, and the pages
+# are composed as the thumbnails come back.
+
+import argparse
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw
+
+from mapRender import load_label_font
+from photoCleanerCore import IMAGE_EXTENSIONS
+from photoIngest import ORIENTATION_TAG, orientation_transpose
+from photoQuality import filename_date
+
+DEFAULT_VIEWS = ('HEAD', 'BODY')
+DEFAULT_THUMB_SIZE = 240
+DEFAULT_COLUMNS = 6
+DEFAULT_ROWS = 8
+
+CELL_PADDING = 8
+LABEL_HEIGHT = 22
+BACKGROUND = (255, 255, 255)
+THUMB_BACKGROUND = (225, 225, 225)
+
+DUPLICATE_PATTERN = re.compile(r' \((\d+)\)\.[^.]+$')
+
+
+def photo_order(filename):
+    """Sort key for photos of one view, later photos sort higher"""
+    match = DUPLICATE_PATTERN.search(filename)
+    return filename_date(filename), int(match.group(1)) if match else 0
+
+
+def tag_order(tag):
+    """Sort key that puts 2A before 10A"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.findall(r'\d+|\D+', tag)]
+
+
+def latest_photos(photos_folder, views=DEFAULT_VIEWS):
+    """Latest photo of each view per cow, {tag: {view: path}} for cows with at least one"""
+    latest = {}
+    for entry in sorted(os.scandir(photos_folder), key=lambda entry: entry.name):
+        if not entry.is_dir():
+            continue
+
+        newest = {}
+        for filename in os.listdir(entry.path):
+            if not any(filename.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
+                continue
+            order = photo_order(filename)
+            if order[0] is None:
+                continue
+            for view in views:
+                if f" {view} " in filename.upper() and (view not in newest or order > newest[view][0]):
+                    newest[view] = (order, filename)
+
+        if newest:
+            latest[entry.name] = {view: os.path.join(entry.path, filename) for view, (_, filename) in newest.items()}
+    return latest
+
+
+def make_thumbnail(file_path, size):
+    """Upright thumbnail of a photo fitting in size x size, or None if it can't be read"""
+    try:
+        with Image.open(file_path) as image:
+            transpose = orientation_transpose(image.getexif().get(ORIENTATION_TAG))
+            image.draft('RGB', (size, size))
+            thumbnail = image.convert('RGB')
+            thumbnail.thumbnail((size, size), Image.Resampling.BILINEAR)
+            if transpose is not None:
+                thumbnail = thumbnail.transpose(transpose)
+            return thumbnail
+    except Exception as e:
+        print(f"Could not read {file_path}: {e}")
+        return None
+
+
+class ContactSheetBuilder:
+    def __init__(self, views=DEFAULT_VIEWS, thumb_size=DEFAULT_THUMB_SIZE, columns=DEFAULT_COLUMNS,
+                 rows=DEFAULT_ROWS, workers=None):
+        self.views = views
+        self.thumb_size = thumb_size
+        self.columns = columns
+        self.rows = rows
+        self.workers = workers
+        self.font = load_label_font(14)
+
+        self.cell_width = len(views) * (thumb_size + CELL_PADDING) + CELL_PADDING
+        self.cell_height = LABEL_HEIGHT + thumb_size + CELL_PADDING
+
+    def new_page(self):
+        return Image.new('RGB', (self.columns * self.cell_width, self.rows * self.cell_height), BACKGROUND)
+
+    def thumb_origin(self, slot, view_index):
+        """Top left of a thumbnail box on its page"""
+        row, column = divmod(slot, self.columns)
+        return (column * self.cell_width + CELL_PADDING + view_index * (self.thumb_size + CELL_PADDING),
+                row * self.cell_height + LABEL_HEIGHT)
+
+    def draw_cell(self, page, slot, tag, photos):
+        """Tag label and empty thumbnail boxes, missing views are marked"""
+        draw = ImageDraw.Draw(page)
+        row, column = divmod(slot, self.columns)
+        draw.text((column * self.cell_width + CELL_PADDING, row * self.cell_height + 4), tag, fill='black',
+                  font=self.font)
+        for view_index, view in enumerate(self.views):
+            x, y = self.thumb_origin(slot, view_index)
+            draw.rectangle([x, y, x + self.thumb_size - 1, y + self.thumb_size - 1], fill=THUMB_BACKGROUND)
+            if view not in photos:
+                draw.text((x + 6, y + 6), f"no {view}", fill='gray', font=self.font)
+
+    def paste_thumbnail(self, page, slot, view_index, thumbnail):
+        """Center a thumbnail in its box"""
+        x, y = self.thumb_origin(slot, view_index)
+        page.paste(thumbnail, (x + (self.thumb_size - thumbnail.width) // 2,
+                               y + (self.thumb_size - thumbnail.height) // 2))
+
+    def build(self, latest, output_folder, quality=85):
+        """Write the pages for {tag: {view: path}}, returns the page paths"""
+        os.makedirs(output_folder, exist_ok=True)
+        tags = sorted(latest, key=tag_order)
+        per_page = self.columns * self.rows
+        page_paths = []
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Everything is queued at once so the workers never wait on page composing
+            futures = {}
+            for index, tag in enumerate(tags):
+                for view_index, view in enumerate(self.views):
+                    if view in latest[tag]:
+                        futures[index, view_index] = executor.submit(make_thumbnail, latest[tag][view],
+                                                                     self.thumb_size)
+
+            for page_start in range(0, len(tags), per_page):
+                page = self.new_page()
+                for index in range(page_start, min(len(tags), page_start + per_page)):
+                    slot = index - page_start
+                    self.draw_cell(page, slot, tags[index], latest[tags[index]])
+                    for view_index in range(len(self.views)):
+                        future = futures.pop((index, view_index), None)
+                        thumbnail = future.result() if future else None
+                        if thumbnail is not None:
+                            self.paste_thumbnail(page, slot, view_index, thumbnail)
+
+                if page_start + per_page >= len(tags):
+                    # Don't leave empty rows on the last page
+                    used_rows = -(-(len(tags) - page_start) // self.columns)
+                    page = page.crop((0, 0, page.width, used_rows * self.cell_height))
+
+                page_path = os.path.join(output_folder, f"contact_sheet_{len(page_paths) + 1:02d}.jpg")
+                page.save(page_path, 'JPEG', quality=quality, optimize=True)
+                page_paths.append(page_path)
+                print(f"Saved {page_path}")
+
+        return page_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contact sheets of the latest photos of every cow")
+    parser.add_argument('--photos', required=True, help="Cow Photos folder (one subfolder per cow)")
+    parser.add_argument('--out', required=True, help="Folder to write the pages to")
+    parser.add_argument('--views', nargs='+', default=list(DEFAULT_VIEWS), type=str.upper,
+                        help="Photo views to show per cow (default: HEAD BODY)")
+    parser.add_argument('--thumb', type=int, default=DEFAULT_THUMB_SIZE,
+                        help=f"Thumbnail size in pixels (default {DEFAULT_THUMB_SIZE})")
+    parser.add_argument('--columns', type=int, default=DEFAULT_COLUMNS,
+                        help=f"Cows per row (default {DEFAULT_COLUMNS})")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help=f"Rows per page (default {DEFAULT_ROWS})")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--quality', type=int, default=85, help="JPEG quality of the pages (default 85)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.photos):
+        print(f"Error: {args.photos} is not a folder", file=sys.stderr)
+        return 1
+
+    latest = latest_photos(args.photos, tuple(args.views))
+    if not latest:
+        print(f"No dated {'/'.join(args.views)} photos found in {args.photos}")
+        return 1
+
+    builder = ContactSheetBuilder(tuple(args.views), args.thumb, args.columns, args.rows, args.workers)
+    page_paths = builder.build(latest, args.out, args.quality)
+    print(f"{len(latest)} cows on {len(page_paths)} pages")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
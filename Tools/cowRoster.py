@@ -0,0 +1,176 @@
+# Herd roster for resolving mistyped cow tags in photo names.
+#
+# Tags come from the CowTag column of the sheet exports (Sheet Templates/*instance.json,
+# a list of records) and from existing cow photo folders. They are compared uppercase
+# with only letters, digits and slashes, so "24-6" and "246" are the same tag but
+# "24/6" is a different cow. Folder names keep the roster's spelling and use the
+# server's convention for slashes ("24/6" -> "24_s_6", like remCowtagSlash).
+#
+# Two roster tags with the same comparison form (say "24a" and "24A") are a
+# collision: it is reported, and the tag is never resolved automatically.
+#
+# Lookups go through a BK-tree on Levenshtein distance: a search for tags within
+# distance d only visits subtrees whose distance to their parent is within d of the
+# query's, so it touches a small part of even a large roster.
+#
+# A tag resolves automatically when it is on the roster, or when exactly one roster
+# tag is closest and within max_distance. Ties and short tags are left for a person.
+
+import glob
+import json
+import os
+import re
+
+# Furthest (in edits) a tag can be from a roster tag and still be resolved to it
+DEFAULT_MAX_DISTANCE = 1
+
+# Shorter tags are only resolved on an exact match, one edit is too much of them
+MIN_FUZZY_LENGTH = 3
+
+# Tags that mean there is no tag, never resolved to a cow
+SPECIAL_TAGS = ('NT', 'UNKNOWN')
+
+ROSTER_TAG_COLUMN = 'CowTag'
+
+
+def tag_key(tag):
+    """Comparison form of a tag: uppercase letters, digits and slashes only"""
+    return re.sub(r'[^A-Z0-9/]', '', str(tag).replace('_s_', '/').upper())
+
+
+def folder_tag(tag):
+    """Cow photo folder name for a roster tag, like remCowtagSlash in api/local.js"""
+    return str(tag).strip().replace('/', '_s_')
+
+
+def levenshtein(a, b):
+    """Edit distance between two strings"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Strings indexed by Levenshtein distance"""
+    def __init__(self):
+        self.root = None  # (word, {distance: child node})
+        self.size = 0
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+
+        node = self.root
+        while True:
+            distance = levenshtein(word, node[0])
+            if distance == 0:
+                return
+            if distance not in node[1]:
+                node[1][distance] = (word, {})
+                self.size += 1
+                return
+            node = node[1][distance]
+
+    def search(self, word, max_distance):
+        """Words within max_distance of word as (distance, word), closest first"""
+        if self.root is None:
+            return []
+
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            distance = levenshtein(word, node_word)
+            if distance <= max_distance:
+                matches.append((distance, node_word))
+            # Triangle inequality: only children at parent distance +- max_distance can match
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(matches)
+
+
+class CowRoster:
+    def __init__(self, tags=(), max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.tree = BKTree()
+        self.folders = {}  # tag key -> folder name
+        self.collisions = {}  # tag key -> every folder name that has it
+        self.add_tags(tags)
+
+    @classmethod
+    def from_folder(cls, sheets_folder, photos_folder=None, max_distance=DEFAULT_MAX_DISTANCE):
+        """Roster from the sheet exports in a folder, plus the existing cow photo folders"""
+        roster = cls(max_distance=max_distance)
+        for path in sorted(glob.glob(os.path.join(sheets_folder, '*instance.json'))):
+            roster.add_tags(read_roster_tags(path))
+        if photos_folder and os.path.isdir(photos_folder):
+            roster.add_tags(entry.name.replace('_s_', '/') for entry in os.scandir(photos_folder) if entry.is_dir())
+        return roster
+
+    def add_tags(self, tags):
+        for tag in tags:
+            key = tag_key(tag)
+            if not key or key in SPECIAL_TAGS:
+                continue
+            folder = folder_tag(tag)
+            if key not in self.folders:
+                self.folders[key] = folder
+                self.tree.add(key)
+            elif folder != self.folders[key]:
+                # Two different cows would share the key, don't guess between them
+                names = self.collisions.setdefault(key, [self.folders[key]])
+                if folder not in names:
+                    names.append(folder)
+                    print(f"Roster tags {', '.join(names)} look alike, photos of them won't be resolved automatically")
+
+    def __len__(self):
+        return len(self.folders)
+
+    def __contains__(self, tag):
+        return tag_key(tag) in self.folders
+
+    def resolve(self, tag):
+        """Roster folder name for a parsed tag and its distance, (None, None) when unsure"""
+        key = tag_key(tag)
+        if not key or key in SPECIAL_TAGS or key in self.collisions:
+            return None, None
+        if key in self.folders:
+            return self.folders[key], 0
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None, None
+
+        matches = self.tree.search(key, self.max_distance)
+        # Only confident when the closest match is unique
+        if not matches or (len(matches) > 1 and matches[1][0] == matches[0][0]):
+            return None, None
+        distance, match = matches[0]
+        if match in self.collisions:
+            return None, None
+        return self.folders[match], distance
+
+    def suggestions(self, tag, max_distance=2, limit=3):
+        """Closest roster folder names for a tag a person has to decide on"""
+        key = tag_key(tag)
+        if not key or key in SPECIAL_TAGS:
+            return []
+        names = []
+        for _, match in self.tree.search(key, max_distance):
+            names.extend(self.collisions.get(match, [self.folders[match]]))
+        return names[:limit]
+
+
+def read_roster_tags(file_path):
+    """CowTag values of a sheet export (a list of records)"""
+    with open(file_path, 'r') as f:
+        records = json.load(f)
+    return [record[ROSTER_TAG_COLUMN] for record in records
+            if isinstance(record, dict) and record.get(ROSTER_TAG_COLUMN)]
@@ -0,0 +1,49 @@
+# Undo/redo history for the map editor.
+#
+# Every edit is stored as a pair of editJournal records, the edit and its inverse:
+#
+#   {"op": "point", "x": 790.0, "y": 388.25}   /  {"op": "undo_point"}
+#   {"op": "move_pin", "index": 3, ...new}     /  {"op": "move_pin", "index": 3, ...old}
+#   {"op": "delete_field", "index": 3}         /  {"op": "insert_field", "index": 3, "field": {...}}
+#
+# Only a deletion keeps a whole field (it has to come back on undo), everything
+# else is a few numbers, so thousands of edits take next to no memory. Undo and
+# redo apply records the same way as new edits, which also puts them in the journal.
+
+from collections import deque
+
+# Oldest edits are dropped beyond this many
+HISTORY_LIMIT = 10000
+
+
+class EditHistory:
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+
+    def record(self, edit, inverse):
+        """Remember a new edit, which ends whatever could be redone"""
+        self.undo_stack.append((edit, inverse))
+        self.redo_stack.clear()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        """Record that undoes the last edit"""
+        edit, inverse = self.undo_stack.pop()
+        self.redo_stack.append((edit, inverse))
+        return inverse
+
+    def redo(self):
+        """Record that makes the last undone edit again"""
+        edit, inverse = self.redo_stack.pop()
+        self.undo_stack.append((edit, inverse))
+        return edit
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
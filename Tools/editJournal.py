@@ -0,0 +1,139 @@
+# Append-only journal of map editor edits, so a crash doesn't lose unsaved tracing.
+#
+# The journal lives next to the map image (<image>.edits.jsonl) and holds one JSON
+# record per line. The first record is the editor state when the journal was started,
+# every edit after it is a small delta:
+#
+#   {"op": "begin", "state": {...}}                    fields, field in progress, georef
+#   {"op": "new_field", "name": "North", "color": "#FF0000"}
+#   {"op": "pin", "x": 812.5, "y": 410.0}             pin of the field in progress
+#   {"op": "point", "x": 790.0, "y": 388.25}          boundary point of the field in progress
+#   {"op": "undo_point"}
+#   {"op": "finish_field"}
+#   {"op": "move_pin", "index": 3, "x": 100.0, "y": 220.0}
+#   {"op": "add_fields", "fields": [...]}             imported boundaries
+#   {"op": "georef", "control_points": [...], "georef": {...}, "meters_per_pixel": 0.42}
+#
+# and the inverses the editor's undo uses: cancel_field, unpin, unfinish_field (the
+# last field goes back to being in progress), remove_fields {"count"},
+# delete_field {"index"} and insert_field {"index", "field"}.
+#
+# Each edit is one short write and a flush, so it is cheap enough to do on every
+# click. A crash can at worst leave a torn last line, which replay ignores. The
+# journal is compacted (rewritten as a single begin record) when it is reopened,
+# and removed once the edits are saved to MapData.
+
+import copy
+import json
+import os
+
+JOURNAL_SUFFIX = '.edits.jsonl'
+
+
+def journal_path(map_image_path):
+    return map_image_path + JOURNAL_SUFFIX
+
+
+def empty_state():
+    return {'fields': [], 'current_field': None, 'control_points': [], 'georef': None, 'meters_per_pixel': None}
+
+
+def apply_edit(state, record):
+    """Apply one journal record to an editor state dict in place"""
+    op = record['op']
+    current = state['current_field']
+
+    if op == 'new_field':
+        state['current_field'] = {'name': record['name'], 'color': record['color'], 'points': [],
+                                  'pin_location': None}
+    elif op == 'cancel_field':
+        state['current_field'] = None
+    elif op == 'pin':
+        current['pin_location'] = [record['x'], record['y']]
+    elif op == 'unpin':
+        current['pin_location'] = None
+    elif op == 'point':
+        current['points'].append([record['x'], record['y']])
+    elif op == 'undo_point':
+        current['points'].pop()
+    elif op == 'finish_field':
+        state['fields'].append(current)
+        state['current_field'] = None
+    elif op == 'unfinish_field':
+        state['current_field'] = state['fields'].pop()
+    elif op == 'move_pin':
+        # Undoing the first pin of a field loaded without one puts back None
+        pin = [record['x'], record['y']] if record['x'] is not None else None
+        state['fields'][record['index']]['pin_location'] = pin
+    elif op == 'add_fields':
+        state['fields'].extend(copy.deepcopy(record['fields']))
+    elif op == 'remove_fields':
+        del state['fields'][len(state['fields']) - record['count']:]
+    elif op == 'delete_field':
+        del state['fields'][record['index']]
+    elif op == 'insert_field':
+        state['fields'].insert(record['index'], copy.deepcopy(record['field']))
+    elif op == 'georef':
+        state['control_points'] = copy.deepcopy(record['control_points'])
+        state['georef'] = copy.deepcopy(record['georef'])
+        state['meters_per_pixel'] = record['meters_per_pixel']
+    else:
+        raise ValueError(f"Unknown journal record '{op}'")
+
+
+def read_journal(path):
+    """State and number of edits recorded in a journal, (None, 0) if there is none"""
+    if not os.path.exists(path):
+        return None, 0
+
+    state = None
+    edit_count = 0
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # Torn write from a crash, everything before it is good
+            if state is None:
+                if record.get('op') != 'begin':
+                    return None, 0
+                state = record['state']
+                continue
+            apply_edit(state, record)
+            edit_count += 1
+    return state, edit_count
+
+
+class EditJournal:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def start(self, state):
+        """Begin the journal from a state, replacing whatever it held"""
+        self.close()
+        # Write the base state to a temp file first, a crash here keeps the old journal
+        with open(self.path + '.tmp', 'w') as f:
+            f.write(json.dumps({'op': 'begin', 'state': state}) + '\n')
+        os.replace(self.path + '.tmp', self.path)
+        self.file = open(self.path, 'a')
+
+    def append(self, op, **values):
+        """Record one edit"""
+        if self.file is None:
+            return
+        values['op'] = op
+        self.file.write(json.dumps(values) + '\n')
+        # Into the OS cache is enough to survive the editor crashing
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Remove the journal once its edits are saved elsewhere"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
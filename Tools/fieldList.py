@@ -0,0 +1,102 @@
+# Scrolling list of fields (color swatch, text, optional button) for the editor's
+# legend and the viewer's field list, sized for maps with hundreds of paddocks.
+#
+# Only the rows in view have widgets. They are kept in a pool and moved and refilled
+# as the list scrolls, so replacing the rows after an edit costs the same for 10
+# fields as for 1000, and a row whose color and text didn't change isn't touched.
+
+import tkinter as tk
+from tkinter import ttk
+
+ROW_HEIGHT = 26
+
+
+def visible_range(top, height, row_height, row_count):
+    """Indices [first, last) of the rows at least partly inside a view of height from top"""
+    first = max(0, int(top // row_height))
+    last = min(row_count, int((top + height) // row_height) + 1)
+    return first, max(first, last)
+
+
+class FieldList:
+    def __init__(self, parent, row_height=ROW_HEIGHT, button_text=None, command=None):
+        """command(index) is called by a row's button, rows have no button without button_text"""
+        self.row_height = row_height
+        self.button_text = button_text
+        self.command = command
+        self.rows = []  # (color, text) per field
+        self.pool = []  # Row widgets: [canvas window, frame, swatch, label, button, index shown, row shown]
+
+        self.canvas = tk.Canvas(parent, bg='white', highlightthickness=0, yscrollincrement=row_height)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+        self.canvas.bind("<MouseWheel>", self.on_mousewheel)  # Windows
+        self.canvas.bind("<Button-4>", self.on_mousewheel)    # Linux
+        self.canvas.bind("<Button-5>", self.on_mousewheel)
+
+    def set_rows(self, rows):
+        """Show a new list of (color, text) rows, keeping the scroll position"""
+        self.rows = list(rows)
+        self.canvas.configure(scrollregion=(0, 0, 1, len(self.rows) * self.row_height))
+        self.refresh()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.canvas.yview_scroll(-1, "units")
+        else:
+            self.canvas.yview_scroll(1, "units")
+
+    def make_row(self):
+        frame = ttk.Frame(self.canvas)
+        swatch = tk.Canvas(frame, width=20, height=20, highlightthickness=0)
+        swatch.pack(side=tk.LEFT, padx=(0, 5))
+        label = ttk.Label(frame, anchor=tk.W)
+        label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        button = None
+        if self.button_text:
+            button = ttk.Button(frame, text=self.button_text)
+            button.pack(side=tk.RIGHT)
+
+        for widget in (frame, swatch, label):
+            widget.bind("<MouseWheel>", self.on_mousewheel)
+            widget.bind("<Button-4>", self.on_mousewheel)
+            widget.bind("<Button-5>", self.on_mousewheel)
+
+        window = self.canvas.create_window(0, 0, window=frame, anchor="nw", height=self.row_height - 2)
+        return [window, frame, swatch, label, button, None, None]
+
+    def refresh(self):
+        """Put the pooled row widgets on the rows in view"""
+        width = self.canvas.winfo_width()
+        first, last = visible_range(self.canvas.canvasy(0), self.canvas.winfo_height(), self.row_height,
+                                    len(self.rows))
+        while len(self.pool) < last - first:
+            self.pool.append(self.make_row())
+
+        for slot, row_widgets in enumerate(self.pool):
+            window, frame, swatch, label, button, shown_index, shown_row = row_widgets
+            index = first + slot
+            if index >= last:
+                self.canvas.itemconfigure(window, state='hidden')
+                row_widgets[5] = row_widgets[6] = None
+                continue
+
+            row = self.rows[index]
+            if index != shown_index:
+                self.canvas.coords(window, 0, index * self.row_height)
+                if button is not None:
+                    button.configure(command=lambda index=index: self.command(index))
+            if row != shown_row:
+                swatch.configure(bg=row[0])
+                label.configure(text=row[1])
+            self.canvas.itemconfigure(window, state='normal', width=width)
+            row_widgets[5] = index
+            row_widgets[6] = row
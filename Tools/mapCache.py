@@ -0,0 +1,138 @@
+# Optional on-disk cache of decoded map images.
+#
+# Decoding a large PNG/JPEG map takes seconds and holds the whole image in memory.
+# The first time a map is opened with the cache enabled, its decoded pixels are
+# written to <cache dir>/<hash>.raw (plus a small .json header), keyed by a hash of
+# the source file. Later opens memory-map that file instead of decoding, so crops
+# only touch the pages they need. Writing an entry still decodes the whole image
+# once, the cache only saves the later decodes.
+#
+# The cache is opt-in: pass a cache_dir, or set PHOTOMAP_CACHE_DIR.
+#
+# Entries are never updated, an edited map just gets a new one. To keep the folder
+# from growing forever, the least recently opened entries are deleted once it holds
+# more than PHOTOMAP_CACHE_MAX_MB (default 4096). Deleting the whole folder is
+# always safe, it's rebuilt on the next open.
+
+import hashlib
+import json
+import mmap
+import os
+from PIL import Image
+
+CACHE_DIR_ENV = 'PHOTOMAP_CACHE_DIR'
+CACHE_MAX_MB_ENV = 'PHOTOMAP_CACHE_MAX_MB'
+DEFAULT_CACHE_MAX_MB = 4096
+
+# Rows converted per step when writing a cache file, so the mode conversion
+# never needs a second full-size copy of the image
+WRITE_STRIP_HEIGHT = 512
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """Hash the contents of a file without reading it all into memory"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_mode(image):
+    """Mode to store an image in. Only L and RGBA can be memory-mapped without a copy"""
+    return 'L' if image.mode in ('1', 'L') else 'RGBA'
+
+
+def write_raw_cache(image, raw_path, header_path):
+    """Write decoded pixels and their header, strip by strip"""
+    mode = cache_mode(image)
+    width, height = image.size
+
+    # Write to temp files first so a crash never leaves a truncated cache entry
+    with open(raw_path + '.tmp', 'wb') as f:
+        for top in range(0, height, WRITE_STRIP_HEIGHT):
+            strip = image.crop((0, top, width, min(height, top + WRITE_STRIP_HEIGHT)))
+            f.write(strip.convert(mode).tobytes())
+
+    with open(header_path + '.tmp', 'w') as f:
+        json.dump({'mode': mode, 'width': width, 'height': height}, f)
+
+    os.replace(raw_path + '.tmp', raw_path)
+    os.replace(header_path + '.tmp', header_path)
+
+
+def map_raw_cache(raw_path, header_path):
+    """Wrap a cache file as a read-only image backed by a memory map"""
+    with open(header_path, 'r') as f:
+        header = json.load(f)
+
+    with open(raw_path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    size = (header['width'], header['height'])
+    return Image.frombuffer(header['mode'], size, buffer, 'raw', header['mode'], 0, 1)
+
+
+def cache_max_bytes():
+    """Size limit for the cache folder, from PHOTOMAP_CACHE_MAX_MB"""
+    return int(float(os.environ.get(CACHE_MAX_MB_ENV, DEFAULT_CACHE_MAX_MB)) * 1024 * 1024)
+
+
+def prune_cache(cache_dir, max_bytes, keep=()):
+    """Delete the least recently opened entries until the cache is under max_bytes
+
+    Entries whose key is in keep are never deleted. Returns the number of entries deleted.
+    """
+    entries = []
+    for name in os.listdir(cache_dir):
+        key, extension = os.path.splitext(name)
+        if extension != '.raw':
+            continue
+        stat = os.stat(os.path.join(cache_dir, name))
+        entries.append((stat.st_mtime, stat.st_size, key))
+
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, f"{key}.raw"))
+        except OSError:
+            # Still memory-mapped by another process on Windows, try again next time
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, f"{key}.json"))
+        except OSError:
+            pass
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def open_map_image(file_path, cache_dir=None):
+    """Open a map image, through the raw cache if one is configured
+
+    Without a cache this is just Image.open(). With one, the returned image is
+    read-only and memory-mapped; RGB sources come back as RGBA.
+    """
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return Image.open(file_path)
+
+    key = hash_file(file_path)
+    raw_path = os.path.join(cache_dir, f"{key}.raw")
+    header_path = os.path.join(cache_dir, f"{key}.json")
+
+    if os.path.exists(raw_path) and os.path.exists(header_path):
+        # Marks the entry as recently used for prune_cache
+        os.utime(raw_path)
+    else:
+        os.makedirs(cache_dir, exist_ok=True)
+        with Image.open(file_path) as image:
+            write_raw_cache(image, raw_path, header_path)
+        prune_cache(cache_dir, cache_max_bytes(), keep=(key,))
+
+    return map_raw_cache(raw_path, header_path)
@@ -0,0 +1,98 @@
+# Reading, writing and annotating MapData.json.
+#
+# Besides what the editor traces (fieldname, color, pinpoint, points, radius), each
+# field gets precomputed metrics so consumers never do geometry at request time:
+#   bbox                 [min_x, min_y, max_x, max_y] in map pixels
+#   area_px              polygon area in square pixels
+#   area_acres           only when the map scale (meters_per_pixel) is known
+#   centroid             area centroid in map pixels
+#   pinpoint_normalized  pinpoint divided by map_size, 0-1
+# and the map gets field_index, {lowercase fieldname: index into fields}.
+#
+# Maps georeferenced in the editor also carry a 'georef' entry (see mapGeoref.py).
+
+import json
+import os
+from mapGeometry import polygon_area, polygon_bbox, polygon_centroid
+
+SQUARE_METERS_PER_ACRE = 4046.8564224
+
+
+def read_map_data(file_path):
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+def write_map_data(map_data, file_path):
+    """Save map data JSON"""
+    # Write to a temp file first so the server never reads a half-written file
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(map_data, f, indent=2)
+    os.replace(temp_path, file_path)
+
+
+def annotate_map_data(map_data):
+    """Add per-field metrics and the lowercase name index, in place. Returns map_data"""
+    map_size = map_data.get('map_size') or {}
+    map_width = map_size.get('width')
+    map_height = map_size.get('height')
+    meters_per_pixel = map_data.get('meters_per_pixel')
+
+    field_index = {}
+    for i, field in enumerate(map_data.get('fields', [])):
+        points = field.get('points') or []
+        pinpoint = field.get('pinpoint')
+
+        # Stale metrics from an earlier save must not survive a boundary change
+        for key in ('bbox', 'area_px', 'area_acres', 'centroid', 'pinpoint_normalized'):
+            field.pop(key, None)
+
+        if len(points) >= 3:
+            field['bbox'] = polygon_bbox(points)
+            field['area_px'] = polygon_area(points)
+            field['centroid'] = polygon_centroid(points)
+            if meters_per_pixel:
+                field['area_acres'] = field['area_px'] * meters_per_pixel ** 2 / SQUARE_METERS_PER_ACRE
+
+        if pinpoint and map_width and map_height:
+            field['pinpoint_normalized'] = [pinpoint[0] / map_width, pinpoint[1] / map_height]
+
+        name = field.get('fieldname')
+        if name:
+            # First field wins on duplicate names, same as a linear search would
+            field_index.setdefault(name.lower(), i)
+
+    map_data['field_index'] = field_index
+    return map_data
+
+
+def rescale_map_data(map_data, factor):
+    """Rescale all pixel coordinates for the map image resized by factor, in place. Returns map_data"""
+    def scale_point(point):
+        return [point[0] * factor, point[1] * factor]
+
+    for field in map_data.get('fields', []):
+        field['points'] = [scale_point(point) for point in field.get('points') or []]
+        if field.get('pinpoint'):
+            field['pinpoint'] = scale_point(field['pinpoint'])
+        if field.get('radius'):
+            field['radius'] = field['radius'] * factor
+
+    map_size = map_data.get('map_size')
+    if map_size:
+        map_size['width'] = round(map_size['width'] * factor)
+        map_size['height'] = round(map_size['height'] * factor)
+
+    if map_data.get('meters_per_pixel'):
+        map_data['meters_per_pixel'] = map_data['meters_per_pixel'] / factor
+
+    georef = map_data.get('georef')
+    if georef:
+        from mapGeoref import GeoTransform
+
+        for point in georef.get('control_points', []):
+            point['pixel'] = scale_point(point['pixel'])
+        georef['pixel_to_lonlat'] = GeoTransform.from_georef(georef).scaled(factor).matrix.tolist()
+
+    return annotate_map_data(map_data)
@@ -0,0 +1,113 @@
+# Edge map for snapping traced points onto fence lines, tracks and field borders.
+#
+# The Sobel gradient magnitude of the grayscale map is computed with NumPy once per
+# pyramid level (level 0 is full resolution, each level halves it) and kept for
+# as long as the image is loaded. Levels are only built when first needed.
+#
+# A snap looks at a small window around the click on the level whose pixels are
+# about the size of a screen pixel. The search radius therefore stays the same on
+# screen at any zoom, and a snap only touches a few thousand values even on huge maps.
+
+import math
+import threading
+import numpy as np
+from mapProfiler import profiler, timed
+
+# Rows of the map processed at a time, bounds the float temporaries
+EDGE_STRIP_ROWS = 1024
+
+# Search radius around a click, in screen pixels
+SNAP_RADIUS = 12
+
+# Weakest gradient (Sobel magnitude of 0-255 gray) that counts as an edge
+MIN_EDGE_STRENGTH = 80
+
+# Only edges at least this fraction of the strongest one in the window are candidates
+RELATIVE_EDGE_STRENGTH = 0.5
+
+
+def sobel_magnitude(gray):
+    """Sobel gradient magnitude of a 2D uint8 array as uint16, zero on the border"""
+    height, width = gray.shape
+    magnitude = np.zeros((height, width), dtype=np.uint16)
+    if height < 3 or width < 3:
+        return magnitude
+
+    for top in range(0, height - 2, EDGE_STRIP_ROWS):
+        # Each output row needs the rows above and below it
+        strip = gray[top:min(height, top + EDGE_STRIP_ROWS + 2)].astype(np.float32)
+        above, middle, below = strip[:-2], strip[1:-1], strip[2:]
+
+        gx = (above[:, 2:] + 2 * middle[:, 2:] + below[:, 2:]) - (above[:, :-2] + 2 * middle[:, :-2] + below[:, :-2])
+        gy = (below[:, :-2] + 2 * below[:, 1:-1] + below[:, 2:]) - (above[:, :-2] + 2 * above[:, 1:-1] + above[:, 2:])
+        magnitude[top + 1:top + 1 + len(middle), 1:-1] = np.hypot(gx, gy)
+
+    return magnitude
+
+
+class EdgeMap:
+    def __init__(self, image):
+        self.image = image
+        self.gray = None
+        self.levels = {}
+        self.lock = threading.Lock()
+
+    def level_for_scale(self, image_scale):
+        """Pyramid level whose pixels are closest to (not larger than) a screen pixel"""
+        if image_scale >= 1:
+            return 0
+        return max(0, int(math.floor(math.log2(1 / image_scale))))
+
+    def magnitude(self, level):
+        """Edge magnitude array for a pyramid level, built on first use"""
+        with self.lock:
+            if level not in self.levels:
+                self.levels[level] = self.build_level(level)
+            return self.levels[level]
+
+    @timed('edge_map')
+    def build_level(self, level):
+        profiler.count('edge map levels')
+        if self.gray is None:
+            self.gray = self.image.convert('L')
+        gray = self.gray.reduce(2 ** level) if level else self.gray
+        return sobel_magnitude(np.asarray(gray))
+
+    def warm(self, image_scale):
+        """Build the level for a zoom in the background so the first snap doesn't wait"""
+        level = self.level_for_scale(image_scale)
+        if level not in self.levels:
+            threading.Thread(target=self.magnitude, args=(level,), daemon=True).start()
+
+    def snap(self, x, y, image_scale, radius=SNAP_RADIUS):
+        """Nearest strong edge to a map position within radius screen pixels, or the position itself"""
+        level = self.level_for_scale(image_scale)
+        magnitude = self.magnitude(level)
+        factor = 2 ** level
+
+        # Click and search window in level pixels
+        level_x = x / factor - 0.5
+        level_y = y / factor - 0.5
+        level_radius = max(1, int(math.ceil(radius / (image_scale * factor))))
+
+        height, width = magnitude.shape
+        left = max(0, int(level_x) - level_radius)
+        top = max(0, int(level_y) - level_radius)
+        right = min(width, int(level_x) + level_radius + 1)
+        bottom = min(height, int(level_y) + level_radius + 1)
+        if left >= right or top >= bottom:
+            return x, y
+
+        window = magnitude[top:bottom, left:right]
+        strongest = int(window.max())
+        if strongest < MIN_EDGE_STRENGTH:
+            return x, y
+
+        rows, columns = np.nonzero(window >= max(MIN_EDGE_STRENGTH, strongest * RELATIVE_EDGE_STRENGTH))
+        distances = (columns + left - level_x) ** 2 + (rows + top - level_y) ** 2
+        within = distances <= level_radius ** 2
+        if not within.any():
+            return x, y
+
+        nearest = np.argmin(np.where(within, distances, np.inf))
+        return (float((columns[nearest] + left + 0.5) * factor), float((rows[nearest] + top + 0.5) * factor))
@@ -0,0 +1,271 @@
+# Importing and exporting field boundaries as GeoJSON and KML.
+#
+# Boundaries from survey GPS or a web map come in as lon/lat, so both directions
+# go through the map's georeference (mapGeoref.py). All coordinates of a file are
+# converted with one NumPy call.
+#
+# Readers stream: GeoJSON FeatureCollections are decoded one feature at a time
+# with JSONDecoder.raw_decode over a growing read buffer, and KML is read with
+# ElementTree.iterparse, clearing every Placemark once it has been handled. A
+# whole property's boundaries never have to sit in memory as one JSON/XML tree.
+#
+# Imported:
+#   GeoJSON  Polygon and MultiPolygon (outer rings), LineString with 3+ points
+#   KML      Placemarks with a Polygon (outer boundary) or LineString
+# Names come from the name/Name/fieldname/title property (KML <name>), colors
+# from a color/fill/stroke property when it is #RRGGBB (KML LineStyle color).
+
+import json
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import escape
+
+import numpy as np
+from mapGeometry import calculate_field_radius, find_field_center
+
+# Characters read from a GeoJSON file at a time, doubled while a feature doesn't fit
+GEOJSON_READ_SIZE = 1 << 16
+
+FEATURES_PATTERN = re.compile(r'"features"\s*:\s*\[')
+NAME_PROPERTIES = ('name', 'Name', 'fieldname', 'title')
+COLOR_PROPERTIES = ('color', 'fill', 'stroke')
+COLOR_PATTERN = re.compile(r'^#[0-9A-Fa-f]{6}$')
+
+GEOJSON_EXTENSIONS = ('.geojson', '.json')
+KML_EXTENSIONS = ('.kml',)
+
+
+def iter_geojson_features(file_path):
+    """Yield the features of a GeoJSON file one at a time"""
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(GEOJSON_READ_SIZE)
+
+        # Find the start of the features array
+        match = FEATURES_PATTERN.search(buffer)
+        while not match:
+            more = f.read(GEOJSON_READ_SIZE)
+            if not more:
+                # Not a FeatureCollection, a lone Feature or geometry is small enough to load
+                data = json.loads(buffer)
+                yield data if data.get('type') == 'Feature' else {'type': 'Feature', 'properties': {}, 'geometry': data}
+                return
+            buffer += more
+            match = FEATURES_PATTERN.search(buffer)
+
+        position = match.end()
+        read_size = GEOJSON_READ_SIZE
+        while True:
+            # Skip to the next feature (or the end of the array)
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                more = f.read(read_size)
+                if not more:
+                    raise ValueError(f"{os.path.basename(file_path)} ends inside the features array")
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+
+            if buffer[position] == ']':
+                return
+
+            try:
+                feature, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Feature cut off by the end of the buffer, read more and retry
+                more = f.read(read_size)
+                if not more:
+                    raise
+                buffer = buffer[position:] + more
+                position = 0
+                read_size *= 2
+                continue
+
+            read_size = GEOJSON_READ_SIZE
+            yield feature
+
+
+def geojson_boundaries(file_path):
+    """Yield (name, color, [[lon, lat], ...]) for every boundary in a GeoJSON file"""
+    for feature in iter_geojson_features(file_path):
+        properties = feature.get('properties') or {}
+        geometry = feature.get('geometry') or {}
+        name = next((str(properties[key]) for key in NAME_PROPERTIES if properties.get(key)), None)
+        color = next((properties[key] for key in COLOR_PROPERTIES
+                      if isinstance(properties.get(key), str) and COLOR_PATTERN.match(properties[key])), None)
+
+        geometry_type = geometry.get('type')
+        coordinates = geometry.get('coordinates') or []
+        if geometry_type == 'Polygon':
+            rings = coordinates[:1]
+        elif geometry_type == 'MultiPolygon':
+            rings = [polygon[0] for polygon in coordinates if polygon]
+        elif geometry_type == 'LineString':
+            rings = [coordinates]
+        else:
+            continue
+
+        for i, ring in enumerate(rings):
+            part_name = name if i == 0 or name is None else f"{name} ({i + 1})"
+            yield part_name, color, [point[:2] for point in ring]
+
+
+def local_tag(element):
+    """Element tag without its XML namespace"""
+    return element.tag.rsplit('}', 1)[-1]
+
+
+def parse_kml_coordinates(text):
+    """'lon,lat[,alt] lon,lat[,alt] ...' -> [[lon, lat], ...]"""
+    return [[float(value) for value in point.split(',')[:2]] for point in (text or '').split()]
+
+
+def kml_boundaries(file_path):
+    """Yield (name, color, [[lon, lat], ...]) for every Placemark boundary in a KML file"""
+    for _, element in ElementTree.iterparse(file_path, events=('end',)):
+        if local_tag(element) != 'Placemark':
+            continue
+
+        name = None
+        color = None
+        rings = []
+        for child in element.iter():
+            tag = local_tag(child)
+            if tag == 'name' and name is None:
+                name = (child.text or '').strip() or None
+            elif tag == 'LineStyle':
+                for style in child:
+                    if local_tag(style) == 'color' and re.match(r'^[0-9A-Fa-f]{8}$', (style.text or '').strip()):
+                        color = hex_color_from_kml(style.text.strip())
+            elif tag in ('outerBoundaryIs', 'LineString'):
+                for coordinates in child.iter():
+                    if local_tag(coordinates) == 'coordinates':
+                        rings.append(parse_kml_coordinates(coordinates.text))
+
+        for i, ring in enumerate(rings):
+            yield (name if i == 0 or name is None else f"{name} ({i + 1})"), color, ring
+
+        # Drop the finished Placemark so the tree never grows past one of them
+        element.clear()
+
+
+def read_boundaries(file_path):
+    """Yield (name, color, lon/lat points) from a GeoJSON or KML file"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in KML_EXTENSIONS:
+        return kml_boundaries(file_path)
+    if extension in GEOJSON_EXTENSIONS:
+        return geojson_boundaries(file_path)
+    raise ValueError(f"Unsupported boundary file {os.path.basename(file_path)}, use .geojson, .json or .kml")
+
+
+def import_fields(file_path, transform, map_width, map_height):
+    """Read boundaries and map them into pixel space, returns MapData fields"""
+    boundaries = []
+    for name, color, ring in read_boundaries(file_path):
+        # GeoJSON and KML rings repeat the first point at the end
+        if len(ring) > 1 and ring[0] == ring[-1]:
+            ring = ring[:-1]
+        if len(ring) >= 3:
+            boundaries.append((name, color, ring))
+
+    if not boundaries:
+        return []
+
+    # Convert every vertex in the file at once
+    lonlats = np.concatenate([np.asarray(ring, dtype=float) for _, _, ring in boundaries])
+    pixels = transform.to_pixel(lonlats)
+    splits = np.cumsum([len(ring) for _, _, ring in boundaries])[:-1]
+
+    fields = []
+    for (name, color, _), points in zip(boundaries, np.split(pixels, splits)):
+        points = points.tolist()
+        pinpoint = find_field_center(points)
+        field = {
+            'fieldname': name or f"Imported Field {len(fields) + 1}",
+            'pinpoint': pinpoint,
+            'points': points,
+            'radius': calculate_field_radius(pinpoint, points, map_width, map_height),
+        }
+        if color:
+            field['color'] = color
+        fields.append(field)
+
+    return fields
+
+
+def field_rings_lonlat(fields, transform):
+    """Closed lon/lat rings for fields with 3+ points, one NumPy call for all of them"""
+    fields = [field for field in fields if len(field.get('points') or []) >= 3]
+    if not fields:
+        return [], []
+
+    lonlats = transform.to_lonlat(np.concatenate([np.asarray(field['points'], dtype=float) for field in fields]))
+    splits = np.cumsum([len(field['points']) for field in fields])[:-1]
+    rings = [ring.tolist() + ring[:1].tolist() for ring in np.split(lonlats, splits)]
+    return fields, rings
+
+
+def write_geojson(fields, transform, file_path):
+    """Write fields as a GeoJSON FeatureCollection, one feature per line"""
+    fields, rings = field_rings_lonlat(fields, transform)
+    pinpoints = transform.to_lonlat([field.get('pinpoint') or field['points'][0] for field in fields]).tolist()
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        for i, (field, ring, pinpoint) in enumerate(zip(fields, rings, pinpoints)):
+            properties = {'name': field.get('fieldname', 'Unnamed Field'), 'pinpoint': pinpoint}
+            for key in ('color', 'area_acres'):
+                if field.get(key) is not None:
+                    properties[key] = field[key]
+            feature = {'type': 'Feature', 'properties': properties,
+                       'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+            f.write(('' if i == 0 else ',\n') + json.dumps(feature))
+        f.write('\n]}\n')
+
+    return len(fields)
+
+
+def kml_color(hex_color):
+    """#RRGGBB -> KML bbggrr, the caller prefixes the alpha"""
+    red, green, blue = hex_color[1:3], hex_color[3:5], hex_color[5:7]
+    return f"{blue}{green}{red}".lower()
+
+
+def hex_color_from_kml(kml_color_text):
+    """KML aabbggrr -> #RRGGBB, alpha dropped"""
+    blue, green, red = kml_color_text[2:4], kml_color_text[4:6], kml_color_text[6:8]
+    return f"#{red}{green}{blue}".upper()
+
+
+def write_kml(fields, transform, file_path):
+    """Write fields as KML Placemarks with their colors"""
+    fields, rings = field_rings_lonlat(fields, transform)
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n')
+        for field, ring in zip(fields, rings):
+            color = field.get('color')
+            f.write(f"<Placemark>\n<name>{escape(field.get('fieldname', 'Unnamed Field'))}</name>\n")
+            if color and COLOR_PATTERN.match(color):
+                f.write(f"<Style><LineStyle><color>ff{kml_color(color)}</color><width>2</width></LineStyle>"
+                        f"<PolyStyle><color>4c{kml_color(color)}</color></PolyStyle></Style>\n")
+            coordinates = ' '.join(f"{lon:.8f},{lat:.8f}" for lon, lat in ring)
+            f.write("<Polygon><outerBoundaryIs><LinearRing><coordinates>"
+                    f"{coordinates}</coordinates></LinearRing></outerBoundaryIs></Polygon>\n</Placemark>\n")
+        f.write('</Document>\n</kml>\n')
+
+    return len(fields)
+
+
+def export_fields(fields, transform, file_path):
+    """Write MapData fields to a GeoJSON or KML file (by extension), returns the number written"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in KML_EXTENSIONS:
+        return write_kml(fields, transform, file_path)
+    if extension in GEOJSON_EXTENSIONS:
+        return write_geojson(fields, transform, file_path)
+    raise ValueError(f"Unsupported boundary file {os.path.basename(file_path)}, use .geojson, .json or .kml")
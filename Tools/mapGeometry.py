@@ -0,0 +1,171 @@
+# Polygon geometry shared by the map tools. Points are [x, y] in map image pixels
+# and polygons are lists of points (implicitly closed).
+#
+# Pure Python with no imaging or GUI imports, so it is cheap to import anywhere.
+
+import math
+
+
+def find_field_center(field_points):
+    """Find the optimal center point of a field using geometric analysis"""
+    if len(field_points) < 3:
+        return None
+
+    # Calculate centroid as starting point
+    centroid_x = sum(p[0] for p in field_points) / len(field_points)
+    centroid_y = sum(p[1] for p in field_points) / len(field_points)
+
+    # Check if centroid is inside the polygon
+    if point_in_polygon([centroid_x, centroid_y], field_points):
+        return [centroid_x, centroid_y]
+
+    # If centroid is outside, find the point inside the polygon that's closest to centroid
+    # Use a grid search approach
+    min_x = min(p[0] for p in field_points)
+    max_x = max(p[0] for p in field_points)
+    min_y = min(p[1] for p in field_points)
+    max_y = max(p[1] for p in field_points)
+
+    best_point = None
+    best_score = float('-inf')
+
+    # Grid resolution
+    steps = 20
+    step_x = (max_x - min_x) / steps
+    step_y = (max_y - min_y) / steps
+
+    for i in range(steps + 1):
+        for j in range(steps + 1):
+            test_x = min_x + i * step_x
+            test_y = min_y + j * step_y
+            test_point = [test_x, test_y]
+
+            if point_in_polygon(test_point, field_points):
+                # Score based on minimum distance to edges (more central = higher score)
+                min_dist = min_distance_to_edges(test_point, field_points)
+                if min_dist > best_score:
+                    best_score = min_dist
+                    best_point = test_point
+
+    return best_point if best_point else [centroid_x, centroid_y]
+
+
+def point_in_polygon(point, polygon_points):
+    """Check if a point is inside a polygon using ray casting"""
+    x, y = point
+    n = len(polygon_points)
+    inside = False
+
+    p1x, p1y = polygon_points[0]
+    for i in range(1, n + 1):
+        p2x, p2y = polygon_points[i % n]
+        if y > min(p1y, p2y):
+            if y <= max(p1y, p2y):
+                if x <= max(p1x, p2x):
+                    if p1y != p2y:
+                        xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+                    if p1x == p2x or x <= xinters:
+                        inside = not inside
+        p1x, p1y = p2x, p2y
+
+    return inside
+
+
+def min_distance_to_edges(point, polygon_points):
+    """Calculate minimum distance from point to polygon edges"""
+    min_dist = float('inf')
+    px, py = point
+
+    for i in range(len(polygon_points)):
+        x1, y1 = polygon_points[i]
+        x2, y2 = polygon_points[(i + 1) % len(polygon_points)]
+
+        # Distance from point to line segment
+        A = px - x1
+        B = py - y1
+        C = x2 - x1
+        D = y2 - y1
+
+        dot = A * C + B * D
+        len_sq = C * C + D * D
+
+        if len_sq == 0:
+            # Degenerate line segment
+            dist = math.sqrt(A * A + B * B)
+        else:
+            param = dot / len_sq
+
+            if param < 0:
+                xx = x1
+                yy = y1
+            elif param > 1:
+                xx = x2
+                yy = y2
+            else:
+                xx = x1 + param * C
+                yy = y1 + param * D
+
+            dx = px - xx
+            dy = py - yy
+            dist = math.sqrt(dx * dx + dy * dy)
+
+        min_dist = min(min_dist, dist)
+
+    return min_dist
+
+
+def calculate_field_radius(pinpoint, field_points, map_width, map_height):
+    """Radius for a minimap centered on the pin that shows the whole field"""
+    map_max_size = max(map_width, map_height)
+    if not pinpoint or not field_points or len(field_points) < 3:
+        # Default radius if no valid field
+        return map_max_size / 20
+
+    # The point of a polygon furthest from any spot is one of its vertices
+    pin_x, pin_y = pinpoint
+    max_distance = math.sqrt(max((x - pin_x) ** 2 + (y - pin_y) ** 2 for x, y in field_points))
+
+    # Tiny fields get the default view instead of a minimap of a few pixels
+    if max_distance < map_max_size / 100:
+        return map_max_size / 20
+
+    # Add 10% buffer to the maximum distance
+    return max_distance * 1.1
+
+
+def polygon_bbox(polygon_points):
+    """Bounding box [min_x, min_y, max_x, max_y]"""
+    xs = [p[0] for p in polygon_points]
+    ys = [p[1] for p in polygon_points]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def polygon_area(polygon_points):
+    """Area of a simple polygon (shoelace formula)"""
+    n = len(polygon_points)
+    twice_area = 0.0
+    for i in range(n):
+        x1, y1 = polygon_points[i]
+        x2, y2 = polygon_points[(i + 1) % n]
+        twice_area += x1 * y2 - x2 * y1
+    return abs(twice_area) / 2
+
+
+def polygon_centroid(polygon_points):
+    """Area centroid of a simple polygon, falling back to the vertex average if it has no area"""
+    n = len(polygon_points)
+    twice_area = 0.0
+    cx = 0.0
+    cy = 0.0
+    for i in range(n):
+        x1, y1 = polygon_points[i]
+        x2, y2 = polygon_points[(i + 1) % n]
+        cross = x1 * y2 - x2 * y1
+        twice_area += cross
+        cx += (x1 + x2) * cross
+        cy += (y1 + y2) * cross
+
+    if abs(twice_area) < 1e-9:
+        return [sum(p[0] for p in polygon_points) / n, sum(p[1] for p in polygon_points) / n]
+
+    return [cx / (3 * twice_area), cy / (3 * twice_area)]
@@ -0,0 +1,149 @@
+# Georeferencing: converting between map pixels and longitude/latitude.
+#
+# Control points pair a map pixel with the lon/lat of the same spot (read off a GPS
+# or a web map). From 3 or more points an affine transform is fitted by least
+# squares. From 4 or more a projective transform (homography, normalised DLT) can be
+# fitted instead, which also handles maps that were photographed at an angle.
+#
+# Stored in MapData as
+#   "georef": {
+#     "kind": "affine" | "projective",
+#     "control_points": [{"pixel": [x, y], "lonlat": [lon, lat]}, ...],
+#     "pixel_to_lonlat": [[a, b, c], [d, e, f], [g, h, i]],
+#     "rms_error_m": fit error at the control points, in meters
+#   }
+# Pixels are in the original map image. Lon/lat are WGS84 degrees in GeoJSON order.
+# A ranch is small enough that treating degrees as a plane is far below tracing accuracy.
+
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+# Control points needed to solve each kind of transform
+MIN_CONTROL_POINTS = {'affine': 3, 'projective': 4}
+
+
+def normalizing_matrix(points):
+    """Similarity transform moving points to their centroid with mean distance sqrt(2)"""
+    center = points.mean(axis=0)
+    mean_distance = np.sqrt(((points - center) ** 2).sum(axis=1)).mean()
+    scale = math.sqrt(2) / mean_distance if mean_distance > 0 else 1.0
+    return np.array([[scale, 0, -scale * center[0]],
+                     [0, scale, -scale * center[1]],
+                     [0, 0, 1]])
+
+
+def apply_matrix(matrix, points):
+    """Apply a 3x3 homogeneous transform to an (N, 2) array"""
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    transformed = points @ matrix[:2, :2].T + matrix[:2, 2]
+    w = points @ matrix[2, :2] + matrix[2, 2]
+    return transformed / w[:, None]
+
+
+def ground_distance_m(lonlat_a, lonlat_b):
+    """Distance in meters between lon/lat arrays (equirectangular, fine at ranch scale)"""
+    lonlat_a = np.asarray(lonlat_a, dtype=float).reshape(-1, 2)
+    lonlat_b = np.asarray(lonlat_b, dtype=float).reshape(-1, 2)
+    mean_lat = np.radians((lonlat_a[:, 1] + lonlat_b[:, 1]) / 2)
+    dx = np.radians(lonlat_b[:, 0] - lonlat_a[:, 0]) * np.cos(mean_lat)
+    dy = np.radians(lonlat_b[:, 1] - lonlat_a[:, 1])
+    return EARTH_RADIUS_M * np.sqrt(dx ** 2 + dy ** 2)
+
+
+class GeoTransform:
+    def __init__(self, matrix, kind='affine'):
+        self.matrix = np.asarray(matrix, dtype=float).reshape(3, 3)
+        self.inverse = np.linalg.inv(self.matrix)
+        self.kind = kind
+
+    @classmethod
+    def from_control_points(cls, pixels, lonlats, kind='affine'):
+        """Fit a pixel -> lon/lat transform to matching control points"""
+        if kind not in MIN_CONTROL_POINTS:
+            raise ValueError(f"Unknown transform {kind}, choose from {', '.join(MIN_CONTROL_POINTS)}")
+
+        pixels = np.asarray(pixels, dtype=float).reshape(-1, 2)
+        lonlats = np.asarray(lonlats, dtype=float).reshape(-1, 2)
+        if len(pixels) != len(lonlats):
+            raise ValueError("Every control point needs both a pixel and a lon/lat")
+        if len(pixels) < MIN_CONTROL_POINTS[kind]:
+            raise ValueError(f"The {kind} transform needs at least {MIN_CONTROL_POINTS[kind]} control points")
+
+        # Solve in normalised coordinates, pixels in the thousands and degrees near
+        # +-100 otherwise make the system badly conditioned
+        pixel_norm = normalizing_matrix(pixels)
+        lonlat_norm = normalizing_matrix(lonlats)
+        source = apply_matrix(pixel_norm, pixels)
+        target = apply_matrix(lonlat_norm, lonlats)
+
+        if kind == 'affine':
+            design = np.column_stack([source, np.ones(len(source))])
+            coefficients, _, rank, _ = np.linalg.lstsq(design, target, rcond=None)
+            if rank < 3:
+                raise ValueError("Control points must not all lie on one line")
+            normalized = np.vstack([coefficients.T, [0, 0, 1]])
+        else:
+            rows = []
+            for (x, y), (u, v) in zip(source, target):
+                rows.append([-x, -y, -1, 0, 0, 0, u * x, u * y, u])
+                rows.append([0, 0, 0, -x, -y, -1, v * x, v * y, v])
+            _, singular_values, vt = np.linalg.svd(np.array(rows))
+            normalized = vt[-1].reshape(3, 3)
+            if abs(normalized[2, 2]) < 1e-12 or singular_values[7] < 1e-9:
+                raise ValueError("Control points are degenerate, spread them around the map")
+
+        matrix = np.linalg.inv(lonlat_norm) @ normalized @ pixel_norm
+        return cls(matrix / matrix[2, 2], kind)
+
+    @classmethod
+    def from_georef(cls, georef):
+        return cls(georef['pixel_to_lonlat'], georef.get('kind', 'affine'))
+
+    @classmethod
+    def from_map_data(cls, map_data):
+        """Transform stored in MapData, or None if the map is not georeferenced"""
+        georef = map_data.get('georef')
+        return cls.from_georef(georef) if georef else None
+
+    def to_lonlat(self, pixels):
+        """Map pixels (N, 2) to lon/lat (N, 2)"""
+        return apply_matrix(self.matrix, pixels)
+
+    def to_pixel(self, lonlats):
+        """Lon/lat (N, 2) to map pixels (N, 2)"""
+        return apply_matrix(self.inverse, lonlats)
+
+    def scaled(self, factor):
+        """Same transform for the map image resized by factor"""
+        # New pixel = old pixel * factor, so the pixel columns of the matrix shrink by factor
+        return GeoTransform(self.matrix @ np.diag([1 / factor, 1 / factor, 1]), self.kind)
+
+    def meters_per_pixel(self, x, y):
+        """Ground size of one pixel at a map position, averaged over both axes"""
+        lonlats = self.to_lonlat([(x, y), (x + 1, y), (x, y + 1)])
+        return float(ground_distance_m(lonlats[[0, 0]], lonlats[1:]).mean())
+
+    def rms_error_m(self, pixels, lonlats):
+        """Root mean square ground distance between fitted and given lon/lat"""
+        errors = ground_distance_m(self.to_lonlat(pixels), lonlats)
+        return float(np.sqrt((errors ** 2).mean()))
+
+    def to_georef(self, control_points):
+        """MapData 'georef' entry for this transform and the control points it came from"""
+        pixels = [point['pixel'] for point in control_points]
+        lonlats = [point['lonlat'] for point in control_points]
+        return {
+            'kind': self.kind,
+            'control_points': control_points,
+            'pixel_to_lonlat': self.matrix.tolist(),
+            'rms_error_m': self.rms_error_m(pixels, lonlats),
+        }
+
+
+def solve_georef(control_points, kind='affine'):
+    """Fit a transform to [{'pixel': [x, y], 'lonlat': [lon, lat]}, ...], returns the 'georef' entry"""
+    transform = GeoTransform.from_control_points([point['pixel'] for point in control_points],
+                                                 [point['lonlat'] for point in control_points], kind)
+    return transform.to_georef(control_points)
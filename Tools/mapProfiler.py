@@ -0,0 +1,135 @@
+# Timing and counters for the map tools.
+#
+# Wrap a method with @timed('stage name') (or a block with `with profiler.stage(...)`)
+# to record call count, total/mean/max/last time. Counters track things like
+# redraws and resizes. cProfile capture can be switched on around any workload.
+# Everything is collected on the shared `profiler` instance and can be shown in
+# the debug panel (profilerPanel.py) or dumped as JSON.
+#
+# cProfile/pstats are only imported when a capture is started.
+
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Number of functions listed in the cProfile summary
+PROFILE_TOP_FUNCTIONS = 25
+
+
+class Profiler:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.profile = None
+        self.profile_text = ""
+
+    def reset(self):
+        """Clear all timings and counters"""
+        self.stages = {}
+        self.counters = {}
+        self.profile_text = ""
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of code under the given stage name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        """Add one timing sample to a stage"""
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {'calls': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0}
+
+        stats['calls'] += 1
+        stats['total'] += seconds
+        stats['last'] = seconds
+        stats['max'] = max(stats['max'], seconds)
+
+    def count(self, name, amount=1):
+        """Increment a counter"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @property
+    def profiling(self):
+        return self.profile is not None
+
+    def start_profile(self):
+        """Start capturing a cProfile of everything that runs until stop_profile()"""
+        if self.profile is None:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop_profile(self):
+        """Stop cProfile capture, returns the summary of the slowest functions"""
+        if self.profile is None:
+            return self.profile_text
+
+        import io
+        import pstats
+
+        self.profile.disable()
+        output = io.StringIO()
+        pstats.Stats(self.profile, stream=output).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        self.profile = None
+        self.profile_text = output.getvalue()
+        return self.profile_text
+
+    def to_dict(self):
+        """Timings (in milliseconds) and counters as plain data"""
+        stages = {}
+        for name, stats in sorted(self.stages.items()):
+            stages[name] = {
+                'calls': stats['calls'],
+                'total_ms': stats['total'] * 1000,
+                'mean_ms': stats['total'] * 1000 / stats['calls'],
+                'max_ms': stats['max'] * 1000,
+                'last_ms': stats['last'] * 1000,
+            }
+
+        return {
+            'stages': stages,
+            'counters': dict(sorted(self.counters.items())),
+            'profile': self.profile_text,
+        }
+
+    def dump_json(self, file_path):
+        """Write to_dict() to a JSON file"""
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary_lines(self):
+        """Human readable table of stages and counters"""
+        data = self.to_dict()
+        lines = [f"{'Stage':<28}{'Calls':>7}{'Mean ms':>10}{'Max ms':>10}{'Last ms':>10}"]
+        for name, stats in data['stages'].items():
+            lines.append(f"{name:<28}{stats['calls']:>7}{stats['mean_ms']:>10.1f}"
+                         f"{stats['max_ms']:>10.1f}{stats['last_ms']:>10.1f}")
+
+        if data['counters']:
+            lines.append("")
+            lines.append("Counters")
+            for name, value in data['counters'].items():
+                lines.append(f"  {name:<26}{value:>9}")
+
+        return lines
+
+
+# Shared instance used by all the map tools
+profiler = Profiler()
+
+
+def timed(name):
+    """Decorator that records every call of a function as a profiler stage"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
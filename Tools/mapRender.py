@@ -0,0 +1,343 @@
+# Field overlay drawing for the map editor: filled polygons, boundary points and
+# lines, pins and outlined labels, drawn onto a (display-scaled) copy of the map.
+#
+# render_map_file() draws the same overlays onto the original map at full (or any)
+# resolution, one horizontal strip at a time, for the exported map.png.
+#
+# render_field_region() redraws only the box around changed fields, for edits and
+# undo/redo in the editor.
+
+import os
+import struct
+import zlib
+from PIL import Image, ImageDraw, ImageFont
+from mapProfiler import timed
+
+# The editor shows the map at most this large when fully zoomed out. Exported maps
+# scale pins, lines and labels relative to it so they look the same at any size.
+DISPLAY_REFERENCE_SIZE = 2048
+
+# Output rows rendered at a time by render_map_file()
+STRIP_HEIGHT = 512
+
+# How far boundary points/lines and pins reach past their coordinates in the editor, in pixels
+POINT_MARGIN = 6
+PIN_MARGIN = 11
+
+_measure_draw = None
+
+
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+    
+    
+def load_label_font(font_size):
+    """Label font at the given size, falling back to PIL's default font"""
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except OSError:
+        return None
+        
+        
+def render_field_overlays(base_image, fields, image_scale, opacity=30, text_size=12, current_field=None,
+                          marker_scale=1.0):
+    """Draw fields (and the field being created) onto a copy of a map image
+    
+    base_image is the map already resized by image_scale; opacity is the fill opacity in percent.
+    marker_scale multiplies pin, point, line and label sizes (see map_marker_scale).
+    """
+    display_image = base_image.copy()
+    draw = ImageDraw.Draw(display_image, 'RGBA')
+    font = load_label_font(round(text_size * marker_scale))
+    
+    # Draw completed fields (polygons and lines first)
+    for field in fields:
+        draw_field_background(draw, field, image_scale, opacity, completed=True, marker_scale=marker_scale)
+        
+    # Draw current field being created (background)
+    if current_field:
+        draw_field_background(draw, current_field, image_scale, opacity, completed=False,
+                              marker_scale=marker_scale)
+        
+    # Draw all text and pins on top
+    for field in fields:
+        draw_field_text(draw, field, image_scale, font, marker_scale=marker_scale)
+        
+    # Draw current field text
+    if current_field:
+        draw_field_text(draw, current_field, image_scale, font, marker_scale=marker_scale)
+        
+    return display_image
+    
+    
+def map_marker_scale(width, height):
+    """Marker scale that sizes pins and labels on a width x height map as the editor shows them"""
+    return max(1.0, max(width, height) / DISPLAY_REFERENCE_SIZE)
+    
+    
+def field_display_box(field, image_scale, font=None):
+    """Box (left, top, right, bottom) around everything drawn for a field in the editor, or None"""
+    xs = [round(point[0] * image_scale) for point in field['points']]
+    ys = [round(point[1] * image_scale) for point in field['points']]
+    # Boundary points are drawn 4px out, lines 2px wide
+    boxes = []
+    if xs:
+        boxes.append((min(xs) - POINT_MARGIN, min(ys) - POINT_MARGIN, max(xs) + POINT_MARGIN, max(ys) + POINT_MARGIN))
+    
+    if field['pin_location']:
+        pin_x = round(field['pin_location'][0] * image_scale)
+        pin_y = round(field['pin_location'][1] * image_scale)
+        boxes.append((pin_x - PIN_MARGIN, pin_y - PIN_MARGIN, pin_x + PIN_MARGIN, pin_y + PIN_MARGIN))
+        
+        # Label with its 1px outline, placed like draw_field_text does
+        label = measure_draw().textbbox((pin_x + 10, pin_y - 8), field['name'], font=font)
+        boxes.append((label[0] - 2, label[1] - 2, label[2] + 2, label[3] + 2))
+        
+    if not boxes:
+        return None
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+    
+    
+def measure_draw():
+    """ImageDraw used only for measuring text"""
+    global _measure_draw
+    if _measure_draw is None:
+        _measure_draw = ImageDraw.Draw(Image.new('L', (1, 1)))
+    return _measure_draw
+    
+    
+def boxes_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+    
+    
+@timed('render_field_region')
+def render_field_region(display_image, base_image, fields, image_scale, box, opacity=30, text_size=12,
+                        current_field=None):
+    """Redraw one region of an image made by render_field_overlays, in place
+    
+    Only the fields reaching into box are drawn, in the same order as a full render,
+    so the region comes out as a full redraw would (up to the odd edge pixel, PIL's
+    polygon and line fills aren't exactly the same when shifted).
+    """
+    left = max(0, int(box[0]) - 1)
+    top = max(0, int(box[1]) - 1)
+    right = min(base_image.width, int(box[2]) + 2)
+    bottom = min(base_image.height, int(box[3]) + 2)
+    if left >= right or top >= bottom:
+        return
+        
+    region = base_image.crop((left, top, right, bottom))
+    draw = ImageDraw.Draw(region, 'RGBA')
+    font = load_label_font(text_size)
+    region_box = (left, top, right, bottom)
+    
+    def reaches_region(field):
+        field_box = field_display_box(field, image_scale, font)
+        return field_box is not None and boxes_overlap(field_box, region_box)
+        
+    visible = [field for field in fields if reaches_region(field)]
+    current = current_field if current_field and reaches_region(current_field) else None
+    
+    for field in visible:
+        draw_field_background(draw, field, image_scale, opacity, completed=True, offset=(left, top))
+    if current:
+        draw_field_background(draw, current, image_scale, opacity, completed=False, offset=(left, top))
+    for field in visible:
+        draw_field_text(draw, field, image_scale, font, offset=(left, top))
+    if current:
+        draw_field_text(draw, current, image_scale, font, offset=(left, top))
+        
+    display_image.paste(region, (left, top))
+    
+    
+def draw_field_background(draw, field, image_scale, opacity, completed=False, offset=(0, 0), marker_scale=1.0):
+    """Draw the background elements (lines, polygons, points)
+    
+    offset is subtracted from display coordinates (for drawing into a strip of a larger image);
+    marker_scale multiplies point size and line width.
+    """
+    color = field['color']
+    
+    # Convert coordinates to display coordinates using the actual image scale. Whole
+    # pixels, so a strip or region drawn with an offset matches the full image
+    def to_display_coords(point):
+        return (round(point[0] * image_scale) - offset[0], round(point[1] * image_scale) - offset[1])
+        
+    # Draw points and lines
+    if field['points']:
+        display_points = [to_display_coords(p) for p in field['points']]
+        
+        # Draw points with constant size (half of pin size)
+        point_size = 4 * marker_scale  # Constant size, half of pin size
+        for point in display_points:
+            draw.ellipse([point[0]-point_size, point[1]-point_size, 
+                        point[0]+point_size, point[1]+point_size], 
+                       fill=color, outline='black')
+                       
+        # Draw lines between points with constant width
+        line_width = max(1, round(2 * marker_scale))  # Constant line width
+        if len(display_points) > 1:
+            for i in range(len(display_points) - 1):
+                draw.line([display_points[i], display_points[i+1]], fill=color, width=line_width)
+                
+        # If completed, close the shape and fill
+        if completed and len(display_points) > 2:
+            # Close the shape
+            draw.line([display_points[-1], display_points[0]], fill=color, width=line_width)
+            
+            # Fill the polygon
+            fill_color = tuple(list(hex_to_rgb(color)) + [int(255 * (opacity / 100))])
+            draw.polygon(display_points, fill=fill_color)
+            
+            
+def draw_field_text(draw, field, image_scale, font=None, offset=(0, 0), marker_scale=1.0):
+    """Draw the text and pin elements on top"""
+    color = field['color']
+    
+    # Draw pin with constant size (as if fully zoomed out)
+    if field['pin_location']:
+        pin_x = round(field['pin_location'][0] * image_scale) - offset[0]
+        pin_y = round(field['pin_location'][1] * image_scale) - offset[1]
+        pin_size = 8 * marker_scale  # Constant size regardless of zoom
+        draw.ellipse([pin_x-pin_size, pin_y-pin_size, pin_x+pin_size, pin_y+pin_size], 
+                    fill=color, outline='black', width=max(1, round(2 * marker_scale)))
+        
+        # Draw text with black outline for better visibility
+        text_x = pin_x + pin_size + 2 * marker_scale
+        text_y = pin_y - pin_size
+        
+        # Draw black outline (multiple offset draws)
+        outline = max(1, round(marker_scale))
+        outline_offsets = [(-outline, -outline), (-outline, outline), (outline, -outline), (outline, outline),
+                           (-outline, 0), (outline, 0), (0, -outline), (0, outline)]
+        for offset_x, offset_y in outline_offsets:
+            draw.text((text_x + offset_x, text_y + offset_y), field['name'], fill='black', font=font)
+        
+        # Draw white text on top
+        draw.text((text_x, text_y), field['name'], fill='white', font=font)
+
+
+def fields_from_map_data(map_data, default_color='#FF0000'):
+    """Convert MapData.json fields to the editor's field shape used for drawing"""
+    return [{
+        'name': field_data.get('fieldname', 'Unnamed Field'),
+        'color': field_data.get('color', default_color),
+        'pin_location': field_data.get('pinpoint'),
+        'points': field_data.get('points', []),
+    } for field_data in map_data.get('fields', [])]
+
+
+def field_display_bounds(field, image_scale, margin):
+    """Vertical extent (top, bottom) of everything drawn for a field, in display pixels"""
+    ys = [point[1] for point in field['points']]
+    if field['pin_location']:
+        ys.append(field['pin_location'][1])
+    if not ys:
+        return None
+    return min(ys) * image_scale - margin, max(ys) * image_scale + margin
+
+
+class PngStripWriter:
+    """Writes an RGB PNG a strip of rows at a time, so the whole image is never in memory"""
+    def __init__(self, file_path, width, height, compress_level=6):
+        self.file = open(file_path, 'wb')
+        self.width = width
+        self.compressor = zlib.compressobj(compress_level)
+        
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bit RGB, no interlacing
+        self.write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        
+    def write_chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+        
+    def write_strip(self, strip):
+        """Append the rows of an RGB image as wide as the PNG"""
+        row_bytes = self.width * 3
+        data = strip.tobytes()
+        
+        # Every row starts with its filter type, 0 (none)
+        rows = b''.join(b'\x00' + data[i:i + row_bytes] for i in range(0, len(data), row_bytes))
+        compressed = self.compressor.compress(rows)
+        if compressed:
+            self.write_chunk(b'IDAT', compressed)
+            
+    def close(self):
+        self.write_chunk(b'IDAT', self.compressor.flush())
+        self.write_chunk(b'IEND', b'')
+        self.file.close()
+        
+    def abort(self):
+        """Close the file without finishing the PNG"""
+        self.file.close()
+
+
+@timed('render_map_file')
+def render_map_file(source_image, fields, file_path, scale=1.0, opacity=30, text_size=12,
+                    strip_height=STRIP_HEIGHT):
+    """Render a map with field overlays to a PNG, strip by strip
+    
+    source_image is the original map (ideally memory-mapped through mapCache), fields are in
+    editor shape, and scale picks the output resolution relative to the original.
+    Pins, lines and labels are sized as the editor shows them on a DISPLAY_REFERENCE_SIZE map.
+    Returns the output size.
+    """
+    source_width, source_height = source_image.size
+    width = max(1, round(source_width * scale))
+    height = max(1, round(source_height * scale))
+    
+    marker_scale = map_marker_scale(width, height)
+    font = load_label_font(round(text_size * marker_scale))
+    
+    # Generous vertical margin so pins and labels straddling a strip edge get drawn in both strips
+    margin = (8 + 2 * text_size) * marker_scale
+    bounds = [field_display_bounds(field, scale, margin) for field in fields]
+    
+    # Source rows around each strip so the resampling filter has context at strip edges
+    filter_margin = 3 / scale if scale < 1 else 1
+    
+    # Write to a temp file first so a failed render never replaces a good map
+    temp_path = file_path + '.tmp'
+    writer = PngStripWriter(temp_path, width, height)
+    try:
+        for top in range(0, height, strip_height):
+            bottom = min(height, top + strip_height)
+            
+            # Source region for this strip, cropped with a margin then resized by its exact box
+            source_top = top / scale
+            source_bottom = bottom / scale
+            crop_top = max(0, int(source_top - filter_margin))
+            crop_bottom = min(source_height, int(source_bottom + filter_margin) + 1)
+            region = source_image.crop((0, crop_top, source_width, crop_bottom)).convert('RGB')
+            
+            if scale == 1.0:
+                strip = region.crop((0, top - crop_top, width, bottom - crop_top))
+            else:
+                strip = region.resize((width, bottom - top), Image.Resampling.LANCZOS,
+                                      box=(0, source_top - crop_top, source_width, source_bottom - crop_top))
+                
+            # Draw only the fields that reach into this strip
+            visible = [field for field, field_bounds in zip(fields, bounds)
+                       if field_bounds and field_bounds[1] >= top and field_bounds[0] <= bottom]
+            if visible:
+                draw = ImageDraw.Draw(strip, 'RGBA')
+                for field in visible:
+                    draw_field_background(draw, field, scale, opacity, completed=True,
+                                          offset=(0, top), marker_scale=marker_scale)
+                for field in visible:
+                    draw_field_text(draw, field, scale, font, offset=(0, top), marker_scale=marker_scale)
+                    
+            writer.write_strip(strip)
+    except BaseException:
+        writer.abort()
+        os.remove(temp_path)
+        raise
+        
+    writer.close()
+    os.replace(temp_path, file_path)
+    return width, height
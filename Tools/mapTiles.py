@@ -0,0 +1,126 @@
+# Zoom pyramid of map tiles for the mobile client, so a phone only downloads the
+# part of the ranch map it is showing.
+#
+# Layout (XYZ, y down from the top-left corner):
+#   <out>/<z>/<x>/<y>.webp
+#   <out>/manifest.json
+#
+# The highest zoom is the map at full resolution, each lower zoom halves it, and
+# zoom 0 fits the whole map in one tile. Edge tiles are padded to the full tile
+# size (transparent for WebP, background colour for JPEG).
+#
+# Full resolution tiles are cut straight from the source image, so no full-size
+# copy of the map is made; every lower level is built from the one above it.
+
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+TILE_SIZE = 256
+
+# (file extension, PIL format, save options) per tile format
+TILE_FORMATS = {
+    'webp': ('webp', 'WEBP', {'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'optimize': True}),
+}
+
+# Padding colour for JPEG edge tiles, which have no alpha
+JPEG_BACKGROUND = (255, 255, 255)
+
+# Source rows converted to RGB per step when halving the full resolution level (even)
+HALVE_STRIP_HEIGHT = 512
+
+
+def max_zoom_for(width, height, tile_size=TILE_SIZE):
+    """Zoom level at which the map is shown at full resolution"""
+    return max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+
+def save_tile(level_image, out_dir, z, x, y, tile_size, tile_format, quality):
+    """Cut and save one tile from a pyramid level (of any mode, tiles are saved as RGB)"""
+    extension, pil_format, options = TILE_FORMATS[tile_format]
+
+    box = (x * tile_size, y * tile_size,
+           min(level_image.width, (x + 1) * tile_size), min(level_image.height, (y + 1) * tile_size))
+    tile = level_image.crop(box).convert('RGB')
+
+    # Pad edge tiles so every tile is the same size
+    if tile.size != (tile_size, tile_size):
+        if tile_format == 'jpeg':
+            padded = Image.new('RGB', (tile_size, tile_size), JPEG_BACKGROUND)
+        else:
+            padded = Image.new('RGBA', (tile_size, tile_size), (0, 0, 0, 0))
+        padded.paste(tile, (0, 0))
+        tile = padded
+
+    tile.save(os.path.join(out_dir, str(z), str(x), f"{y}.{extension}"), pil_format, quality=quality, **options)
+
+
+def halve_level(level_image):
+    """The level below as an RGB image at half the size, converted strip by strip"""
+    if level_image.mode == 'RGB':
+        return level_image.reduce(2)
+
+    half = Image.new('RGB', ((level_image.width + 1) // 2, (level_image.height + 1) // 2))
+    for top in range(0, level_image.height, HALVE_STRIP_HEIGHT):
+        strip = level_image.crop((0, top, level_image.width, min(level_image.height, top + HALVE_STRIP_HEIGHT)))
+        half.paste(strip.convert('RGB').reduce(2), (0, top // 2))
+    return half
+
+
+def export_tiles(image, out_dir, tile_format='webp', quality=75, tile_size=TILE_SIZE, min_zoom=0, workers=None):
+    """Cut a map image into a tile pyramid and write its manifest, returns the manifest
+    
+    manifest['levels'] has the size and tile columns/rows of every zoom level.
+    """
+    if tile_format not in TILE_FORMATS:
+        raise ValueError(f"Unknown tile format {tile_format}, choose from {', '.join(TILE_FORMATS)}")
+
+    width, height = image.size
+    max_zoom = max_zoom_for(width, height, tile_size)
+    min_zoom = min(min_zoom, max_zoom)
+
+    manifest = {
+        'tile_size': tile_size,
+        'format': tile_format,
+        'url_template': f"{{z}}/{{x}}/{{y}}.{TILE_FORMATS[tile_format][0]}",
+        'width': width,
+        'height': height,
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'levels': {},
+    }
+
+    # The full resolution level is the source itself, only lower levels are new images
+    level_image = image
+
+    # Encoding releases the GIL, so threads keep every core busy without copying levels between processes
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for z in range(max_zoom, min_zoom - 1, -1):
+            columns = math.ceil(level_image.width / tile_size)
+            rows = math.ceil(level_image.height / tile_size)
+            manifest['levels'][str(z)] = {
+                'width': level_image.width,
+                'height': level_image.height,
+                'columns': columns,
+                'rows': rows,
+            }
+
+            for x in range(columns):
+                os.makedirs(os.path.join(out_dir, str(z), str(x)), exist_ok=True)
+
+            jobs = [executor.submit(save_tile, level_image, out_dir, z, x, y, tile_size, tile_format, quality)
+                    for x in range(columns) for y in range(rows)]
+            for job in jobs:
+                job.result()
+
+            # Next level down is half the size, and replaces this one
+            if z > min_zoom:
+                level_image = halve_level(level_image)
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
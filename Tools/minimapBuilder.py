@@ -0,0 +1,313 @@
+# Minimap generation shared by the viewer GUI (photomapViewer.py) and the headless
+# batch jobs (photomapBatch.py). No GUI imports.
+
+from PIL import Image, ImageDraw, ImageFont
+from collections import OrderedDict
+import os
+from mapCache import open_map_image
+from mapData import annotate_map_data, read_map_data, write_map_data
+from mapGeometry import calculate_field_radius, find_field_center
+from mapProfiler import profiler, timed
+from mapRender import hex_to_rgb
+
+# Pre-encoded minimap sizes. Widths and qualities mirror SIZE_TIERS in
+# api/local.js, keep the two in sync.
+SIZE_TIERS = {
+    'thumb':  {'width': 200, 'quality': 30},
+    'medium': {'width': 400, 'quality': 50},
+    'high':   {'width': 800, 'quality': 78},
+}
+
+# Output formats for the size tiers: (file extension, PIL format, extra save options).
+# The server's image cache only holds JPEGs, the others are for serving elsewhere.
+TIER_FORMATS = {
+    'webp': ('webp', 'WEBP', {'method': 6}),
+    'jpeg': ('jpg', 'JPEG', {'optimize': True, 'progressive': True}),
+}
+
+# Folder under the server's LOCAL_PATH holding its resized images (THUMBNAIL_CACHE_DIR)
+SERVER_CACHE_FOLDER = 'image-cache'
+
+# Upper bound on memory held by cached field overlay masks (one byte per pixel)
+MASK_CACHE_BYTES = 256 * 1024 * 1024
+
+def server_cache_dir(minimaps_folder):
+    """The server's image cache for a minimaps folder at <LOCAL_PATH>/MapData/minimaps, or None"""
+    folder = os.path.abspath(minimaps_folder)
+    map_data_dir = os.path.dirname(folder)
+    if os.path.basename(folder) != 'minimaps' or os.path.basename(map_data_dir) != 'MapData':
+        return None
+    return os.path.join(os.path.dirname(map_data_dir), SERVER_CACHE_FOLDER)
+
+
+class MinimapBuilder:
+    """Map data, center regeneration and minimap generation without any GUI"""
+    def __init__(self):
+        self.map_data = None
+        self.original_image = None
+        self.minimap_images = []
+        self.mask_cache = OrderedDict()
+        self.mask_cache_bytes = 0
+        self.label_font = None
+        
+    def read_map_data(self, file_path):
+        """Load map data JSON, returns the number of fields"""
+        self.map_data = read_map_data(file_path)
+        return len(self.map_data.get('fields', []))
+        
+    def read_map_image(self, file_path, cache_dir=None):
+        """Load the map image (through the raw map cache if enabled), returns its size"""
+        self.original_image = open_map_image(file_path, cache_dir)
+        return self.original_image.size
+        
+    def write_map_data(self, file_path):
+        """Save map data JSON (including regenerated centers and radii)"""
+        write_map_data(self.map_data, file_path)
+            
+    def get_map_size(self):
+        """Map dimensions from the data, falling back to the image size"""
+        if 'map_size' in self.map_data:
+            return self.map_data['map_size']['width'], self.map_data['map_size']['height']
+        return self.original_image.size
+        
+    @timed('regenerate_centers')
+    def compute_centers(self):
+        """Regenerate optimal centers and radii for all fields, returns the number updated"""
+        if not self.map_data or not self.original_image:
+            raise ValueError("Map data and map image must both be loaded")
+            
+        map_width, map_height = self.get_map_size()
+        updated_count = 0
+        
+        for field in self.map_data.get('fields', []):
+            if not field.get('points') or len(field['points']) < 3:
+                continue
+                
+            # Find optimal center
+            new_center = find_field_center(field['points'])
+            if new_center:
+                field['pinpoint'] = new_center
+                
+                # Recalculate radius from new center
+                new_radius = calculate_field_radius(field['pinpoint'], field['points'], map_width, map_height)
+                field['radius'] = new_radius
+                
+                updated_count += 1
+                
+        annotate_map_data(self.map_data)
+        return updated_count
+        
+    @timed('generate_minimaps')
+    def build_minimaps(self):
+        """Create minimaps for every field, returns the number created"""
+        if not self.map_data or not self.original_image:
+            raise ValueError("Map data and map image must both be loaded")
+            
+        self.minimap_images = []
+        
+        for field in self.map_data.get('fields', []):
+            minimap = self.create_minimap(field)
+            if minimap:
+                self.minimap_images.append({
+                    'image': minimap,
+                    'field': field
+                })
+                
+        return len(self.minimap_images)
+        
+    def minimap_filename(self, field, index):
+        """Filename the server expects for a field's minimap (<fieldname>_minimap)"""
+        field_name = field.get('fieldname', f'field_{index}')
+        
+        # Clean filename
+        safe_name = "".join(c for c in field_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        return f"{safe_name}_minimap.png"
+        
+    @timed('write_minimaps')
+    def write_minimaps(self, folder_path):
+        """Save all generated minimaps to a folder, returns the number saved"""
+        os.makedirs(folder_path, exist_ok=True)
+        
+        saved_count = 0
+        for i, minimap_data in enumerate(self.minimap_images):
+            filepath = os.path.join(folder_path, self.minimap_filename(minimap_data['field'], i))
+            minimap_data['image'].save(filepath)
+            saved_count += 1
+            
+        return saved_count
+        
+    @timed('write_minimap_tiers')
+    def write_minimap_tiers(self, folder_path, formats=('jpeg',)):
+        """Save every minimap at each size tier and format, returns the number of files saved
+        
+        Files are named <minimap filename>__<tier>.<ext>, the server's image cache key, so JPEG
+        tiers written to server_cache_dir() are served as they are instead of encoded on request
+        """
+        os.makedirs(folder_path, exist_ok=True)
+        
+        # Largest tier first so each smaller tier is resized from the previous one
+        tiers = sorted(SIZE_TIERS.items(), key=lambda item: item[1]['width'], reverse=True)
+        
+        saved_count = 0
+        for i, minimap_data in enumerate(self.minimap_images):
+            filename = self.minimap_filename(minimap_data['field'], i)
+            image = minimap_data['image'].convert('RGB')
+            
+            for tier_name, tier in tiers:
+                # Never upscale
+                if image.width > tier['width']:
+                    height = max(1, round(image.height * tier['width'] / image.width))
+                    image = image.resize((tier['width'], height), Image.Resampling.LANCZOS)
+                    
+                for format_name in formats:
+                    extension, pil_format, options = TIER_FORMATS[format_name]
+                    filepath = os.path.join(folder_path, f"{filename}__{tier_name}.{extension}")
+                    image.save(filepath, pil_format, quality=tier['quality'], **options)
+                    saved_count += 1
+                    
+        return saved_count
+        
+    @timed('create_minimap')
+    def create_minimap(self, field):
+        """Create a square minimap centered on the field's pin location"""
+        if not field.get('pinpoint') or not field.get('radius'):
+            return None
+            
+        pin_x, pin_y = field['pinpoint']
+        radius = field['radius']
+        
+        # Get field color early to avoid reference errors later
+        color = field.get('color', '#FF0000')
+        
+        # Calculate square bounds
+        left = int(pin_x - radius)
+        top = int(pin_y - radius)
+        right = int(pin_x + radius)
+        bottom = int(pin_y + radius)
+        
+        # Ensure bounds are within image
+        img_width, img_height = self.original_image.size
+        left = max(0, left)
+        top = max(0, top)
+        right = min(img_width, right)
+        bottom = min(img_height, bottom)
+        
+        # Create square by using the smaller dimension
+        width = right - left
+        height = bottom - top
+        square_size = min(width, height)
+        
+        # Ensure we have a valid square size
+        if square_size <= 0:
+            print(f"Invalid square size for {field.get('fieldname', 'Unknown')}: {square_size}")
+            return None
+        
+        # Recalculate bounds to make it perfectly square and centered
+        center_x = (left + right) // 2
+        center_y = (top + bottom) // 2
+        half_size = square_size // 2
+        
+        left = max(0, center_x - half_size)
+        top = max(0, center_y - half_size)
+        right = min(img_width, left + square_size)
+        bottom = min(img_height, top + square_size)
+        
+        # Final validation to ensure valid crop coordinates
+        if right <= left or bottom <= top:
+            # Adjust to ensure valid coordinates
+            if right <= left:
+                if left + 1 <= img_width:
+                    right = left + 1
+                else:
+                    left = right - 1
+                    
+            if bottom <= top:
+                if top + 1 <= img_height:
+                    bottom = top + 1
+                else:
+                    top = bottom - 1
+                    
+            # Recalculate square_size based on corrected bounds
+            width = right - left
+            height = bottom - top
+            square_size = min(width, height)
+        
+        # Crop the image
+        try:
+            cropped = self.original_image.crop((left, top, right, bottom))
+            
+            # Draw field overlay if points exist
+            if field.get('points') and len(field['points']) > 2:
+                # crop() already returned a new image, so draw on it directly
+                overlay_image = cropped if cropped.mode == 'RGB' else cropped.convert('RGB')
+                
+                # Composite the translucent fill and the outline in one pass through a cached mask
+                mask = self.get_field_mask(field, (left, top, right, bottom))
+                overlay_image.paste(hex_to_rgb(color), (0, 0) + overlay_image.size, mask)
+                
+                draw = ImageDraw.Draw(overlay_image)
+                
+                # Draw pin location
+                pin_rel_x = pin_x - left
+                pin_rel_y = pin_y - top
+                if 0 <= pin_rel_x <= square_size and 0 <= pin_rel_y <= square_size:
+                    pin_size = 6
+                    draw.ellipse([pin_rel_x-pin_size, pin_rel_y-pin_size, 
+                                pin_rel_x+pin_size, pin_rel_y+pin_size], 
+                               fill=color, outline='black', width=2)
+                    
+                    text_x = pin_rel_x + pin_size + 2
+                    text_y = pin_rel_y - pin_size
+                    
+                    # Draw field name with a black outline
+                    draw.text((text_x, text_y), field.get('fieldname', 'Unnamed'), fill='white',
+                              font=self.get_label_font(), stroke_width=1, stroke_fill='black')
+                
+                return overlay_image
+            else:
+                return cropped
+                
+        except Exception as e:
+            print(f"Error creating minimap for {field.get('fieldname', 'Unknown')}: {e}")
+            return None
+            
+    def get_field_mask(self, field, crop_box):
+        """Overlay mask for a field within a crop: 25% opacity fill with an opaque 2px outline
+        
+        Masks are rasterized once and cached, keyed by the field's points and the crop box
+        """
+        left, top, right, bottom = crop_box
+        key = (tuple(tuple(point) for point in field['points']), crop_box)
+        
+        mask = self.mask_cache.get(key)
+        if mask is not None:
+            profiler.count('mask cache hits')
+            self.mask_cache.move_to_end(key)
+            return mask
+            
+        profiler.count('mask cache misses')
+            
+        # Adjust points relative to crop
+        adjusted_points = [(point[0] - left, point[1] - top) for point in field['points']]
+        
+        mask = Image.new('L', (right - left, bottom - top), 0)
+        ImageDraw.Draw(mask).polygon(adjusted_points, fill=64, outline=255, width=2)
+        
+        self.mask_cache[key] = mask
+        self.mask_cache_bytes += mask.width * mask.height
+        
+        # Drop the least recently used masks once over budget
+        while self.mask_cache_bytes > MASK_CACHE_BYTES and len(self.mask_cache) > 1:
+            _, evicted = self.mask_cache.popitem(last=False)
+            self.mask_cache_bytes -= evicted.width * evicted.height
+            
+        return mask
+        
+    def get_label_font(self):
+        """Font for minimap labels, loaded once"""
+        if self.label_font is None:
+            try:
+                self.label_font = ImageFont.truetype("arial.ttf", 14)
+            except OSError:
+                self.label_font = ImageFont.load_default()
+        return self.label_font
@@ -0,0 +1,141 @@
+# Point -> pasture lookup for animal GPS fixes and tapped map coordinates.
+#
+# A uniform grid is laid over the fields' extent; every cell lists the fields whose
+# bounding box overlaps it. A single lookup only tests that cell's fields (bbox
+# first, then mapGeometry.point_in_polygon). Batches are classified with NumPy:
+# the points are bucketed by grid cell, and each field only takes the unresolved
+# points in the cells it overlaps, filters them by its bbox and runs the same
+# even-odd ray test as point_in_polygon across them at once.
+#
+# Coordinates are map image pixels. When fields overlap, the first field in
+# MapData order wins, the same as a linear search.
+
+import math
+import numpy as np
+from mapGeometry import point_in_polygon, polygon_bbox
+
+# Roughly how many grid cells to aim for when no cell size is given
+TARGET_CELL_COUNT = 4096
+
+
+class PastureIndex:
+    def __init__(self, names, polygons, cell_size=None):
+        self.names = list(names)
+        self.polygons = [[(float(x), float(y)) for x, y in points] for points in polygons]
+        self.bboxes = [polygon_bbox(points) for points in self.polygons]
+        self.edges = [self.polygon_edges(points) for points in self.polygons]
+        self.build_grid(cell_size)
+
+    @classmethod
+    def from_map_data(cls, map_data, cell_size=None):
+        """Index every field in MapData with at least 3 points"""
+        fields = [field for field in map_data.get('fields', []) if len(field.get('points') or []) >= 3]
+        return cls([field.get('fieldname', 'Unnamed') for field in fields],
+                   [field['points'] for field in fields], cell_size)
+
+    def polygon_edges(self, points):
+        """Edge start/end coordinate arrays used by the vectorized test"""
+        start = np.array(points, dtype=float)
+        end = np.roll(start, -1, axis=0)
+        return start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+
+    def build_grid(self, cell_size):
+        self.cells = {}
+        self.field_cells = []  # Per field, the keys (row * columns + column) of the cells it overlaps
+        self.grid_columns = self.grid_rows = 0
+        if not self.bboxes:
+            self.origin = (0.0, 0.0)
+            self.cell_size = 1.0
+            return
+
+        min_x = min(bbox[0] for bbox in self.bboxes)
+        min_y = min(bbox[1] for bbox in self.bboxes)
+        max_x = max(bbox[2] for bbox in self.bboxes)
+        max_y = max(bbox[3] for bbox in self.bboxes)
+        self.origin = (min_x, min_y)
+
+        if cell_size is None:
+            cell_size = math.sqrt(max(1.0, (max_x - min_x) * (max_y - min_y)) / TARGET_CELL_COUNT)
+        self.cell_size = max(1.0, cell_size)
+
+        self.grid_columns, self.grid_rows = (count + 1 for count in self.cell_of(max_x, max_y))
+        for i, bbox in enumerate(self.bboxes):
+            first_column, first_row = self.cell_of(bbox[0], bbox[1])
+            last_column, last_row = self.cell_of(bbox[2], bbox[3])
+            keys = []
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    self.cells.setdefault((column, row), []).append(i)
+                    keys.append(row * self.grid_columns + column)
+            self.field_cells.append(np.array(sorted(keys), dtype=np.int64))
+
+    def cell_of(self, x, y):
+        return (int((x - self.origin[0]) // self.cell_size), int((y - self.origin[1]) // self.cell_size))
+
+    def locate(self, x, y):
+        """Index of the field containing a point, or None"""
+        for i in self.cells.get(self.cell_of(x, y), ()):
+            min_x, min_y, max_x, max_y = self.bboxes[i]
+            if min_x <= x <= max_x and min_y <= y <= max_y and point_in_polygon((x, y), self.polygons[i]):
+                return i
+        return None
+
+    def locate_name(self, x, y):
+        """Name of the field containing a point, or None"""
+        i = self.locate(x, y)
+        return None if i is None else self.names[i]
+
+    def locate_many(self, points):
+        """Field index for every point in an (N, 2) array, -1 where no field contains it"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        result = np.full(len(points), -1, dtype=np.int64)
+        if not self.cells or not len(points):
+            return result
+
+        # Bucket the points by cell, sorted by cell key so each cell's points are one slice
+        with np.errstate(invalid='ignore'):
+            columns = np.floor((points[:, 0] - self.origin[0]) / self.cell_size)
+            rows = np.floor((points[:, 1] - self.origin[1]) / self.cell_size)
+            on_grid = np.flatnonzero((columns >= 0) & (columns < self.grid_columns) &
+                                     (rows >= 0) & (rows < self.grid_rows))
+        keys = rows[on_grid].astype(np.int64) * self.grid_columns + columns[on_grid].astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        sorted_points = on_grid[order]
+
+        for i, (min_x, min_y, max_x, max_y) in enumerate(self.bboxes):
+            starts = np.searchsorted(sorted_keys, self.field_cells[i], 'left')
+            ends = np.searchsorted(sorted_keys, self.field_cells[i], 'right')
+            slices = [sorted_points[start:end] for start, end in zip(starts, ends) if end > start]
+            if not slices:
+                continue
+
+            candidates = np.concatenate(slices)
+            candidates = candidates[result[candidates] < 0]
+            x = points[candidates, 0]
+            y = points[candidates, 1]
+            candidates = candidates[(x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)]
+            if not len(candidates):
+                continue
+
+            inside = self.points_in_polygon(points[candidates, 0], points[candidates, 1], self.edges[i])
+            result[candidates[inside]] = i
+
+        return result
+
+    def points_in_polygon(self, x, y, edges):
+        """Vectorized point_in_polygon: same even-odd rule and edge conditions"""
+        inside = np.zeros(len(x), dtype=bool)
+        for p1x, p1y, p2x, p2y in zip(*edges):
+            if p1y == p2y:
+                # Horizontal edges can never satisfy min(y) < y <= max(y)
+                continue
+            crosses = (y > min(p1y, p2y)) & (y <= max(p1y, p2y)) & (x <= max(p1x, p2x))
+            if p1x != p2x:
+                crosses &= x <= (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+            inside ^= crosses
+        return inside
+
+    def locate_names(self, points):
+        """Field name (or None) for every point"""
+        return [None if i < 0 else self.names[i] for i in self.locate_many(points)]
@@ -6,24 +6,31 @@
 
 # 49B BODY.JPG
 # NT SPOT BODY.JPG
+#
+# Tags are checked against the herd roster in Sheet Templates/*instance.json (and
+# the existing cow folders), obvious typos are fixed without asking.
+#
+# The folders are picked in dialogs, the ingest options are the same as photoWatcher.py's;
+#   python photoCleaner.py --max-edge 2048 --quality 85 --normalize --score --workers 4
+#   python photoCleaner.py --roster "D:/Exports" --archive "D:/Originals"
 
+import argparse
 import os
-import shutil
-import re
-from datetime import datetime
-from tkinter import filedialog, messagebox, simpledialog
+from tkinter import filedialog
 import tkinter as tk
-from pathlib import Path
+from cowRoster import CowRoster
+from photoCleanerCore import CowPhotoOrganizer
+from photoIngest import DEFAULT_INGEST_QUALITY
+from tagReview import TagReviewTable
 
-class CowPhotoOrganizer:
-    def __init__(self):
-        self.source_folder = ""
-        self.destination_folder = ""
-        self.cow_tags = {}
-        self.no_tag_files = []
-        self.unusual_names = []
-        self.processed_files = []
-        self.skipped_files = []
+ROSTER_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Sheet Templates')
+
+class CowPhotoOrganizerGui(CowPhotoOrganizer):
+    """CowPhotoOrganizer driven by folder pickers and confirmation dialogs"""
+    def __init__(self, roster_folder=ROSTER_FOLDER, **options):
+        """options are CowPhotoOrganizer's ingest options (max_long_edge, quality, normalize, ...)"""
+        super().__init__(**options)
+        self.roster_folder = roster_folder
         
     def select_folders(self):
         """Prompt user to select source and destination folders"""
@@ -46,248 +53,33 @@ class CowPhotoOrganizer:
         print(f"Destination folder: {self.destination_folder}")
         return True
     
-    def parse_cow_tag(self, filename):
-        """Extract cow tag from filename"""
-        # Remove file extension
-        name = filename.upper().replace('.JPG', '').replace('.JPEG', '')
-        
-        # This is just based on the orignal photo names I had
-        if 'NT' in name:
-            return 'NT'
-        
-        if 'UNKOWN' in name or 'UNKNOWN' in name or 'IMG_' in name:
-            return 'UNKNOWN'
-            
-        if 'DONKEY' in name:
-            return 'DONKEY'
-            
-        if 'FIND CALF' in name:
-            return 'UNKNOWN'
-            
-        if 'GRASS LOL' in name:
-            return None
-            
-        if 'MUNCH MUNCH' in name:
-            return None
-        
-        # Look for patterns like "R25", "TK2", etc. at the start
-        match = re.match(r'^([A-Z]+\d+)', name)
-        if match:
-            return match.group(1)
-        
-        # Look for patterns like "17A", "17B", "2A", etc.
-        match = re.match(r'^(\d+[A-Z]+)', name)
-        if match:
-            return match.group(1)
-        
-        # Look for just numbers at the start
-        match = re.match(r'^(\d+)', name)
-        if match:
-            return match.group(1)
-        
-        # Look for just letters at the start (but not BODY, HEAD, etc.)
-        match = re.match(r'^([A-Z]+)', name)
-        if match and match.group(1) not in ['BODY', 'HEAD', 'PROFILE', 'CALF']:
-            return match.group(1)
-        
-        return None
-    
-    def get_body_type(self, filename):
-        """Extract body type from filename"""
-        name = filename.upper()
-        
-        if 'BODY' in name:
-            return 'BODY'
-        elif 'HEAD' in name:
-            return 'HEAD'
-        elif 'PROFILE' in name:
-            return 'PROFILE'
-        elif 'CALF' in name:
-            return 'CALF'
-        else:
-            return 'BODY'  # Default to BODY if unclear
-    
-    def is_unusual_name(self, cow_tag):
-        """Check if cow tag seems unusual and needs confirmation"""
-        if not cow_tag:
-            return True
-            
-        # Greater than 4 characters
-        if len(cow_tag) > 4:
-            return True
-            
-        # Contains non-alphanumeric characters
-        if not cow_tag.isalnum():
-            return True
-            
-        # Contains body/head/profile keywords
-        if any(word in cow_tag.upper() for word in ['BODY', 'HEAD', 'PROFILE']):
-            return True
-            
-        # Contains NT (No Tag)
-        if 'NT' in cow_tag:
-            return True
-            
-        # Contains UNKNOWN
-        if 'UNKNOWN' in cow_tag:
-            return True
-            
-        return False
-    
-    def scan_photos(self):
-        """Scan all photos in source folder and extract cow tags"""
-        print("Scanning photos for cow tags...")
-        
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
-        
-        for filename in os.listdir(self.source_folder):
-            if any(filename.lower().endswith(ext) for ext in image_extensions):
-                cow_tag = self.parse_cow_tag(filename)
-                
-                if cow_tag is None:
-                    self.no_tag_files.append(filename)
-                else:
-                    if cow_tag not in self.cow_tags:
-                        self.cow_tags[cow_tag] = []
-                    self.cow_tags[cow_tag].append(filename)
-                    
-                    if self.is_unusual_name(cow_tag):
-                        if cow_tag not in self.unusual_names:
-                            self.unusual_names.append(cow_tag)
-        
-        print(f"Found {len(self.cow_tags)} unique cow tags")
-        print(f"Found {len(self.no_tag_files)} files with no identifiable tags")
-        
-        if self.no_tag_files:
-            print("\nFiles with no identifiable tags:")
-            for filename in self.no_tag_files:
-                print(f"  - {filename}")
+    def load_roster(self):
+        """Load the herd roster used to resolve mistyped tags"""
+        try:
+            self.roster = CowRoster.from_folder(self.roster_folder, self.destination_folder)
+        except (OSError, ValueError) as e:
+            print(f"Could not load the herd roster: {e}")
+            return
+        print(f"Loaded {len(self.roster)} roster tags")
     
     def confirm_unusual_names(self):
-        """Ask user to confirm unusual cow tag names"""
+        """Let the user decide on every unusual cow tag in one review table"""
         if not self.unusual_names:
             return
             
         print(f"\nFound {len(self.unusual_names)} unusual cow tag names that need confirmation:")
         
-        confirmed_tags = {}
         root = tk.Tk()
         root.withdraw()
         
-        for tag in self.unusual_names:
-            files_with_tag = self.cow_tags.get(tag, [])
-            message = f"Unusual cow tag found: '{tag}'\n\nFiles with this tag:\n"
-            for i, filename in enumerate(files_with_tag[:5]):  # Show first 5 files
-                message += f"  - {filename}\n"
-            if len(files_with_tag) > 5:
-                message += f"  ... and {len(files_with_tag) - 5} more files\n"
-            
-            message += f"\nDo you want to:\n1. Keep as '{tag}'\n2. Rename it\n3. Skip these files"
-            
-            choice = messagebox.askyesnocancel("Confirm Unusual Cow Tag", 
-                                             f"{message}\n\nClick Yes to keep, No to rename, Cancel to skip")
-            
-            if choice is True:  # Keep as is
-                confirmed_tags[tag] = tag
-            elif choice is False:  # Rename
-                new_name = simpledialog.askstring("Rename Cow Tag", 
-                                                 f"Enter new name for cow tag '{tag}':")
-                if new_name:
-                    confirmed_tags[tag] = new_name.upper()
-                else:
-                    confirmed_tags[tag] = None  # Skip
-            else:  # Skip
-                confirmed_tags[tag] = None
+        table = TagReviewTable(root, self.source_folder, self.cow_tags, self.unusual_names, self.roster)
+        confirmed_tags = table.run()
+        root.destroy()
         
-        # Update cow_tags with confirmed names
-        updated_cow_tags = {}
-        for old_tag, new_tag in confirmed_tags.items():
-            if new_tag:  # Not skipped
-                files = self.cow_tags[old_tag]
-                if new_tag not in updated_cow_tags:
-                    updated_cow_tags[new_tag] = []
-                updated_cow_tags[new_tag].extend(files)
+        for tag, new_tag in confirmed_tags.items():
+            print(f"  {tag} -> {new_tag if new_tag else 'skipped'}")
         
-        # Add non-unusual tags
-        for tag, files in self.cow_tags.items():
-            if tag not in self.unusual_names:
-                updated_cow_tags[tag] = files
-        
-        self.cow_tags = updated_cow_tags
-    
-    def format_date(self, timestamp):
-        """Format timestamp to dayMonthYear format"""
-        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        
-        day = timestamp.day
-        month = months[timestamp.month - 1]
-        year = timestamp.year
-        
-        return f"{day:02d}{month}{year}"
-    
-    def organize_photos(self):
-        """Create folders and copy photos with new naming convention"""
-        print("\nOrganizing photos...")
-        
-        for cow_tag, filenames in self.cow_tags.items():
-            # Create cow folder
-            cow_folder = os.path.join(self.destination_folder, cow_tag)
-            os.makedirs(cow_folder, exist_ok=True)
-            
-            for filename in filenames:
-                source_path = os.path.join(self.source_folder, filename)
-                
-                # Get file timestamp
-                try:
-                    timestamp = datetime.fromtimestamp(os.path.getmtime(source_path))
-                    date_str = self.format_date(timestamp)
-                except:
-                    date_str = "01Jan2022"  # Fallback date
-                
-                # Determine body type
-                body_type = self.get_body_type(filename)
-                
-                # Create new filename
-                base_name = f"{cow_tag} {body_type} {date_str}"
-                new_filename = f"{base_name}.jpg"
-                
-                # Handle duplicates by adding number suffix
-                counter = 1
-                while os.path.exists(os.path.join(cow_folder, new_filename)):
-                    new_filename = f"{base_name} ({counter}).jpg"
-                    counter += 1
-                    
-                    if counter == 1:  # First duplicate found
-                        print(f"Duplicate found for {base_name}.jpg - adding number suffix")
-                
-                destination_path = os.path.join(cow_folder, new_filename)
-                
-                try:
-                    # Copy file (preserves timestamps)
-                    shutil.copy2(source_path, destination_path)
-                    self.processed_files.append((filename, new_filename, cow_tag))
-                    print(f"Copied: {filename} -> {cow_tag}/{new_filename}")
-                except Exception as e:
-                    print(f"Error copying {filename}: {e}")
-                    self.skipped_files.append((filename, str(e)))
-    
-    def print_summary(self):
-        """Print summary of operations"""
-        print(f"\n{'='*50}")
-        print("SUMMARY")
-        print(f"{'='*50}")
-        print(f"Total files processed: {len(self.processed_files)}")
-        print(f"Total cow folders created: {len(self.cow_tags)}")
-        print(f"Files with no identifiable tags: {len(self.no_tag_files)}")
-        print(f"Files skipped due to errors: {len(self.skipped_files)}")
-        
-        if self.skipped_files:
-            print("\nFiles skipped due to errors:")
-            for filename, error in self.skipped_files:
-                print(f"  - {filename}: {error}")
-        
-        print(f"\nOrganized photos are saved in: {self.destination_folder}")
+        self.apply_tag_decisions(confirmed_tags)
     
     def run(self):
         """Main execution method"""
@@ -297,11 +89,33 @@ class CowPhotoOrganizer:
         if not self.select_folders():
             return
         
+        self.load_roster()
         self.scan_photos()
         self.confirm_unusual_names()
         self.organize_photos()
         self.print_summary()
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sort labeled cow photos into one folder per cow")
+    parser.add_argument('--max-edge', type=int,
+                        help="Downscale photos whose long edge is larger than this many pixels (default: keep size)")
+    parser.add_argument('--quality', type=int, default=DEFAULT_INGEST_QUALITY,
+                        help=f"JPEG quality for downscaled photos (default {DEFAULT_INGEST_QUALITY})")
+    parser.add_argument('--normalize', action='store_true',
+                        help="Bake in the EXIF orientation and keep only the capture date and GPS metadata")
+    parser.add_argument('--score', action='store_true',
+                        help="Score photo sharpness so the app shows the best recent HEAD/BODY shot")
+    parser.add_argument('--workers', type=int, help="Photos written in parallel (default: one at a time)")
+    parser.add_argument('--roster', default=ROSTER_FOLDER,
+                        help="Folder of sheet exports (*instance.json) to resolve mistyped tags against "
+                             "(default: Sheet Templates)")
+    parser.add_argument('--archive', help="Folder to keep untouched originals in (<tag>/<name>, like the destination)")
+    args = parser.parse_args(argv)
+
+    organizer = CowPhotoOrganizerGui(args.roster, max_long_edge=args.max_edge, quality=args.quality,
+                                     archive_folder=args.archive, workers=args.workers, normalize=args.normalize,
+                                     score=args.score)
+    organizer.run()
+
 if __name__ == "__main__":
-    organizer = CowPhotoOrganizer()
-    organizer.run()
\ No newline at end of file
+    main()
\ No newline at end of file
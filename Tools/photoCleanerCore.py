@@ -0,0 +1,346 @@
+# Core logic for moving labeled photos of the cows into their proper folders.
+# No GUI imports: photoCleaner.py adds the folder pickers and confirmation dialogs.
+# THIS WILL HAVE TO BE MODIFIED IF YOU USE A DIFFERENT NAMING SCHEME
+# 
+# Cowtags are assumed to be alphanumeric. NT means no tag
+# Ex; 
+
+# 49B BODY.JPG
+# NT SPOT BODY.JPG
+#
+# Photos are written by photoIngest.store_photo(). It can downscale phone originals
+# (max_long_edge/quality) and bake in the orientation while slimming the metadata
+# (normalize). The original can be kept in archive_folder (same <tag>/<name>
+# layout). With workers > 1 photos are written by a pool: processes when they are
+# decoded, threads for plain copies. With score, the cow folders that got new
+# photos have their sharpness scores and best HEAD/BODY picks updated
+# (see photoQuality.py).
+#
+# With a roster (cowRoster.CowRoster), unusual tags that are on the roster or are
+# a close, unambiguous misspelling of a roster tag are resolved after scanning,
+# so only the rest needs a person. Other tags are only moved to the roster's
+# spelling of the same tag (24A -> 24a when the roster has it lowercase).
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from photoIngest import DEFAULT_INGEST_QUALITY, store_photo
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
+
+
+class CowPhotoOrganizer:
+    def __init__(self, source_folder="", destination_folder="", max_long_edge=None,
+                 quality=DEFAULT_INGEST_QUALITY, archive_folder=None, workers=None, normalize=False, score=False,
+                 roster=None):
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.max_long_edge = max_long_edge
+        self.quality = quality
+        self.archive_folder = archive_folder
+        self.workers = workers
+        self.normalize = normalize
+        self.score = score
+        self.roster = roster
+        self.cow_tags = {}
+        self.no_tag_files = []
+        self.unusual_names = []
+        self.processed_files = []
+        self.skipped_files = []
+        self.resolved_tags = {}
+        
+    def parse_cow_tag(self, filename):
+        """Extract cow tag from filename"""
+        # Remove file extension
+        name = filename.upper().replace('.JPG', '').replace('.JPEG', '')
+        
+        # This is just based on the orignal photo names I had
+        if 'NT' in name:
+            return 'NT'
+        
+        if 'UNKOWN' in name or 'UNKNOWN' in name or 'IMG_' in name:
+            return 'UNKNOWN'
+            
+        if 'DONKEY' in name:
+            return 'DONKEY'
+            
+        if 'FIND CALF' in name:
+            return 'UNKNOWN'
+            
+        if 'GRASS LOL' in name:
+            return None
+            
+        if 'MUNCH MUNCH' in name:
+            return None
+        
+        # Look for patterns like "R25", "TK2", etc. at the start
+        match = re.match(r'^([A-Z]+\d+)', name)
+        if match:
+            return match.group(1)
+        
+        # Look for patterns like "17A", "17B", "2A", etc.
+        match = re.match(r'^(\d+[A-Z]+)', name)
+        if match:
+            return match.group(1)
+        
+        # Look for just numbers at the start
+        match = re.match(r'^(\d+)', name)
+        if match:
+            return match.group(1)
+        
+        # Look for just letters at the start (but not BODY, HEAD, etc.)
+        match = re.match(r'^([A-Z]+)', name)
+        if match and match.group(1) not in ['BODY', 'HEAD', 'PROFILE', 'CALF']:
+            return match.group(1)
+        
+        return None
+    
+    def get_body_type(self, filename):
+        """Extract body type from filename"""
+        name = filename.upper()
+        
+        if 'BODY' in name:
+            return 'BODY'
+        elif 'HEAD' in name:
+            return 'HEAD'
+        elif 'PROFILE' in name:
+            return 'PROFILE'
+        elif 'CALF' in name:
+            return 'CALF'
+        else:
+            return 'BODY'  # Default to BODY if unclear
+    
+    def is_unusual_name(self, cow_tag):
+        """Check if cow tag seems unusual and needs confirmation"""
+        if not cow_tag:
+            return True
+            
+        # Greater than 4 characters
+        if len(cow_tag) > 4:
+            return True
+            
+        # Contains non-alphanumeric characters
+        if not cow_tag.isalnum():
+            return True
+            
+        # Contains body/head/profile keywords
+        if any(word in cow_tag.upper() for word in ['BODY', 'HEAD', 'PROFILE']):
+            return True
+            
+        # Contains NT (No Tag)
+        if 'NT' in cow_tag:
+            return True
+            
+        # Contains UNKNOWN
+        if 'UNKNOWN' in cow_tag:
+            return True
+            
+        return False
+    
+    def scan_photos(self):
+        """Scan all photos in source folder and extract cow tags"""
+        print("Scanning photos for cow tags...")
+        
+        for filename in os.listdir(self.source_folder):
+            if self.is_photo(filename):
+                self.add_photo(filename)
+        
+        self.resolve_tags()
+        
+        print(f"Found {len(self.cow_tags)} unique cow tags")
+        print(f"Found {len(self.no_tag_files)} files with no identifiable tags")
+        
+        if self.no_tag_files:
+            print("\nFiles with no identifiable tags:")
+            for filename in self.no_tag_files:
+                print(f"  - {filename}")
+    
+    def is_photo(self, filename):
+        """Check if a file has one of the image extensions"""
+        return any(filename.lower().endswith(ext) for ext in IMAGE_EXTENSIONS)
+    
+    def add_photo(self, filename):
+        """Sort one photo from the source folder under its cow tag"""
+        cow_tag = self.parse_cow_tag(filename)
+        
+        if cow_tag is None:
+            self.no_tag_files.append(filename)
+        else:
+            if cow_tag not in self.cow_tags:
+                self.cow_tags[cow_tag] = []
+            self.cow_tags[cow_tag].append(filename)
+            
+            if self.is_unusual_name(cow_tag):
+                if cow_tag not in self.unusual_names:
+                    self.unusual_names.append(cow_tag)
+    
+    def resolve_tags(self):
+        """Resolve unusual tags against the roster, returns {old tag: (roster tag, edit distance)}"""
+        if not self.roster:
+            return {}
+        
+        resolved = {}
+        for tag in list(self.cow_tags):
+            roster_tag, distance = self.roster.resolve(tag)
+            if roster_tag is None or roster_tag == tag and tag not in self.unusual_names:
+                continue
+            # Ordinary tags that aren't on the roster may be new cows, only exact matches move them
+            if tag not in self.unusual_names and distance:
+                continue
+            
+            resolved[tag] = (roster_tag, distance)
+            if tag in self.unusual_names:
+                self.unusual_names.remove(tag)
+            files = self.cow_tags.pop(tag)
+            if roster_tag not in self.cow_tags:
+                self.cow_tags[roster_tag] = []
+            self.cow_tags[roster_tag].extend(files)
+            
+            if roster_tag != tag:
+                print(f"Resolved tag '{tag}' -> '{roster_tag}' ({len(files)} files)")
+        
+        self.resolved_tags.update(resolved)
+        return resolved
+    
+    def apply_tag_decisions(self, confirmed_tags):
+        """Apply confirmed names for unusual tags ({old tag: new tag, or None to skip})"""
+        # Update cow_tags with confirmed names
+        updated_cow_tags = {}
+        for old_tag, new_tag in confirmed_tags.items():
+            if new_tag:  # Not skipped
+                files = self.cow_tags[old_tag]
+                if new_tag not in updated_cow_tags:
+                    updated_cow_tags[new_tag] = []
+                updated_cow_tags[new_tag].extend(files)
+        
+        # Add non-unusual tags, renamed tags may have been merged into them already
+        for tag, files in self.cow_tags.items():
+            if tag not in self.unusual_names:
+                if tag not in updated_cow_tags:
+                    updated_cow_tags[tag] = []
+                updated_cow_tags[tag].extend(files)
+        
+        self.cow_tags = updated_cow_tags
+    
+    def format_date(self, timestamp):
+        """Format timestamp to dayMonthYear format"""
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        
+        day = timestamp.day
+        month = months[timestamp.month - 1]
+        year = timestamp.year
+        
+        return f"{day:02d}{month}{year}"
+    
+    def organize_photos(self):
+        """Create folders and copy photos with new naming convention"""
+        print("\nOrganizing photos...")
+        
+        # Names are all picked up front, so parallel writes can never pick the same one
+        jobs = []
+        planned_paths = set()
+        
+        for cow_tag, filenames in self.cow_tags.items():
+            # Create cow folder
+            cow_folder = os.path.join(self.destination_folder, cow_tag)
+            os.makedirs(cow_folder, exist_ok=True)
+            
+            for filename in filenames:
+                source_path = os.path.join(self.source_folder, filename)
+                
+                # Get file timestamp
+                try:
+                    timestamp = datetime.fromtimestamp(os.path.getmtime(source_path))
+                    date_str = self.format_date(timestamp)
+                except:
+                    date_str = "01Jan2022"  # Fallback date
+                
+                # Determine body type
+                body_type = self.get_body_type(filename)
+                
+                # Create new filename
+                base_name = f"{cow_tag} {body_type} {date_str}"
+                new_filename = f"{base_name}.jpg"
+                
+                # Handle duplicates by adding number suffix
+                counter = 1
+                while (os.path.join(cow_folder, new_filename) in planned_paths
+                       or os.path.exists(os.path.join(cow_folder, new_filename))):
+                    new_filename = f"{base_name} ({counter}).jpg"
+                    counter += 1
+                    
+                    if counter == 1:  # First duplicate found
+                        print(f"Duplicate found for {base_name}.jpg - adding number suffix")
+                
+                destination_path = os.path.join(cow_folder, new_filename)
+                planned_paths.add(destination_path)
+                
+                archive_path = None
+                if self.archive_folder:
+                    # Originals keep their own format, so keep their extension too
+                    archive_name = os.path.splitext(new_filename)[0] + os.path.splitext(filename)[1].lower()
+                    archive_path = os.path.join(self.archive_folder, cow_tag, archive_name)
+                jobs.append((filename, new_filename, cow_tag, source_path, destination_path, archive_path))
+                
+        if self.workers and self.workers > 1:
+            # Decoding is CPU bound, plain copies only wait on the disk
+            pool_type = ProcessPoolExecutor if self.max_long_edge or self.normalize else ThreadPoolExecutor
+            with pool_type(max_workers=self.workers) as executor:
+                futures = [executor.submit(store_photo, source_path, destination_path, self.max_long_edge,
+                                           self.quality, archive_path, self.normalize)
+                           for _, _, _, source_path, destination_path, archive_path in jobs]
+                for job, future in zip(jobs, futures):
+                    self.record_result(job, future.exception())
+        else:
+            for job in jobs:
+                _, _, _, source_path, destination_path, archive_path = job
+                try:
+                    # Copy file (preserves timestamps)
+                    store_photo(source_path, destination_path, self.max_long_edge, self.quality, archive_path,
+                                self.normalize)
+                    self.record_result(job, None)
+                except Exception as e:
+                    self.record_result(job, e)
+        
+        if self.score and self.processed_files:
+            self.score_photos()
+    
+    def score_photos(self):
+        """Update sharpness scores and best picks in the cow folders that got new photos"""
+        from photoQuality import score_folders
+        
+        cow_folders = sorted({os.path.join(self.destination_folder, cow_tag)
+                              for _, _, cow_tag in self.processed_files})
+        scored_count = score_folders(cow_folders, self.workers)
+        print(f"Scored {scored_count} photos in {len(cow_folders)} cow folders")
+    
+    def record_result(self, job, error):
+        """Note a photo as processed or skipped"""
+        filename, new_filename, cow_tag = job[:3]
+        if error is None:
+            self.processed_files.append((filename, new_filename, cow_tag))
+            print(f"Copied: {filename} -> {cow_tag}/{new_filename}")
+        else:
+            print(f"Error copying {filename}: {error}")
+            self.skipped_files.append((filename, str(error)))
+    
+    def print_summary(self):
+        """Print summary of operations"""
+        print(f"\n{'='*50}")
+        print("SUMMARY")
+        print(f"{'='*50}")
+        print(f"Total files processed: {len(self.processed_files)}")
+        print(f"Total cow folders created: {len(self.cow_tags)}")
+        print(f"Files with no identifiable tags: {len(self.no_tag_files)}")
+        if self.roster:
+            print(f"Tags resolved from the roster: {len(self.resolved_tags)}")
+        print(f"Files skipped due to errors: {len(self.skipped_files)}")
+        
+        if self.skipped_files:
+            print("\nFiles skipped due to errors:")
+            for filename, error in self.skipped_files:
+                print(f"  - {filename}: {error}")
+        
+        print(f"\nOrganized photos are saved in: {self.destination_folder}")
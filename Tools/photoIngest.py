@@ -0,0 +1,186 @@
+# How a single photo is written into the organized folders (see photoCleanerCore.py).
+#
+# By default photos are copied verbatim. Two options change that:
+#
+# max_long_edge  Photos larger than this are downscaled and re-encoded as JPEG. The
+#                decoder's draft mode does most of the scaling. JPEGs that already
+#                fit are not re-encoded.
+# normalize      The EXIF orientation is baked into the pixels and the metadata is
+#                slimmed to the capture date/time and GPS. Maker notes, embedded
+#                thumbnails, XMP, MPF secondary images and the like are dropped. A JPEG
+#                that needs neither rotation nor downscaling is rewritten segment by
+#                segment without re-encoding, so it loses nothing but the metadata.
+#
+# The ICC profile, the Adobe (APP14) segment that says how CMYK/YCCK/RGB data was
+# colour-transformed, and the file timestamps are always kept (the photo date is
+# taken from the modified time). PIL is only imported when a photo has to be decoded.
+
+import os
+import shutil
+import struct
+
+# JPEG quality for downscaled/rotated photos
+DEFAULT_INGEST_QUALITY = 85
+
+ORIENTATION_TAG = 0x0112
+EXIF_IFD_TAG = 0x8769
+GPS_IFD_TAG = 0x8825
+
+# DateTime in the main IFD and the capture date/time tags in the Exif IFD
+KEPT_MAIN_TAGS = (0x0132,)
+KEPT_CAPTURE_TAGS = (
+    0x9003,  # DateTimeOriginal
+    0x9004,  # DateTimeDigitized
+    0x9010, 0x9011, 0x9012,  # OffsetTime, OffsetTimeOriginal, OffsetTimeDigitized
+    0x9290, 0x9291, 0x9292,  # SubSecTime, SubSecTimeOriginal, SubSecTimeDigitized
+)
+
+
+def slim_exif(exif):
+    """EXIF bytes with only the capture date/time and GPS of an Image.Exif, None if there are none"""
+    from PIL import Image
+
+    slim = Image.Exif()
+    for tag in KEPT_MAIN_TAGS:
+        if tag in exif:
+            slim[tag] = exif[tag]
+
+    capture = {tag: value for tag, value in exif.get_ifd(EXIF_IFD_TAG).items() if tag in KEPT_CAPTURE_TAGS}
+    if capture:
+        slim[EXIF_IFD_TAG] = capture
+
+    gps = exif.get_ifd(GPS_IFD_TAG)
+    if gps:
+        slim[GPS_IFD_TAG] = dict(gps)
+
+    return slim.tobytes() if len(slim) else None
+
+
+def orientation_transpose(orientation):
+    """PIL transpose that undoes an EXIF orientation, None for upright"""
+    from PIL import Image
+
+    return {
+        2: Image.Transpose.FLIP_LEFT_RIGHT,
+        3: Image.Transpose.ROTATE_180,
+        4: Image.Transpose.FLIP_TOP_BOTTOM,
+        5: Image.Transpose.TRANSPOSE,
+        6: Image.Transpose.ROTATE_270,
+        7: Image.Transpose.TRANSVERSE,
+        8: Image.Transpose.ROTATE_90,
+    }.get(orientation)
+
+
+def rewrite_jpeg_metadata(source_path, destination_path, exif_bytes):
+    """Copy a JPEG without re-encoding, keeping only JFIF, the ICC profile, Adobe and the given EXIF"""
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    if data[:2] != b'\xff\xd8':
+        raise ValueError("Not a JPEG file")
+
+    jfif = []
+    kept = []
+    position = 2
+    while True:
+        if position + 4 > len(data) or data[position] != 0xFF:
+            raise ValueError("Corrupt JPEG header")
+        marker = data[position + 1]
+        if marker == 0xFF:  # Fill byte
+            position += 1
+            continue
+        if marker == 0xDA:  # Start of scan, the image data follows
+            break
+
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        segment = data[position:position + 2 + length]
+        position += 2 + length
+
+        if marker == 0xE0 and segment[4:9] == b'JFIF\x00':
+            jfif.append(segment)
+        elif marker == 0xE2 and segment[4:16] == b'ICC_PROFILE\x00':
+            kept.append(segment)
+        elif marker == 0xEE and segment[4:9] == b'Adobe':
+            # Colour transform flag, decoders read the pixels differently without it
+            kept.append(segment)
+        elif not 0xE0 <= marker <= 0xEF and marker != 0xFE:
+            # Tables and frame headers, everything but APPn and comments
+            kept.append(segment)
+
+    # Stuffing means FF D9 can only be the end of image marker. Anything after it
+    # (MPF secondary images, vendor trailers) is dropped
+    end = data.find(b'\xff\xd9', position)
+    scan = data[position:end + 2] if end >= 0 else data[position:]
+
+    try:
+        with open(destination_path, 'wb') as f:
+            f.write(b'\xff\xd8')
+            f.write(b''.join(jfif))
+            if exif_bytes:
+                f.write(b'\xff\xe1' + struct.pack('>H', len(exif_bytes) + 2) + exif_bytes)
+            f.write(b''.join(kept))
+            f.write(scan)
+    except Exception:
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+        raise
+
+
+def store_photo(source_path, destination_path, max_long_edge=None, quality=DEFAULT_INGEST_QUALITY,
+                archive_path=None, normalize=False):
+    """Copy a photo, downscaling and/or normalizing its orientation and metadata if asked"""
+    if archive_path:
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        shutil.copy2(source_path, archive_path)
+
+    if not max_long_edge and not normalize:
+        shutil.copy2(source_path, destination_path)
+        return
+
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        exif = image.getexif()
+        transpose = orientation_transpose(exif.get(ORIENTATION_TAG)) if normalize else None
+        too_large = max_long_edge and max(image.size) > max_long_edge
+
+        if image.format == 'JPEG' and not too_large and transpose is None:
+            # No pixels change, re-encoding would only lose quality
+            if normalize:
+                rewrite_jpeg_metadata(source_path, destination_path, slim_exif(exif))
+                shutil.copystat(source_path, destination_path)
+            else:
+                shutil.copy2(source_path, destination_path)
+            return
+
+        exif_bytes = slim_exif(exif) if normalize else image.info.get('exif')
+        icc_profile = image.info.get('icc_profile')
+
+        if too_large:
+            scale = max_long_edge / max(image.size)
+            target_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            # Let the JPEG decoder do most of the downscaling (DCT scaling), it is much cheaper
+            image.draft('RGB', target_size)
+            image = image.convert('RGB')
+            if image.size != target_size:
+                image = image.resize(target_size, Image.Resampling.LANCZOS)
+        else:
+            image = image.convert('RGB')
+
+        if transpose is not None:
+            image = image.transpose(transpose)
+
+        save_options = {'quality': quality, 'optimize': True}
+        if exif_bytes:
+            save_options['exif'] = exif_bytes
+        if icc_profile:
+            save_options['icc_profile'] = icc_profile
+        try:
+            image.save(destination_path, 'JPEG', **save_options)
+        except Exception:
+            # Don't leave a half-written photo behind
+            if os.path.exists(destination_path):
+                os.remove(destination_path)
+            raise
+
+    # Keep the original timestamps like copy2 does, the photo date comes from them
+    shutil.copystat(source_path, destination_path)
@@ -0,0 +1,183 @@
+# Sharpness scores for the organized cow photos, so the app can show the best
+# recent HEAD/BODY shot instead of whichever frame of a burst was saved last.
+#
+# Ex;
+#   python photoQuality.py --photos "D:/Cow Photos"             score every cow folder
+#   python photoQuality.py --photos "D:/Cow Photos" --tag 49B   just one cow
+#
+# The score is the variance of the Laplacian of the photo in grayscale, downsampled
+# to SCORE_LONG_EDGE first (JPEG draft mode decodes straight at 1/2-1/8 size), so
+# it is comparable between photos of different resolutions. Higher is sharper.
+#
+# Each cow folder gets a photoScores.json:
+#   {
+#     "photos": {"49B HEAD 01Jun2025.jpg": {"sharpness": 412.7, "size": 812345, "mtime": 1748779200.0}},
+#     "best": {"HEAD": "49B HEAD 01Jun2025.jpg", "BODY": "..."},
+#     "best_window_days": 14
+#   }
+# Only photos that are new or changed (size/mtime) since the last run are decoded.
+# "best" is the sharpest photo of each view dated within best_window_days of that
+# view's newest photo (dates from the DDMonYYYY in the filename, as organize_photos
+# writes them). The server reads it, so picking never decodes an image.
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from photoCleanerCore import IMAGE_EXTENSIONS
+
+SCORES_FILENAME = 'photoScores.json'
+
+# Long edge (pixels) photos are scored at
+SCORE_LONG_EDGE = 512
+
+# How much older than the newest photo of a view the chosen best photo may be
+BEST_WINDOW_DAYS = 14
+
+# Views picked for the app, matched like the server does (' HEAD ' / ' BODY ' in the name)
+BEST_VIEWS = ('HEAD', 'BODY')
+
+DATE_PATTERN = re.compile(r'(\d{2})([A-Za-z]{3})(\d{4})')
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def laplacian_variance(gray):
+    """Variance of the 4-neighbour Laplacian of a 2D array"""
+    gray = gray.astype(np.float32)
+    laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]) - 4 * gray[1:-1, 1:-1]
+    return float(laplacian.var())
+
+
+def sharpness_score(file_path):
+    """Sharpness of a photo at the common scoring size"""
+    from PIL import Image
+
+    with Image.open(file_path) as image:
+        scale = min(1.0, SCORE_LONG_EDGE / max(image.size))
+        target_size = (max(3, round(image.width * scale)), max(3, round(image.height * scale)))
+        image.draft('L', target_size)
+        gray = image.convert('L')
+        if gray.size != target_size:
+            gray = gray.resize(target_size, Image.Resampling.BOX)
+        return laplacian_variance(np.asarray(gray))
+
+
+def filename_date(filename):
+    """Date from the DDMonYYYY part of an organized photo's name, or None"""
+    match = DATE_PATTERN.search(filename)
+    if not match or match.group(2).lower() not in MONTHS:
+        return None
+    try:
+        return datetime(int(match.group(3)), MONTHS.index(match.group(2).lower()) + 1, int(match.group(1)))
+    except ValueError:
+        return None
+
+
+def load_scores(folder):
+    path = os.path.join(folder, SCORES_FILENAME)
+    if not os.path.exists(path):
+        return {'photos': {}}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A damaged file is only a cache, start over
+        return {'photos': {}}
+
+
+def save_scores(folder, scores):
+    # Write to a temp file first so the server never reads a half-written file
+    path = os.path.join(folder, SCORES_FILENAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(scores, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def choose_best(photos, window_days=BEST_WINDOW_DAYS):
+    """Sharpest recent photo per view, {view: filename}"""
+    best = {}
+    for view in BEST_VIEWS:
+        keyword = f" {view} "
+        dated = [(filename_date(filename), filename) for filename in photos if keyword in filename.upper()]
+        dated = [(date, filename) for date, filename in dated if date]
+        if not dated:
+            continue
+
+        newest = max(date for date, _ in dated)
+        recent = [filename for date, filename in dated if (newest - date).days <= window_days]
+        best[view] = max(recent, key=lambda filename: photos[filename]['sharpness'])
+    return best
+
+
+def score_folders(folders, workers=None, window_days=BEST_WINDOW_DAYS):
+    """Score new/changed photos in cow folders and update their best picks, returns how many were scored"""
+    pending = []
+    folder_scores = {}
+
+    for folder in folders:
+        scores = load_scores(folder)
+        photos = scores.get('photos', {})
+        current = {}
+        for entry in os.scandir(folder):
+            if not entry.is_file() or not any(entry.name.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
+                continue
+            stat = entry.stat()
+            known = photos.get(entry.name)
+            if known and known.get('size') == stat.st_size and known.get('mtime') == stat.st_mtime:
+                current[entry.name] = known
+            else:
+                current[entry.name] = {'sharpness': None, 'size': stat.st_size, 'mtime': stat.st_mtime}
+                pending.append((folder, entry.name))
+        # Photos that were deleted drop out here
+        scores['photos'] = current
+        folder_scores[folder] = scores
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            paths = [os.path.join(folder, filename) for folder, filename in pending]
+            for (folder, filename), future in zip(pending, [executor.submit(sharpness_score, path) for path in paths]):
+                try:
+                    folder_scores[folder]['photos'][filename]['sharpness'] = future.result()
+                except Exception as e:
+                    print(f"Could not score {filename}: {e}")
+                    del folder_scores[folder]['photos'][filename]
+
+    for folder, scores in folder_scores.items():
+        scores['best'] = choose_best(scores['photos'], window_days)
+        scores['best_window_days'] = window_days
+        save_scores(folder, scores)
+
+    return len(pending)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score cow photo sharpness and pick the best recent shots")
+    parser.add_argument('--photos', required=True, help="Cow Photos folder (one subfolder per cow)")
+    parser.add_argument('--tag', action='append', help="Only score this cow (can be repeated)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--window-days', type=int, default=BEST_WINDOW_DAYS,
+                        help=f"How much older than the newest photo the best pick may be (default {BEST_WINDOW_DAYS})")
+    args = parser.parse_args(argv)
+
+    if args.tag:
+        folders = [os.path.join(args.photos, tag) for tag in args.tag]
+    else:
+        folders = [entry.path for entry in os.scandir(args.photos) if entry.is_dir()]
+    missing = [folder for folder in folders if not os.path.isdir(folder)]
+    if missing:
+        print(f"Error: {', '.join(missing)} not found", file=sys.stderr)
+        return 1
+
+    scored_count = score_folders(folders, args.workers, args.window_days)
+    print(f"Scored {scored_count} photos in {len(folders)} cow folders")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
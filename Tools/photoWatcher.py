@@ -0,0 +1,283 @@
+# Watches an upload folder and files new cow photos away as they land, no dialogs.
+#
+# Ex;
+#   python photoWatcher.py --source D:/uploads --dest D:/CowPhotos
+#   python photoWatcher.py --source D:/uploads --dest D:/CowPhotos --once
+#
+# New files are noticed through watchdog (inotify, ReadDirectoryChangesW, FSEvents)
+# when it is installed, otherwise the folder is polled. Either way a photo is only
+# ingested once its size and modified time have stayed the same for --settle
+# seconds, so half-uploaded files are never copied.
+#
+# Settled photos are ingested in batches with the same tag parsing and naming as
+# photoCleaner.py, written by a bounded pool of workers. Ingested originals are
+# moved to --done (default <source>/ingested); a photo that was filed but couldn't
+# be moved, or a batch that failed, is logged and left alone until it changes.
+# With --max-edge, photos are downscaled and re-encoded on the way in, --normalize
+# bakes in the EXIF orientation and slims the metadata (see photoIngest.py), and
+# --archive keeps the untouched originals in a separate folder. --score updates the sharpness
+# scores the app uses to show the best recent HEAD/BODY shot (see photoQuality.py).
+#
+# Tags that photoCleaner would ask about (NT, UNKNOWN, long names...) can't be
+# confirmed by a person here. With --unusual hold (the default) they are left in
+# the upload folder for a manual photoCleaner.py run; with --unusual keep they
+# are filed under the tag as parsed. Photos with no tag are always left. With
+# --roster, unusual tags on the herd roster (or an unambiguous typo of one) are
+# filed under the roster tag instead (see cowRoster.py).
+
+import argparse
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from cowRoster import CowRoster
+from photoCleanerCore import DEFAULT_INGEST_QUALITY, CowPhotoOrganizer
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_POLL_SECONDS = 5.0
+DEFAULT_BATCH_SIZE = 200
+
+
+def log(message):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
+
+
+def unique_path(folder, filename):
+    """Path in folder that doesn't overwrite an existing file"""
+    stem, extension = os.path.splitext(filename)
+    path = os.path.join(folder, filename)
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(folder, f"{stem} ({counter}){extension}")
+        counter += 1
+    return path
+
+
+if Observer is not None:
+    class WakeHandler(FileSystemEventHandler):
+        """Wakes the watch loop on any change in the upload folder"""
+        def __init__(self, wake):
+            self.wake = wake
+
+        def on_any_event(self, event):
+            self.wake.set()
+
+
+class PhotoWatcher:
+    def __init__(self, source_folder, destination_folder, done_folder=None, settle=DEFAULT_SETTLE_SECONDS,
+                 poll_interval=DEFAULT_POLL_SECONDS, batch_size=DEFAULT_BATCH_SIZE, workers=4, unusual='hold',
+                 max_long_edge=None, quality=DEFAULT_INGEST_QUALITY, archive_folder=None, normalize=False, score=False,
+                 roster=None):
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.done_folder = done_folder or os.path.join(source_folder, 'ingested')
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.workers = workers
+        self.unusual = unusual
+        self.max_long_edge = max_long_edge
+        self.quality = quality
+        self.archive_folder = archive_folder
+        self.normalize = normalize
+        self.score = score
+        self.roster = roster
+
+        self.seen = {}  # filename -> ((size, mtime_ns), time first seen with that size/mtime)
+        self.held = {}  # filename -> (size, mtime_ns) of photos left for a person to sort
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.observer = None
+        self.ingested_count = 0
+
+    def start_observer(self):
+        """Use filesystem events when watchdog is available, returns True if it is"""
+        if Observer is None:
+            return False
+        self.observer = Observer()
+        self.observer.schedule(WakeHandler(self.wake), self.source_folder, recursive=False)
+        self.observer.start()
+        return True
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+
+    def settled_photos(self):
+        """Photos whose size and modified time haven't changed for the settle time"""
+        now = time.monotonic()
+        organizer = CowPhotoOrganizer()
+        current = {}
+        ready = []
+
+        with os.scandir(self.source_folder) as entries:
+            for entry in entries:
+                # Skip hidden/partial uploads, they get renamed to their real name when done
+                if entry.name.startswith('.') or not entry.is_file() or not organizer.is_photo(entry.name):
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self.held.get(entry.name) == signature:
+                    continue
+
+                previous = self.seen.get(entry.name)
+                first_seen = previous[1] if previous and previous[0] == signature else now
+                current[entry.name] = (signature, first_seen)
+                if now - first_seen < self.settle:
+                    continue
+                if stat.st_size:
+                    ready.append(entry.name)
+                else:
+                    log(f"Skipping empty file {entry.name}")
+                    self.held[entry.name] = signature
+                    del current[entry.name]
+
+        # Forget files that disappeared
+        self.seen = current
+        return sorted(ready)
+
+    def ingest(self, filenames):
+        """File one batch of photos away, returns how many were copied"""
+        organizer = CowPhotoOrganizer(self.source_folder, self.destination_folder, self.max_long_edge,
+                                      self.quality, self.archive_folder, self.workers, self.normalize, self.score,
+                                      self.roster)
+        for filename in filenames:
+            organizer.add_photo(filename)
+        organizer.resolve_tags()
+
+        held = list(organizer.no_tag_files)
+        if organizer.unusual_names and self.unusual == 'hold':
+            for tag in organizer.unusual_names:
+                held += organizer.cow_tags[tag]
+            organizer.apply_tag_decisions({tag: None for tag in organizer.unusual_names})
+        for filename in held:
+            self.hold(filename)
+        if held:
+            log(f"Left {len(held)} photos with no or unusual tags in {self.source_folder}")
+
+        organizer.organize_photos()
+
+        os.makedirs(self.done_folder, exist_ok=True)
+        copied_count = 0
+        for filename, _, _ in organizer.processed_files:
+            copied_count += 1
+            try:
+                shutil.move(os.path.join(self.source_folder, filename), unique_path(self.done_folder, filename))
+            except OSError as e:
+                # Already filed away, copying it again would only add a " (n)" duplicate
+                log(f"Ingested {filename} but could not move it to {self.done_folder}: {e}")
+                self.hold(filename)
+            self.seen.pop(filename, None)
+        for filename, error in organizer.skipped_files:
+            log(f"Could not ingest {filename}: {error}")
+            self.hold(filename)
+
+        self.ingested_count += copied_count
+        return copied_count
+
+    def hold(self, filename):
+        """Stop retrying a photo until it changes"""
+        try:
+            stat = os.stat(os.path.join(self.source_folder, filename))
+        except OSError:
+            return
+        self.held[filename] = (stat.st_size, stat.st_mtime_ns)
+
+    def run(self, once=False):
+        """Watch until stopped (or, with once, until everything present has been handled)"""
+        os.makedirs(self.destination_folder, exist_ok=True)
+        using_events = self.start_observer()
+        log(f"Watching {self.source_folder} ({'filesystem events' if using_events else 'polling'})")
+
+        try:
+            while not self.stopping.is_set():
+                ready = self.settled_photos()
+                for start in range(0, len(ready), self.batch_size):
+                    batch = ready[start:start + self.batch_size]
+                    try:
+                        copied_count = self.ingest(batch)
+                    except Exception as e:
+                        # Keep watching. Some of the batch may be filed already, so it isn't retried
+                        # until the photos change (or the watcher restarts)
+                        log(f"Ingest of {len(batch)} photos failed: {e}")
+                        for filename in batch:
+                            self.hold(filename)
+                        continue
+                    log(f"Ingested {copied_count} of {len(batch)} photos ({self.ingested_count} total)")
+
+                if once and not self.seen:
+                    break
+
+                # Unsettled files need another look after the settle time at the latest. With
+                # events the wait usually ends early, the interval is only a safety net
+                self.wake.wait(min(self.poll_interval, self.settle) if self.seen else self.poll_interval)
+                self.wake.clear()
+        finally:
+            if self.observer is not None:
+                self.observer.stop()
+                self.observer.join()
+
+        log(f"Stopped, ingested {self.ingested_count} photos")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch an upload folder and organize new cow photos")
+    parser.add_argument('--source', required=True, help="Upload folder to watch")
+    parser.add_argument('--dest', required=True, help="Organized photo folder (one subfolder per cow)")
+    parser.add_argument('--done', help="Where ingested originals are moved (default: <source>/ingested)")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help=f"Seconds a file must stay unchanged before it is ingested (default {DEFAULT_SETTLE_SECONDS})")
+    parser.add_argument('--poll', type=float, default=DEFAULT_POLL_SECONDS,
+                        help=f"Polling interval without watchdog, in seconds (default {DEFAULT_POLL_SECONDS})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Most photos ingested at once (default {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--workers', type=int, default=4, help="Photos written in parallel (default 4)")
+    parser.add_argument('--unusual', choices=['hold', 'keep'], default='hold',
+                        help="Unusual tags: leave them for photoCleaner.py (hold) or file them as parsed (keep)")
+    parser.add_argument('--max-edge', type=int,
+                        help="Downscale photos whose long edge is larger than this many pixels (default: keep size)")
+    parser.add_argument('--quality', type=int, default=DEFAULT_INGEST_QUALITY,
+                        help=f"JPEG quality for downscaled photos (default {DEFAULT_INGEST_QUALITY})")
+    parser.add_argument('--normalize', action='store_true',
+                        help="Bake in the EXIF orientation and keep only the capture date and GPS metadata")
+    parser.add_argument('--score', action='store_true',
+                        help="Score photo sharpness so the app shows the best recent HEAD/BODY shot")
+    parser.add_argument('--roster',
+                        help="Folder of sheet exports (*instance.json) to resolve mistyped tags against")
+    parser.add_argument('--archive', help="Folder to keep untouched originals in (<tag>/<name>, like --dest)")
+    parser.add_argument('--once', action='store_true', help="Ingest what is in the folder now, then exit")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        print(f"Error: {args.source} is not a folder", file=sys.stderr)
+        return 1
+
+    roster = None
+    if args.roster:
+        roster = CowRoster.from_folder(args.roster, args.dest)
+        log(f"Loaded {len(roster)} roster tags")
+
+    watcher = PhotoWatcher(args.source, args.dest, args.done, args.settle, args.poll,
+                           args.batch_size, args.workers, args.unusual, args.max_edge, args.quality, args.archive,
+                           args.normalize, args.score, roster)
+
+    # Finish the current batch on Ctrl+C / service stop
+    signal.signal(signal.SIGINT, lambda signum, frame: watcher.stop())
+    signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+
+    watcher.run(args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+# Headless batch jobs for the map tools. Nothing here opens a window, so these
+# can run as scheduled jobs on a machine without a display.
+#
+# Ex;
+#   python photomapBatch.py minimaps --data MapData.json --image map.png --out minimaps
+#   python photomapBatch.py minimaps --data MapData.json --image map.png --out files/MapData/minimaps
+#   python photomapBatch.py tiles --image map.png --out tiles --data MapData.json --overlays
+#   python photomapBatch.py render --image source.png --data MapData.json --out map.png --scale 0.5
+#   python photomapBatch.py locate --data MapData.json --points pings.csv --out pings_fields.csv
+#   python photomapBatch.py locate --data MapData.json --points gps.csv --out gps_fields.csv --lonlat
+#   python photomapBatch.py rescale --data MapData.json --scale 0.5 --out MapData_half.json
+#   python photomapBatch.py import --data MapData.json --file fences.kml
+#   python photomapBatch.py export --data MapData.json --out fields.geojson
+#
+# Exits with a non-zero status if anything fails.
+#
+# Imaging modules are only imported by the commands that need them, so the CLI
+# starts quickly and never touches tkinter.
+
+import argparse
+import sys
+
+from mapProfiler import profiler
+
+
+def run_minimaps(args):
+    """Regenerate centers and radii, then write minimaps and the updated map data"""
+    from minimapBuilder import MinimapBuilder, TIER_FORMATS, server_cache_dir
+    
+    unknown_formats = [name for name in args.formats if name not in TIER_FORMATS]
+    if unknown_formats:
+        raise ValueError(f"Unknown format(s) {', '.join(unknown_formats)}, choose from {', '.join(TIER_FORMATS)}")
+        
+    # The server's image cache only serves JPEGs, anything else there would just take up space
+    tier_dir = args.tier_dir or server_cache_dir(args.out)
+    other_formats = [name for name in args.formats if name != 'jpeg']
+    if other_formats and tier_dir and not args.tier_dir:
+        raise ValueError(f"The server's image cache only serves jpeg tiers, use --tier-dir to write "
+                         f"{', '.join(other_formats)} tiers somewhere else")
+        
+    builder = MinimapBuilder()
+    
+    field_count = builder.read_map_data(args.data)
+    width, height = builder.read_map_image(args.image, args.cache_dir)
+    print(f"Loaded {field_count} fields and a {width}x{height} map image")
+    
+    if not field_count:
+        raise ValueError("No fields found in map data")
+        
+    if not args.keep_centers:
+        updated_count = builder.compute_centers()
+        print(f"Regenerated centers for {updated_count} fields")
+        
+    created_count = builder.build_minimaps()
+    if not created_count:
+        raise ValueError("No valid minimaps could be generated")
+        
+    saved_count = builder.write_minimaps(args.out)
+    print(f"Saved {saved_count} minimaps to {args.out}")
+    
+    if args.formats:
+        # By default straight into the server's image cache, which also replaces tiers of the old minimaps
+        if tier_dir:
+            tier_count = builder.write_minimap_tiers(tier_dir, args.formats)
+            print(f"Saved {tier_count} size tier files to {tier_dir}")
+        else:
+            print(f"Skipped the size tiers, {args.out} isn't a server MapData/minimaps folder (use --tier-dir)")
+    
+    data_out = args.data_out or args.data
+    builder.write_map_data(data_out)
+    print(f"Saved map data to {data_out}")
+
+
+def run_tiles(args):
+    """Cut the map (optionally with field overlays) into a tile pyramid"""
+    import json
+    from mapCache import open_map_image
+    from mapRender import fields_from_map_data, map_marker_scale, render_field_overlays
+    from mapTiles import export_tiles
+    
+    image = open_map_image(args.image, args.cache_dir)
+    print(f"Loaded a {image.width}x{image.height} map image")
+    
+    if args.overlays:
+        if not args.data:
+            raise ValueError("--overlays needs --data")
+        with open(args.data, 'r') as f:
+            fields = fields_from_map_data(json.load(f))
+        # Markers sized like render_map_file(), so they stay visible as the levels shrink
+        image = render_field_overlays(image.convert('RGB'), fields, 1.0,
+                                      marker_scale=map_marker_scale(image.width, image.height))
+        print(f"Drew {len(fields)} fields")
+        
+    manifest = export_tiles(image, args.out, args.format, args.quality, args.tile_size)
+    for z in range(manifest['max_zoom'], manifest['min_zoom'] - 1, -1):
+        level = manifest['levels'][str(z)]
+        print(f"Zoom {z}: {level['columns'] * level['rows']} tiles ({level['width']}x{level['height']})")
+    print(f"Saved zoom levels {manifest['min_zoom']}-{manifest['max_zoom']} to {args.out}")
+
+
+def run_render(args):
+    """Render the map with field overlays at full (or scaled) resolution"""
+    import json
+    from mapCache import open_map_image
+    from mapRender import fields_from_map_data, render_map_file
+    
+    image = open_map_image(args.image, args.cache_dir)
+    print(f"Loaded a {image.width}x{image.height} map image")
+    
+    fields = []
+    if not args.no_overlays:
+        with open(args.data, 'r') as f:
+            fields = fields_from_map_data(json.load(f))
+            
+    width, height = render_map_file(image, fields, args.out, args.scale, args.opacity, args.text_size)
+    print(f"Saved {width}x{height} map with {len(fields)} fields to {args.out}")
+
+
+def run_locate(args):
+    """Add the containing field to every x,y row of a CSV"""
+    import csv
+    import json
+    from pastureIndex import PastureIndex
+    
+    with open(args.data, 'r') as f:
+        map_data = json.load(f)
+    index = PastureIndex.from_map_data(map_data)
+    print(f"Indexed {len(index.names)} fields")
+    
+    transform = None
+    if args.lonlat:
+        from mapGeoref import GeoTransform
+        transform = GeoTransform.from_map_data(map_data)
+        if transform is None:
+            raise ValueError(f"{args.data} is not georeferenced, add control points in the editor first")
+    x_column = args.x_column or ('lon' if args.lonlat else 'x')
+    y_column = args.y_column or ('lat' if args.lonlat else 'y')
+    
+    located_count = 0
+    unreadable_count = 0
+    row_count = 0
+    with open(args.points, 'r', newline='') as in_file, open(args.out, 'w', newline='') as out_file:
+        reader = csv.DictReader(in_file)
+        if not reader.fieldnames or x_column not in reader.fieldnames or y_column not in reader.fieldnames:
+            raise ValueError(f"{args.points} needs '{x_column}' and '{y_column}' columns")
+            
+        writer = csv.DictWriter(out_file, fieldnames=reader.fieldnames + [args.field_column])
+        writer.writeheader()
+        
+        # Classify in chunks so huge ping logs never have to fit in memory
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == args.chunk_size:
+                located, unreadable = write_located_rows(index, transform, chunk, writer, x_column, y_column,
+                                                         args.field_column)
+                located_count += located
+                unreadable_count += unreadable
+                row_count += len(chunk)
+                chunk = []
+        if chunk:
+            located, unreadable = write_located_rows(index, transform, chunk, writer, x_column, y_column,
+                                                     args.field_column)
+            located_count += located
+            unreadable_count += unreadable
+            row_count += len(chunk)
+            
+    print(f"Located {located_count} of {row_count} points, saved to {args.out}")
+    if unreadable_count:
+        print(f"{unreadable_count} rows had no usable '{x_column}'/'{y_column}' values, their field was left blank")
+
+
+def write_located_rows(index, transform, rows, writer, x_column, y_column, field_column):
+    """Locate and write one chunk of CSV rows, returns (rows inside a field, rows without coordinates)"""
+    points = []
+    readable_rows = []
+    for row in rows:
+        row[field_column] = ''
+        try:
+            points.append((float(row[x_column]), float(row[y_column])))
+        except (TypeError, ValueError):
+            # Empty or garbled cell (or a short row), left without a field
+            continue
+        readable_rows.append(row)
+        
+    names = []
+    if points:
+        if transform is not None:
+            points = transform.to_pixel(points)
+        names = index.locate_names(points)
+        for row, name in zip(readable_rows, names):
+            row[field_column] = name or ''
+    writer.writerows(rows)
+    return sum(1 for name in names if name), len(rows) - len(readable_rows)
+
+
+def run_rescale(args):
+    """Rescale map data to a resized map image"""
+    from mapData import read_map_data, rescale_map_data, write_map_data
+    
+    if args.scale <= 0:
+        raise ValueError("--scale must be positive")
+        
+    map_data = rescale_map_data(read_map_data(args.data), args.scale)
+    write_map_data(map_data, args.out)
+    map_size = map_data.get('map_size') or {}
+    print(f"Saved {len(map_data.get('fields', []))} fields for a "
+          f"{map_size.get('width')}x{map_size.get('height')} map to {args.out}")
+
+
+def load_georeferenced(data_path):
+    """Map data and its transform, fails if the map has no georeference"""
+    from mapData import read_map_data
+    from mapGeoref import GeoTransform
+    
+    map_data = read_map_data(data_path)
+    transform = GeoTransform.from_map_data(map_data)
+    if transform is None:
+        raise ValueError(f"{data_path} is not georeferenced, add control points in the editor first")
+    return map_data, transform
+
+
+def run_import(args):
+    """Add (or replace) fields from a GeoJSON/KML boundary file"""
+    from mapData import annotate_map_data, write_map_data
+    from mapExchange import import_fields
+    
+    map_data, transform = load_georeferenced(args.data)
+    map_size = map_data.get('map_size') or {}
+    if not map_size.get('width') or not map_size.get('height'):
+        raise ValueError(f"{args.data} has no map_size")
+        
+    fields = import_fields(args.file, transform, map_size['width'], map_size['height'])
+    print(f"Read {len(fields)} boundaries from {args.file}")
+    
+    if args.replace:
+        map_data['fields'] = fields
+    else:
+        map_data.setdefault('fields', []).extend(fields)
+        
+    data_out = args.out or args.data
+    write_map_data(annotate_map_data(map_data), data_out)
+    print(f"Saved {len(map_data['fields'])} fields to {data_out}")
+
+
+def run_export(args):
+    """Write the fields as GeoJSON/KML"""
+    from mapExchange import export_fields
+    
+    map_data, transform = load_georeferenced(args.data)
+    count = export_fields(map_data.get('fields', []), transform, args.out)
+    print(f"Exported {count} fields to {args.out}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch jobs for the map tools")
+    parser.add_argument('--profile-json', help="Write stage timings and counters to this JSON file when done")
+    parser.add_argument('--cprofile', action='store_true', help="Include a cProfile summary in --profile-json")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    minimaps = subparsers.add_parser('minimaps', help="Regenerate centers and export minimaps")
+    minimaps.add_argument('--data', required=True, help="MapData.json to read")
+    minimaps.add_argument('--image', required=True, help="Map image the fields were traced on")
+    minimaps.add_argument('--out', required=True, help="Folder to write minimaps to")
+    minimaps.add_argument('--cache-dir', help="Raw map cache folder (default: $PHOTOMAP_CACHE_DIR, off if unset)")
+    minimaps.add_argument('--data-out', help="Where to write the updated map data (default: overwrite --data)")
+    minimaps.add_argument('--keep-centers', action='store_true',
+                          help="Use the existing pinpoints and radii instead of regenerating them")
+    minimaps.add_argument('--formats', nargs='*', default=['jpeg'],
+                          help="Formats to pre-encode the thumb/medium/high size tiers in: jpeg, webp (none to skip). "
+                               "The server only serves jpeg, so webp needs --tier-dir and is for serving elsewhere")
+    minimaps.add_argument('--tier-dir', help="Folder for the size tier files (default: the server's image-cache "
+                                             "next to MapData when --out is <LOCAL_PATH>/MapData/minimaps)")
+    minimaps.set_defaults(func=run_minimaps)
+    
+    tiles = subparsers.add_parser('tiles', help="Export the map as a zoom pyramid of tiles")
+    tiles.add_argument('--image', required=True, help="Map image to cut into tiles")
+    tiles.add_argument('--out', required=True, help="Folder to write <z>/<x>/<y> tiles and manifest.json to")
+    tiles.add_argument('--data', help="MapData.json, needed for --overlays")
+    tiles.add_argument('--overlays', action='store_true', help="Draw the fields onto the tiles")
+    tiles.add_argument('--format', default='webp', help="Tile format: webp or jpeg (default webp)")
+    tiles.add_argument('--quality', type=int, default=75, help="Encoder quality (default 75)")
+    tiles.add_argument('--tile-size', type=int, default=256, help="Tile width and height in pixels (default 256)")
+    tiles.add_argument('--cache-dir', help="Raw map cache folder (default: $PHOTOMAP_CACHE_DIR, off if unset)")
+    tiles.set_defaults(func=run_tiles)
+    
+    render = subparsers.add_parser('render', help="Render map.png/MapCombined.png with field overlays")
+    render.add_argument('--image', required=True, help="Original map image")
+    render.add_argument('--data', help="MapData.json with the fields to draw")
+    render.add_argument('--out', default='map.png', help="PNG to write (default map.png)")
+    render.add_argument('--scale', type=float, default=1.0, help="Output size relative to the original (default 1.0)")
+    render.add_argument('--no-overlays', action='store_true', help="Render the plain map without fields")
+    render.add_argument('--opacity', type=float, default=30, help="Field fill opacity in percent (default 30)")
+    render.add_argument('--text-size', type=int, default=12, help="Label size as shown in the editor (default 12)")
+    render.add_argument('--cache-dir', help="Raw map cache folder (default: $PHOTOMAP_CACHE_DIR, off if unset)")
+    render.set_defaults(func=run_render)
+    
+    locate = subparsers.add_parser('locate', help="Find the field each point (e.g. a collar ping) is in")
+    locate.add_argument('--data', required=True, help="MapData.json with the fields")
+    locate.add_argument('--points', required=True, help="CSV with a header row and map pixel x/y (or lon/lat) columns")
+    locate.add_argument('--out', required=True, help="CSV to write, the input rows plus a field column")
+    locate.add_argument('--lonlat', action='store_true',
+                        help="Points are longitude/latitude, converted with the map's georeference")
+    locate.add_argument('--x-column', help="Column holding the x coordinate (default x, or lon with --lonlat)")
+    locate.add_argument('--y-column', help="Column holding the y coordinate (default y, or lat with --lonlat)")
+    locate.add_argument('--field-column', default='field', help="Column to write the field name to (default field)")
+    locate.add_argument('--chunk-size', type=int, default=50000, help="Rows classified per batch (default 50000)")
+    locate.set_defaults(func=run_locate)
+    
+    rescale = subparsers.add_parser('rescale', help="Rescale map data for a resized map image")
+    rescale.add_argument('--data', required=True, help="MapData.json to read")
+    rescale.add_argument('--scale', type=float, required=True, help="New image size relative to the current one")
+    rescale.add_argument('--out', required=True, help="Where to write the rescaled map data")
+    rescale.set_defaults(func=run_rescale)
+    
+    import_parser = subparsers.add_parser('import', help="Add fields from a GeoJSON/KML boundary file")
+    import_parser.add_argument('--data', required=True, help="Georeferenced MapData.json to add the fields to")
+    import_parser.add_argument('--file', required=True, help="Boundary file: .geojson, .json or .kml")
+    import_parser.add_argument('--out', help="Where to write the map data (default: overwrite --data)")
+    import_parser.add_argument('--replace', action='store_true', help="Replace the existing fields instead of adding")
+    import_parser.set_defaults(func=run_import)
+    
+    export = subparsers.add_parser('export', help="Export the fields as GeoJSON/KML")
+    export.add_argument('--data', required=True, help="Georeferenced MapData.json")
+    export.add_argument('--out', required=True, help="File to write, .geojson, .json or .kml")
+    export.set_defaults(func=run_export)
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'render' and not args.no_overlays and not args.data:
+        parser.error("render needs --data unless --no-overlays is given")
+    
+    if args.cprofile:
+        profiler.start_profile()
+        
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.cprofile:
+            profiler.stop_profile()
+        if args.profile_json:
+            profiler.dump_json(args.profile_json)
+            
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, simpledialog
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk
+import copy
 import json
 import os
-import math
+from datetime import datetime
+from editHistory import EditHistory
+from editJournal import EditJournal, apply_edit, journal_path, read_journal
+from fieldList import FieldList
+from mapCache import open_map_image
+from mapData import annotate_map_data, write_map_data
+from mapEdges import EdgeMap
+from mapExchange import export_fields, import_fields
+from mapGeometry import calculate_field_radius
+from mapGeoref import GeoTransform, MIN_CONTROL_POINTS, solve_georef
+from mapRender import field_display_box, load_label_font, render_field_overlays, render_field_region, render_map_file
+from mapProfiler import profiler, timed
+from profilerPanel import ProfilerPanel
+
+# Edits that add, remove or reorder finished fields
+FIELD_LIST_OPS = ('finish_field', 'unfinish_field', 'add_fields', 'remove_fields', 'delete_field', 'insert_field')
 
 class MapSegmentationTool:
     def __init__(self, root):
@@ -29,6 +45,7 @@ class MapSegmentationTool:
         self.last_pan_y = 0
         self.is_panning = False
         self.image_scale = 1.0  # Actual scale used for image resizing (for performance)
+        self.edge_map = None  # Edge magnitudes for snapping, per loaded image
         
         # Field data
         self.fields = []
@@ -37,6 +54,14 @@ class MapSegmentationTool:
         self.unnamed_field_count = 0
         self.selected_field_index = None
         self.moving_pin_mode = False
+        self.meters_per_pixel = None  # Map scale, when known, for field areas in acres
+        self.journal = None  # Autosave journal of the edits to the loaded map
+        self.history = EditHistory()  # Undo/redo as pairs of journal records
+        
+        # Georeferencing
+        self.control_points = []  # [{'pixel': [x, y], 'lonlat': [lon, lat]}, ...]
+        self.georef = None  # Solved transform, only kept while it matches control_points
+        self.adding_control_points = False
         
         # Colors for fields
         self.colors = [
@@ -59,6 +84,10 @@ class MapSegmentationTool:
         ttk.Button(top_frame, text="Select Source File", command=self.select_source_file).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(top_frame, text="Select Output Location", command=self.select_output_location).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(top_frame, text="Load Existing Data", command=self.load_existing_data).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(top_frame, text="Import Boundaries", command=self.import_boundaries).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(top_frame, text="Export Boundaries", command=self.export_boundaries).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(top_frame, text="Debug Stats", command=self.show_debug_panel).pack(side=tk.RIGHT)
+        self.root.bind("<F12>", lambda e: self.show_debug_panel())
         
         self.source_label = ttk.Label(top_frame, text="No source file selected")
         self.source_label.pack(side=tk.LEFT, padx=(20, 0))
@@ -82,8 +111,19 @@ class MapSegmentationTool:
         self.finish_field_btn = ttk.Button(controls_frame, text="Finish Field", command=self.finish_field, state=tk.DISABLED)
         self.finish_field_btn.pack(fill=tk.X, pady=5)
         
-        self.undo_btn = ttk.Button(controls_frame, text="Undo Last Point", command=self.undo_last_point, state=tk.DISABLED)
-        self.undo_btn.pack(fill=tk.X, pady=5)
+        history_frame = ttk.Frame(controls_frame)
+        history_frame.pack(fill=tk.X, pady=5)
+        self.undo_btn = ttk.Button(history_frame, text="Undo", command=self.undo, state=tk.DISABLED)
+        self.undo_btn.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 2))
+        self.redo_btn = ttk.Button(history_frame, text="Redo", command=self.redo, state=tk.DISABLED)
+        self.redo_btn.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(2, 0))
+        self.root.bind("<Control-z>", lambda e: self.undo())
+        self.root.bind("<Control-y>", lambda e: self.redo())
+        self.root.bind("<Control-Z>", lambda e: self.redo())  # Ctrl+Shift+Z
+        
+        self.snap_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls_frame, text="Snap to Edges (Shift: place freely)",
+                        variable=self.snap_var, command=self.on_snap_toggled).pack(anchor=tk.W, pady=5)
         
         # Field selection and pin moving
         selection_frame = ttk.LabelFrame(left_panel, text="Field Selection")
@@ -98,25 +138,36 @@ class MapSegmentationTool:
         self.move_pin_btn = ttk.Button(selection_frame, text="Move Pin", command=self.start_move_pin, state=tk.DISABLED)
         self.move_pin_btn.pack(fill=tk.X, padx=5, pady=5)
         
-        # Legend
-        legend_frame = ttk.LabelFrame(left_panel, text="Fields Legend")
-        legend_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.delete_field_btn = ttk.Button(selection_frame, text="Delete Field", command=self.delete_field,
+                                           state=tk.DISABLED)
+        self.delete_field_btn.pack(fill=tk.X, padx=5, pady=(0, 5))
         
-        # Create scrollable legend
-        legend_canvas = tk.Canvas(legend_frame, bg='white')
-        legend_scrollbar = ttk.Scrollbar(legend_frame, orient="vertical", command=legend_canvas.yview)
-        self.legend_frame_inner = ttk.Frame(legend_canvas)
+        # Georeferencing controls
+        georef_frame = ttk.LabelFrame(left_panel, text="Georeference")
+        georef_frame.pack(fill=tk.X, pady=(0, 10))
         
-        self.legend_frame_inner.bind(
-            "<Configure>",
-            lambda e: legend_canvas.configure(scrollregion=legend_canvas.bbox("all"))
-        )
+        self.control_point_btn = ttk.Button(georef_frame, text="Add Control Points", command=self.toggle_control_points)
+        self.control_point_btn.pack(fill=tk.X, padx=5, pady=2)
+        
+        kind_frame = ttk.Frame(georef_frame)
+        kind_frame.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Label(kind_frame, text="Transform:").pack(side=tk.LEFT)
+        self.georef_kind_var = tk.StringVar(value='affine')
+        ttk.Combobox(kind_frame, textvariable=self.georef_kind_var, values=list(MIN_CONTROL_POINTS),
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=(5, 0))
+        
+        ttk.Button(georef_frame, text="Solve Transform", command=self.solve_transform).pack(fill=tk.X, padx=5, pady=2)
+        ttk.Button(georef_frame, text="Clear Control Points", command=self.clear_control_points).pack(fill=tk.X, padx=5, pady=2)
+        
+        self.georef_label = ttk.Label(georef_frame, text="No control points")
+        self.georef_label.pack(anchor=tk.W, padx=5, pady=2)
         
-        legend_canvas.create_window((0, 0), window=self.legend_frame_inner, anchor="nw")
-        legend_canvas.configure(yscrollcommand=legend_scrollbar.set)
+        # Legend
+        legend_frame = ttk.LabelFrame(left_panel, text="Fields Legend")
+        legend_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
-        legend_canvas.pack(side="left", fill="both", expand=True)
-        legend_scrollbar.pack(side="right", fill="y")
+        # Scrollable legend, only the rows in view have widgets
+        self.legend = FieldList(legend_frame)
         
         # Map display area
         map_frame = ttk.Frame(middle_frame)
@@ -201,6 +252,11 @@ class MapSegmentationTool:
                         self.fields.append(field)
                         self.color_index += 1
                 
+                self.meters_per_pixel = data.get('meters_per_pixel')
+                self.georef = data.get('georef')
+                self.control_points = list(self.georef['control_points']) if self.georef else []
+                self.update_georef_label()
+                
                 # Update map size if available
                 if 'map_size' in data:
                     map_size = data['map_size']
@@ -213,12 +269,77 @@ class MapSegmentationTool:
                 if self.original_image:
                     self.redraw_fields()
                     
+                # The loaded data replaces everything, journal from here
+                self.history.clear()
+                self.update_edit_buttons()
+                if self.journal:
+                    self.journal.start(self.journal_state())
                         
                 messagebox.showinfo("Success", f"Loaded {len(self.fields)} fields from {os.path.basename(file_path)}")
                 
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load data: {str(e)}")
         
+    def import_boundaries(self):
+        """Add fields from a GeoJSON/KML file of lon/lat boundaries"""
+        if not self.georef:
+            messagebox.showwarning("Warning", "Please georeference the map (add control points and solve) first.")
+            return
+            
+        file_path = filedialog.askopenfilename(
+            title="Import Boundaries",
+            filetypes=[("Boundary files", "*.geojson *.json *.kml"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+            
+        try:
+            imported = import_fields(file_path, GeoTransform.from_georef(self.georef), self.map_width, self.map_height)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import boundaries: {str(e)}")
+            return
+            
+        new_fields = []
+        for field_data in imported:
+            new_fields.append({
+                'name': field_data['fieldname'],
+                'color': field_data.get('color', self.colors[self.color_index % len(self.colors)]),
+                'pin_location': field_data['pinpoint'],
+                'points': field_data['points']
+            })
+            self.color_index += 1
+        self.perform({'op': 'add_fields', 'fields': new_fields}, {'op': 'remove_fields', 'count': len(new_fields)})
+        messagebox.showinfo("Success", f"Imported {len(imported)} fields from {os.path.basename(file_path)}")
+        
+    def export_boundaries(self):
+        """Write the fields to a GeoJSON/KML file in lon/lat"""
+        if not self.georef:
+            messagebox.showwarning("Warning", "Please georeference the map (add control points and solve) first.")
+            return
+            
+        if not self.fields:
+            messagebox.showwarning("Warning", "No fields to export.")
+            return
+            
+        file_path = filedialog.asksaveasfilename(
+            title="Export Boundaries",
+            defaultextension=".geojson",
+            filetypes=[("GeoJSON", "*.geojson"), ("KML", "*.kml")]
+        )
+        if not file_path:
+            return
+            
+        try:
+            map_data = annotate_map_data(self.build_map_data())
+            count = export_fields(map_data['fields'], GeoTransform.from_georef(self.georef), file_path)
+            messagebox.showinfo("Success", f"Exported {count} fields to {os.path.basename(file_path)}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export boundaries: {str(e)}")
+        
+    def show_debug_panel(self):
+        """Open the timing/counter debug window"""
+        ProfilerPanel(self.root)
+        
     def update_text_size(self, value=None):
         """Update text size and redraw fields"""
         self.text_size_label.config(text=f"{int(self.text_size_var.get())}pt")
@@ -232,8 +353,9 @@ class MapSegmentationTool:
             
     def load_map_image(self):
         try:
-            self.original_image = Image.open(self.source_file)
+            self.original_image = open_map_image(self.source_file)
             self.map_width, self.map_height = self.original_image.size
+            self.edge_map = EdgeMap(self.original_image)
             
             # Reset zoom and pan when loading new image
             self.zoom_level = 1.0
@@ -252,11 +374,160 @@ class MapSegmentationTool:
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
+            return
+            
+        self.open_journal()
+        
+    def journal_state(self):
+        """Everything the autosave journal needs to rebuild the edits"""
+        return {
+            'fields': self.fields,
+            'current_field': self.current_field,
+            'control_points': self.control_points,
+            'georef': self.georef,
+            'meters_per_pixel': self.meters_per_pixel
+        }
+        
+    def open_journal(self):
+        """Offer to recover unsaved edits to this map, then journal the edits from here on"""
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+            
+        path = journal_path(self.source_file)
+        try:
+            state, edit_count = read_journal(path)
+        except Exception as e:
+            print(f"Could not read edit journal {path}: {e}")
+            state, edit_count = None, 0
+            
+        if state is not None and (edit_count or state['fields'] or state['current_field']):
+            saved_at = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M')
+            if messagebox.askyesno("Recover Edits",
+                                   f"This map has unsaved work from {saved_at} ({len(state['fields'])} fields, "
+                                   f"{edit_count} edits since the last start).\n\nRecover it?"):
+                self.restore_state(state)
+                
+        # Starting over from the current state also compacts the journal
+        try:
+            self.journal = EditJournal(path)
+            self.journal.start(self.journal_state())
+        except OSError as e:
+            self.journal = None
+            messagebox.showwarning("Warning", f"Edits can't be autosaved: {str(e)}")
+            
+    def restore_state(self, state):
+        """Put recovered fields, field in progress and georeference back into the editor"""
+        self.fields = state['fields']
+        self.current_field = state['current_field']
+        self.current_points = list(self.current_field['points']) if self.current_field else []
+        self.control_points = state['control_points']
+        self.georef = state['georef']
+        self.meters_per_pixel = state['meters_per_pixel']
+        self.color_index = len(self.fields) + (1 if self.current_field else 0)
+        
+        self.history.clear()
+        self.update_edit_buttons()
+        self.update_georef_label()
+        self.update_field_dropdown()
+        self.update_legend()
+        self.redraw_fields()
+        
+    def log_edit(self, op, **values):
+        """Record an edit in the autosave journal"""
+        if not self.journal:
+            return
+        try:
+            self.journal.append(op, **values)
+        except OSError as e:
+            self.journal = None
+            messagebox.showwarning("Warning", f"Autosave stopped: {str(e)}")
+            
+    def perform(self, edit, inverse):
+        """Make an edit (a journal record) that inverse undoes"""
+        self.apply(edit)
+        self.history.record(edit, inverse)
+        self.update_edit_buttons()
+        
+    def undo(self):
+        if self.history.can_undo():
+            self.apply(self.history.undo())
+            self.update_edit_buttons()
+            
+    def redo(self):
+        if self.history.can_redo():
+            self.apply(self.history.redo())
+            self.update_edit_buttons()
+            
+    def apply(self, record):
+        """Apply a journal record to the editor, journal it and redraw only what it changed"""
+        font = load_label_font(int(self.text_size_var.get()))
+        boxes = [field_display_box(field, self.image_scale, font) for field in self.edited_fields(record)]
+        
+        state = self.journal_state()
+        apply_edit(state, record)
+        self.current_field = state['current_field']
+        self.current_points = list(self.current_field['points']) if self.current_field else []
+        self.control_points = state['control_points']
+        self.georef = state['georef']
+        self.meters_per_pixel = state['meters_per_pixel']
+        self.log_edit(**record)
+        
+        op = record['op']
+        if op in FIELD_LIST_OPS:
+            # Indices shift, don't leave a different field selected
+            if op not in ('finish_field', 'add_fields'):
+                self.selected_field_index = None
+                self.field_var.set("")
+                self.cancel_move_pin()
+            self.update_legend()
+            self.update_field_dropdown()
+            
+        if op == 'georef':
+            self.update_georef_label()
+            self.update_canvas()
+            return
             
+        boxes += [field_display_box(field, self.image_scale, font) for field in self.edited_fields(record)]
+        self.redraw_region([box for box in boxes if box])
+        
+    def edited_fields(self, record):
+        """Fields a record changes, before or after applying it"""
+        op = record['op']
+        if op in ('move_pin', 'delete_field', 'insert_field'):
+            return self.fields[record['index']:record['index'] + 1]
+        if op in ('add_fields', 'remove_fields'):
+            count = record['count'] if op == 'remove_fields' else len(record['fields'])
+            return self.fields[max(0, len(self.fields) - count):]
+            
+        fields = [self.current_field] if self.current_field else []
+        if op in ('finish_field', 'unfinish_field') and self.fields:
+            fields.append(self.fields[-1])
+        return fields
+        
+    def update_edit_buttons(self):
+        """Enable the field and undo/redo buttons that apply right now"""
+        in_progress = self.current_field is not None
+        self.finish_field_btn.config(state=tk.NORMAL if in_progress else tk.DISABLED)
+        self.create_field_btn.config(state=tk.DISABLED if in_progress else tk.NORMAL)
+        self.undo_btn.config(state=tk.NORMAL if self.history.can_undo() else tk.DISABLED)
+        self.redo_btn.config(state=tk.NORMAL if self.history.can_redo() else tk.DISABLED)
+        
+    def georef_edit(self, control_points, georef, meters_per_pixel):
+        return {'op': 'georef', 'control_points': control_points, 'georef': georef,
+                'meters_per_pixel': meters_per_pixel}
+        
+    def current_georef_edit(self):
+        """Record that puts the georeference back as it is now"""
+        return self.georef_edit(self.control_points, self.georef, self.meters_per_pixel)
+            
+    @timed('update_display_image')
     def update_display_image(self):
         if not self.original_image:
             return
             
+        profiler.count('resizes')
+            
         # For performance: only resize image moderately, let canvas handle the rest
         # Use a reasonable maximum display size to prevent lag
         max_display_size = 2048
@@ -276,7 +547,16 @@ class MapSegmentationTool:
         
         self.redraw_fields()
         self.update_canvas()
+        
+        if self.snap_var.get() and self.edge_map:
+            self.edge_map.warm(self.image_scale)
+            
+    def on_snap_toggled(self):
+        """Start building the edge map for the current zoom as soon as snapping is switched on"""
+        if self.snap_var.get() and self.edge_map:
+            self.edge_map.warm(self.image_scale)
             
+    @timed('update_canvas')
     def update_canvas(self):
         if self.display_image:
             self.photo = ImageTk.PhotoImage(self.display_image)
@@ -288,6 +568,14 @@ class MapSegmentationTool:
             
             self.canvas.create_image(image_x, image_y, anchor=tk.NW, image=self.photo)
             
+            # Control point markers are canvas items so they follow panning without a redraw
+            for i, point in enumerate(self.control_points):
+                marker_x = image_x + point['pixel'][0] * self.image_scale
+                marker_y = image_y + point['pixel'][1] * self.image_scale
+                self.canvas.create_oval(marker_x - 6, marker_y - 6, marker_x + 6, marker_y + 6,
+                                        outline="#FF00FF", width=2)
+                self.canvas.create_text(marker_x + 9, marker_y - 9, text=str(i + 1), fill="#FF00FF", anchor=tk.W)
+            
             # Update scroll region to allow panning beyond visible area
             bbox = self.canvas.bbox("all")
             if bbox:
@@ -307,20 +595,8 @@ class MapSegmentationTool:
         # Get color for this field
         color = self.colors[self.color_index % len(self.colors)]
         
-        self.current_field = {
-            'name': field_name,
-            'color': color,
-            'points': [],
-            'pin_location': None
-        }
-        
-        self.current_points = []
         self.color_index += 1
-        
-        # Enable finish button and undo button
-        self.finish_field_btn.config(state=tk.NORMAL)
-        self.create_field_btn.config(state=tk.DISABLED)
-        self.undo_btn.config(state=tk.DISABLED)  # No points to undo yet
+        self.perform({'op': 'new_field', 'name': field_name, 'color': color}, {'op': 'cancel_field'})
         
         messagebox.showinfo("Info", f"Click on the map to add points for '{field_name}'. Click 'Finish Field' when done.")
         
@@ -348,12 +624,16 @@ class MapSegmentationTool:
         
         # Handle pin moving mode
         if self.moving_pin_mode and self.selected_field_index is not None:
-            self.fields[self.selected_field_index]['pin_location'] = [x, y]
-            self.moving_pin_mode = False
-            self.move_pin_btn.config(text="Move Pin")
-            self.canvas.config(cursor="crosshair")
-            messagebox.showinfo("Pin Moved", f"Pin moved for field '{self.fields[self.selected_field_index]['name']}'")
-            self.redraw_fields()
+            index = self.selected_field_index
+            old_pin = self.fields[index]['pin_location'] or [None, None]
+            self.cancel_move_pin()
+            self.perform({'op': 'move_pin', 'index': index, 'x': x, 'y': y},
+                         {'op': 'move_pin', 'index': index, 'x': old_pin[0], 'y': old_pin[1]})
+            messagebox.showinfo("Pin Moved", f"Pin moved for field '{self.fields[index]['name']}'")
+            return
+        
+        if self.adding_control_points:
+            self.add_control_point(x, y)
             return
         
         # Handle normal field creation
@@ -362,16 +642,15 @@ class MapSegmentationTool:
             
         if self.current_field['pin_location'] is None:
             # This is the pin location
-            self.current_field['pin_location'] = [x, y]
+            self.perform({'op': 'pin', 'x': x, 'y': y}, {'op': 'unpin'})
             messagebox.showinfo("Pin Placed", "Pin location set. Continue clicking to add boundary points.")
         else:
+            # Snap the boundary point onto a nearby edge unless Shift is held
+            if self.snap_var.get() and self.edge_map and not event.state & 0x0001:
+                x, y = self.edge_map.snap(x, y, self.image_scale)
+                
             # Add boundary point
-            self.current_points.append([x, y])
-            self.current_field['points'] = self.current_points.copy()
-            # Enable undo button since we now have boundary points
-            self.undo_btn.config(state=tk.NORMAL)
-            
-        self.redraw_fields()
+            self.perform({'op': 'point', 'x': x, 'y': y}, {'op': 'undo_point'})
         
     def finish_field(self):
         if not self.current_field or len(self.current_points) < 3:
@@ -382,9 +661,6 @@ class MapSegmentationTool:
             messagebox.showwarning("Warning", "Please place the pin location first.")
             return
             
-        # Add completed field to list
-        self.fields.append(self.current_field.copy())
-        
         # Print field data in JSON format
         field_data = {
             'fieldname': self.current_field['name'],
@@ -393,149 +669,64 @@ class MapSegmentationTool:
         }
         print(json.dumps(field_data, indent=2))
         
-        # Reset current field
-        self.current_field = None
-        self.current_points = []
-        
-        # Update UI
-        self.finish_field_btn.config(state=tk.DISABLED)
-        self.create_field_btn.config(state=tk.NORMAL)
-        self.undo_btn.config(state=tk.DISABLED)
-        
-        self.update_legend()
-        self.update_field_dropdown()
-        self.redraw_fields()
+        # Add completed field to list
+        self.perform({'op': 'finish_field'}, {'op': 'unfinish_field'})
         
+    @timed('redraw_fields')
     def redraw_fields(self):
         if not self.map_image:
             return
             
-        # Start with original map at current zoom level
-        self.display_image = self.map_image.copy()
-        draw = ImageDraw.Draw(self.display_image, 'RGBA')
+        profiler.count('redraws')
         
-        # Draw completed fields (polygons and lines first)
-        for field in self.fields:
-            self.draw_field_background(draw, field, completed=True)
-            
-        # Draw current field being created (background)
-        if self.current_field:
-            self.draw_field_background(draw, self.current_field, completed=False)
-            
-        # Draw all text and pins on top
-        for field in self.fields:
-            self.draw_field_text(draw, field)
-            
-        # Draw current field text
-        if self.current_field:
-            self.draw_field_text(draw, self.current_field)
+        # Start with original map at current zoom level
+        self.display_image = render_field_overlays(
+            self.map_image, self.fields, self.image_scale,
+            opacity=self.opacity_var.get(),
+            text_size=int(self.text_size_var.get()),
+            current_field=self.current_field
+        )
             
         self.update_canvas()
         
-    def draw_field_background(self, draw, field, completed=False):
-        """Draw the background elements (lines, polygons, points)"""
-        color = field['color']
-        
-        # Convert coordinates to display coordinates using the actual image scale
-        def to_display_coords(point):
-            return (point[0] * self.image_scale, point[1] * self.image_scale)
-            
-        # Draw points and lines
-        if field['points']:
-            display_points = [to_display_coords(p) for p in field['points']]
-            
-            # Draw points with constant size (half of pin size)
-            point_size = 4  # Constant size, half of pin size
-            for point in display_points:
-                draw.ellipse([point[0]-point_size, point[1]-point_size, 
-                            point[0]+point_size, point[1]+point_size], 
-                           fill=color, outline='black')
-                           
-            # Draw lines between points with constant width
-            line_width = 2  # Constant line width
-            if len(display_points) > 1:
-                for i in range(len(display_points) - 1):
-                    draw.line([display_points[i], display_points[i+1]], fill=color, width=line_width)
-                    
-            # If completed, close the shape and fill
-            if completed and len(display_points) > 2:
-                # Close the shape
-                draw.line([display_points[-1], display_points[0]], fill=color, width=line_width)
-                
-                # Fill the polygon
-                opacity = int(255 * (self.opacity_var.get() / 100))
-                fill_color = tuple(list(self.hex_to_rgb(color)) + [opacity])
-                draw.polygon(display_points, fill=fill_color)
-                
-    def draw_field_text(self, draw, field):
-        """Draw the text and pin elements on top"""
-        color = field['color']
-        
-        # Convert coordinates to display coordinates using the actual image scale
-        def to_display_coords(point):
-            return (point[0] * self.image_scale, point[1] * self.image_scale)
-            
-        # Draw pin with constant size (as if fully zoomed out)
-        if field['pin_location']:
-            pin_x, pin_y = to_display_coords(field['pin_location'])
-            pin_size = 8  # Constant size regardless of zoom
-            draw.ellipse([pin_x-pin_size, pin_y-pin_size, pin_x+pin_size, pin_y+pin_size], 
-                        fill=color, outline='black', width=2)
-            
-            # Draw field name with customizable font size and white color
-            try:
-                from PIL import ImageFont
-                font_size = int(self.text_size_var.get())
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except:
-                font = None
-                
-            # Draw text with black outline for better visibility
-            text_x = pin_x + pin_size + 2
-            text_y = pin_y - pin_size
-            
-            # Draw black outline (multiple offset draws)
-            outline_offsets = [(-1, -1), (-1, 1), (1, -1), (1, 1), (-1, 0), (1, 0), (0, -1), (0, 1)]
-            for offset_x, offset_y in outline_offsets:
-                draw.text((text_x + offset_x, text_y + offset_y), field['name'], fill='black', font=font)
-            
-            # Draw white text on top
-            draw.text((text_x, text_y), field['name'], fill='white', font=font)
-                
-    def hex_to_rgb(self, hex_color):
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        
     def update_opacity(self, value=None):
         self.opacity_label.config(text=f"{int(self.opacity_var.get())}%")
         self.redraw_fields()
         
-    def undo_last_point(self):
-        """Remove the last placed boundary point (not the pin)"""
-        if not self.current_field or not self.current_points:
+    def redraw_region(self, boxes):
+        """Redraw only the part of the display image inside the union of display boxes"""
+        if not self.map_image or not self.display_image:
             return
-            
-        # Remove the last boundary point
-        self.current_points.pop()
-        self.current_field['points'] = self.current_points.copy()
+        if boxes:
+            box = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                   max(b[2] for b in boxes), max(b[3] for b in boxes))
+            render_field_region(self.display_image, self.map_image, self.fields, self.image_scale, box,
+                                opacity=self.opacity_var.get(), text_size=int(self.text_size_var.get()),
+                                current_field=self.current_field)
+        self.update_canvas()
         
-        # Disable undo button if no more boundary points
-        if not self.current_points:
-            self.undo_btn.config(state=tk.DISABLED)
+    def delete_field(self):
+        """Delete the selected finished field"""
+        if self.selected_field_index is None:
+            messagebox.showwarning("Warning", "Please select a field first.")
+            return
             
-        # Redraw the field
-        self.redraw_fields()
+        index = self.selected_field_index
+        field = self.fields[index]
+        if not messagebox.askyesno("Delete Field", f"Delete field '{field['name']}'? (Undo brings it back)"):
+            return
+        self.perform({'op': 'delete_field', 'index': index},
+                     {'op': 'insert_field', 'index': index, 'field': copy.deepcopy(field)})
         
     def update_field_dropdown(self):
         """Update the field selection dropdown"""
         field_names = [f"{i}: {field['name']}" for i, field in enumerate(self.fields)]
         self.field_dropdown['values'] = field_names
         
-        # Enable move pin button if fields exist
-        if self.fields:
-            self.move_pin_btn.config(state=tk.NORMAL)
-        else:
-            self.move_pin_btn.config(state=tk.DISABLED)
+        # Enable move pin and delete buttons if fields exist
+        state = tk.NORMAL if self.fields else tk.DISABLED
+        self.move_pin_btn.config(state=state)
+        self.delete_field_btn.config(state=state)
             
     def on_field_selected(self, event=None):
         """Handle field selection from dropdown"""
@@ -545,6 +736,10 @@ class MapSegmentationTool:
             
     def start_move_pin(self):
         """Start pin moving mode"""
+        if self.moving_pin_mode:
+            self.cancel_move_pin()
+            return
+            
         if self.selected_field_index is None:
             messagebox.showwarning("Warning", "Please select a field first.")
             return
@@ -560,74 +755,88 @@ class MapSegmentationTool:
         field_name = self.fields[self.selected_field_index]['name']
         messagebox.showinfo("Move Pin", f"Click on the map to place the new pin location for '{field_name}'.")
         
-    def calculate_field_radius(self, field):
-        """Calculate radius for minimap view using raycast from pin"""
-        if not field['pin_location'] or not field['points'] or len(field['points']) < 3:
-            # Default radius if no valid field
-            default_radius = max(self.map_width, self.map_height) / 20
-            return default_radius
-            
-        pin_x, pin_y = field['pin_location']
-        field_points = field['points']
+    def cancel_move_pin(self):
+        if self.moving_pin_mode:
+            self.moving_pin_mode = False
+            self.move_pin_btn.config(text="Move Pin")
+            self.canvas.config(cursor="crosshair")
         
-        # Add the first point at the end to close the polygon
-        polygon_points = field_points + [field_points[0]]
+    def toggle_control_points(self):
+        """Start or stop control point mode"""
+        if self.adding_control_points:
+            self.adding_control_points = False
+            self.control_point_btn.config(text="Add Control Points")
+            self.canvas.config(cursor="crosshair")
+            return
+            
+        if not self.original_image:
+            messagebox.showwarning("Warning", "Please select a map image first.")
+            return
+            
+        if self.current_field is not None:
+            messagebox.showwarning("Warning", "Please finish creating the current field before adding control points.")
+            return
+            
+        self.adding_control_points = True
+        self.control_point_btn.config(text="Stop Adding Points")
+        self.canvas.config(cursor="target")
+        messagebox.showinfo("Control Points", "Click spots on the map you know the GPS position of, "
+                            "such as gates or fence corners. Spread them out over the whole map.")
         
-        max_distance = 0
-        hit_count = 0
+    def add_control_point(self, x, y):
+        """Ask for the latitude/longitude of a clicked map position"""
+        answer = simpledialog.askstring("Control Point", "Latitude, longitude of this spot (e.g. 44.0582, -121.3153):")
+        if not answer:
+            return
+            
+        try:
+            lat, lon = (float(value) for value in answer.replace(' ', '').split(','))
+        except ValueError:
+            messagebox.showerror("Error", "Enter the position as latitude, longitude")
+            return
+            
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            messagebox.showerror("Error", "Latitude must be within +-90 and longitude within +-180")
+            return
+            
+        undo = self.current_georef_edit()
+        control_points = self.control_points + [{'pixel': [x, y], 'lonlat': [lon, lat]}]
+        self.perform(self.georef_edit(control_points, None, self.meters_per_pixel), undo)
         
-        # Cast 20 rays in different directions
-        import math
-        for i in range(20):
-            angle = (i / 20) * 2 * math.pi
-            dx = math.cos(angle)
-            dy = math.sin(angle)
+    def solve_transform(self):
+        """Fit the pixel <-> lon/lat transform to the control points"""
+        try:
+            georef = solve_georef(self.control_points, self.georef_kind_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Could not georeference the map: {str(e)}")
+            return
             
-            # Find intersection with polygon edges
-            min_distance = float('inf')
+        # The transform measures the map scale, so field areas can be given in acres
+        meters_per_pixel = self.meters_per_pixel
+        if self.map_width and self.map_height:
+            transform = GeoTransform.from_georef(georef)
+            meters_per_pixel = transform.meters_per_pixel(self.map_width / 2, self.map_height / 2)
+        self.perform(self.georef_edit(self.control_points, georef, meters_per_pixel), self.current_georef_edit())
             
-            for j in range(len(polygon_points) - 1):
-                x1, y1 = polygon_points[j]
-                x2, y2 = polygon_points[j + 1]
-                
-                # Line intersection calculation
-                # Ray: pin + t * (dx, dy)
-                # Edge: (x1, y1) to (x2, y2)
-                
-                edge_dx = x2 - x1
-                edge_dy = y2 - y1
-                
-                # Solve: pin_x + t*dx = x1 + s*edge_dx
-                #        pin_y + t*dy = y1 + s*edge_dy
-                
-                denominator = dx * edge_dy - dy * edge_dx
-                if abs(denominator) < 1e-10:  # Parallel lines
-                    continue
-                    
-                t = ((x1 - pin_x) * edge_dy - (y1 - pin_y) * edge_dx) / denominator
-                s = ((x1 - pin_x) * dy - (y1 - pin_y) * dx) / denominator
-                
-                # Check if intersection is valid (on the edge and in ray direction)
-                if t > 0 and 0 <= s <= 1:
-                    distance = t * math.sqrt(dx*dx + dy*dy)
-                    min_distance = min(min_distance, distance)
-            
-            if min_distance != float('inf'):
-                max_distance = max(max_distance, min_distance)
-                hit_count += 1
-        
-        # Check if we got valid hits and reasonable distance
-        map_max_size = max(self.map_width, self.map_height)
-        min_threshold = map_max_size / 100
-        
-        if hit_count == 0 or max_distance < min_threshold:
-            # Use default radius
-            radius = map_max_size / 20
-        else:
-            # Add 10% buffer to the maximum distance
-            radius = max_distance * 1.1
+        scale_text = f"\nMap scale: {self.meters_per_pixel:.3f} m/pixel" if self.meters_per_pixel else ""
+        messagebox.showinfo("Georeferenced", f"Fit error at the control points: {self.georef['rms_error_m']:.2f} m RMS"
+                            f"{scale_text}")
+        
+    def clear_control_points(self):
+        if self.control_points and not messagebox.askyesno("Clear", "Remove all control points and the transform?"):
+            return
             
-        return radius
+        self.perform(self.georef_edit([], None, self.meters_per_pixel), self.current_georef_edit())
+        
+    def update_georef_label(self):
+        count = len(self.control_points)
+        if not count:
+            text = "No control points"
+        elif self.georef:
+            text = f"{count} points, {self.georef['kind']}, {self.georef['rms_error_m']:.2f} m RMS"
+        else:
+            text = f"{count} points, not solved"
+        self.georef_label.config(text=text)
         
     def on_mousewheel(self, event):
         if not self.original_image:
@@ -697,22 +906,32 @@ class MapSegmentationTool:
         self.canvas.config(cursor="crosshair")
         
     def update_legend(self):
-        # Clear existing legend
-        for widget in self.legend_frame_inner.winfo_children():
-            widget.destroy()
-            
-        # Add legend entries
-        for i, field in enumerate(self.fields):
-            frame = ttk.Frame(self.legend_frame_inner)
-            frame.pack(fill=tk.X, pady=2)
-            
-            # Color box
-            color_canvas = tk.Canvas(frame, width=20, height=20, bg=field['color'])
-            color_canvas.pack(side=tk.LEFT, padx=(0, 5))
-            
-            # Field name
-            ttk.Label(frame, text=field['name']).pack(side=tk.LEFT)
+        self.legend.set_rows((field['color'], field['name']) for field in self.fields)
+        
+    def build_map_data(self):
+        """Fields and map settings in the MapData.json shape"""
+        map_data = {
+            'map_size': {'width': self.map_width, 'height': self.map_height},
+            'fields': []
+        }
+        if self.meters_per_pixel:
+            map_data['meters_per_pixel'] = self.meters_per_pixel
+        if self.georef:
+            map_data['georef'] = self.georef
+        
+        for field in self.fields:
+            field_data = {
+                'fieldname': field['name'],
+                'color': field['color'],
+                'pinpoint': field['pin_location'],
+                'points': field['points'],
+                'radius': calculate_field_radius(field['pin_location'], field['points'],
+                                                 self.map_width, self.map_height)
+            }
+            map_data['fields'].append(field_data)
             
+        return map_data
+        
     def save_and_exit(self):
         if not self.output_location:
             messagebox.showwarning("Warning", "Please select an output location first.")
@@ -723,31 +942,27 @@ class MapSegmentationTool:
             return
             
         try:
-            # Prepare data for JSON
-            map_data = {
-                'map_size': {'width': self.map_width, 'height': self.map_height},
-                'fields': []
-            }
-            
-            for field in self.fields:
-                field_data = {
-                    'fieldname': field['name'],
-                    'color': field['color'],
-                    'pinpoint': field['pin_location'],
-                    'points': field['points'],
-                    'radius': self.calculate_field_radius(field)
-                }
-                map_data['fields'].append(field_data)
-                
-            # Save JSON data
+            # Save JSON data with precomputed field metrics
             json_path = os.path.join(self.output_location, 'Mapdata.json')
-            with open(json_path, 'w') as f:
-                json.dump(map_data, f, indent=2)
+            write_map_data(annotate_map_data(self.build_map_data()), json_path)
                 
-            # Save map image (without legend)
-            if self.display_image:
+            # Save map image (without legend) at the original resolution, independent of zoom
+            map_path = ""
+            if self.original_image:
                 map_path = os.path.join(self.output_location, 'map.png')
-                self.display_image.save(map_path)
+                self.root.config(cursor="watch")
+                self.root.update_idletasks()
+                try:
+                    render_map_file(self.original_image, self.fields, map_path,
+                                    opacity=self.opacity_var.get(),
+                                    text_size=int(self.text_size_var.get()))
+                finally:
+                    self.root.config(cursor="")
+                
+            # Everything in the journal is in MapData now
+            if self.journal:
+                self.journal.discard()
+                self.journal = None
                 
             messagebox.showinfo("Success", f"Data saved to:\n{json_path}\n{map_path}")
             self.root.quit()
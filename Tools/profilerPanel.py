@@ -0,0 +1,70 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+from mapProfiler import profiler
+
+# How often the panel refreshes its numbers
+REFRESH_MS = 500
+
+
+class ProfilerPanel:
+    """Debug window showing live stage timings and counters from the shared profiler"""
+    def __init__(self, root):
+        self.window = tk.Toplevel(root)
+        self.window.title("Debug Stats")
+        self.window.geometry("620x480")
+
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill=tk.X, padx=10, pady=(10, 5))
+
+        ttk.Button(button_frame, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=(0, 10))
+        self.profile_btn = ttk.Button(button_frame, text="Start cProfile", command=self.toggle_profile)
+        self.profile_btn.pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Dump JSON", command=self.dump_json).pack(side=tk.LEFT)
+
+        self.text = tk.Text(self.window, font=("Courier", 9), wrap=tk.NONE)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+
+        if profiler.profiling:
+            self.profile_btn.config(text="Stop cProfile")
+
+        self.refresh()
+
+    def refresh(self):
+        if not self.window.winfo_exists():
+            return
+
+        lines = profiler.summary_lines()
+        if profiler.profile_text:
+            lines += ["", profiler.profile_text]
+
+        # Keep the scroll position while updating
+        scroll_position = self.text.yview()[0]
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, "\n".join(lines))
+        self.text.yview_moveto(scroll_position)
+
+        self.window.after(REFRESH_MS, self.refresh)
+
+    def reset(self):
+        profiler.reset()
+
+    def toggle_profile(self):
+        if profiler.profiling:
+            profiler.stop_profile()
+            self.profile_btn.config(text="Start cProfile")
+        else:
+            profiler.start_profile()
+            self.profile_btn.config(text="Stop cProfile")
+
+    def dump_json(self):
+        file_path = filedialog.asksaveasfilename(
+            title="Save Debug Stats",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")]
+        )
+        if file_path:
+            try:
+                profiler.dump_json(file_path)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save stats: {str(e)}")
@@ -0,0 +1,286 @@
+# One review table for every unusual cow tag of an import, instead of a dialog per tag.
+#
+# Each row is a tag with its file count, the decision and the roster's closest tags.
+# Rows can be multi-selected and decided together:
+#
+#   k / Keep       keep the tag as parsed
+#   r / Rename     file the photos under another tag (asked once for all selected rows)
+#   u / Suggested  file them under the roster's closest tag
+#   s / Skip       don't copy the photos
+#   Ctrl+A         select all rows, Enter applies, Escape cancels (everything skipped)
+#
+# The selected tag's photos are previewed. Thumbnails are decoded in draft mode on a
+# background thread, first for the selected tag and then ahead for the rest, and
+# handed to Tk through a queue (Tk may only be used from its own thread).
+
+import os
+import queue
+import threading
+import tkinter as tk
+from tkinter import messagebox, simpledialog, ttk
+
+from PIL import Image, ImageTk
+
+# Thumbnails shown for the selected tag, and their size
+PREVIEW_COUNT = 6
+PREVIEW_SIZE = 160
+
+# How often finished thumbnails are picked up from the loader thread
+PREVIEW_POLL_MS = 50
+
+DECISION_LABELS = {None: "", 'keep': "Keep", 'rename': "Rename", 'skip': "Skip"}
+
+
+class TagReviewTable:
+    def __init__(self, root, source_folder, cow_tags, unusual_names, roster=None):
+        self.root = root
+        self.source_folder = source_folder
+        self.cow_tags = cow_tags
+        self.tags = list(unusual_names)
+        self.suggested = {tag: roster.suggestions(tag) if roster else [] for tag in self.tags}
+        self.decisions = {tag: (None, None) for tag in self.tags}  # tag -> (decision, new tag)
+        self.result = None
+
+        self.thumbnails = {}  # file path -> PIL thumbnail (None if unreadable)
+        self.photo_images = []  # Keeps the shown PhotoImages alive
+        self.wanted = queue.Queue()
+        self.loaded = queue.Queue()
+        self.stopping = threading.Event()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Review {len(self.tags)} Unusual Cow Tags")
+        self.window.geometry("1000x640")
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        table_frame = ttk.Frame(self.window)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        columns = ('files', 'decision', 'new_tag', 'suggested')
+        self.tree = ttk.Treeview(table_frame, columns=columns, selectmode='extended')
+        self.tree.heading('#0', text="Tag")
+        self.tree.heading('files', text="Files")
+        self.tree.heading('decision', text="Decision")
+        self.tree.heading('new_tag', text="File Under")
+        self.tree.heading('suggested', text="Roster Suggestions")
+        self.tree.column('#0', width=140)
+        self.tree.column('files', width=60, anchor=tk.E)
+        self.tree.column('decision', width=90)
+        self.tree.column('new_tag', width=120)
+        self.tree.column('suggested', width=300)
+
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        for tag in self.tags:
+            self.tree.insert('', tk.END, iid=tag, text=tag, values=self.row_values(tag))
+
+        preview_frame = ttk.LabelFrame(self.window, text="Photos")
+        preview_frame.pack(fill=tk.X, padx=10, pady=5)
+        self.preview_label = ttk.Label(preview_frame, text="Select a tag to preview its photos")
+        self.preview_label.pack(anchor=tk.W, padx=5)
+        self.preview_row = ttk.Frame(preview_frame, height=PREVIEW_SIZE)
+        self.preview_row.pack(fill=tk.X, padx=5, pady=5)
+
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
+        ttk.Button(button_frame, text="Keep (K)", command=self.keep_selected).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Rename (R)", command=self.rename_selected).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Use Suggestion (U)",
+                   command=self.suggest_selected).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Skip (S)", command=self.skip_selected).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side=tk.RIGHT)
+        ttk.Button(button_frame, text="Apply", command=self.apply).pack(side=tk.RIGHT, padx=(0, 10))
+        self.status_label = ttk.Label(button_frame, text="")
+        self.status_label.pack(side=tk.RIGHT, padx=(0, 20))
+
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self.show_preview())
+        for key, command in (('k', self.keep_selected), ('r', self.rename_selected),
+                             ('u', self.suggest_selected), ('s', self.skip_selected)):
+            self.tree.bind(f"<KeyPress-{key}>", lambda e, command=command: command())
+            self.tree.bind(f"<KeyPress-{key.upper()}>", lambda e, command=command: command())
+        self.tree.bind("<Control-a>", lambda e: self.tree.selection_set(self.tags) or "break")
+        self.window.bind("<Return>", lambda e: self.apply())
+        self.window.bind("<Escape>", lambda e: self.cancel())
+
+        # Preload the first photo of every tag, the selected tag's photos jump the queue
+        preload = [path for tag in self.tags for path in self.tag_paths(tag)[:1]]
+        threading.Thread(target=self.load_thumbnails, args=(preload,), daemon=True).start()
+
+        if self.tags:
+            self.tree.selection_set(self.tags[0])
+            self.tree.focus(self.tags[0])
+        self.tree.focus_set()
+        self.update_status()
+        self.poll_thumbnails()
+
+    def tag_paths(self, tag):
+        return [os.path.join(self.source_folder, filename) for filename in self.cow_tags.get(tag, [])]
+
+    def row_values(self, tag):
+        decision, new_tag = self.decisions[tag]
+        return (len(self.cow_tags.get(tag, [])), DECISION_LABELS[decision], new_tag or "",
+                ", ".join(self.suggested[tag]))
+
+    def decide(self, tags, decision, new_tag=None):
+        for tag in tags:
+            if decision == 'keep':
+                self.decisions[tag] = ('keep', tag)
+            elif decision == 'rename':
+                self.decisions[tag] = ('rename', new_tag)
+            else:
+                self.decisions[tag] = ('skip', None)
+            self.tree.item(tag, values=self.row_values(tag))
+        self.update_status()
+        self.select_next(tags)
+
+    def select_next(self, decided_tags):
+        """Move on to the row after the last decided one"""
+        last_index = max(self.tags.index(tag) for tag in decided_tags)
+        if last_index + 1 < len(self.tags):
+            next_tag = self.tags[last_index + 1]
+            self.tree.selection_set(next_tag)
+            self.tree.focus(next_tag)
+            self.tree.see(next_tag)
+
+    def keep_selected(self):
+        selected = self.tree.selection()
+        if selected:
+            self.decide(selected, 'keep')
+
+    def skip_selected(self):
+        selected = self.tree.selection()
+        if selected:
+            self.decide(selected, 'skip')
+
+    def rename_selected(self):
+        selected = self.tree.selection()
+        if not selected:
+            return
+        initial = self.suggested[selected[0]][0] if len(selected) == 1 and self.suggested[selected[0]] else ""
+        title = f"'{selected[0]}'" if len(selected) == 1 else f"{len(selected)} tags"
+        new_name = simpledialog.askstring("Rename Cow Tag", f"File {title} under cow tag:",
+                                          initialvalue=initial, parent=self.window)
+        if new_name and new_name.strip():
+            self.decide(selected, 'rename', new_name.strip().upper())
+
+    def suggest_selected(self):
+        """Rename each selected tag to its closest roster tag, rows without one are left alone"""
+        selected = [tag for tag in self.tree.selection() if self.suggested[tag]]
+        for tag in selected:
+            self.decisions[tag] = ('rename', self.suggested[tag][0])
+            self.tree.item(tag, values=self.row_values(tag))
+        if selected:
+            self.update_status()
+            self.select_next(selected)
+
+    def update_status(self):
+        undecided = sum(1 for decision, _ in self.decisions.values() if decision is None)
+        self.status_label.config(text=f"{undecided} of {len(self.tags)} undecided")
+
+    def show_preview(self):
+        selected = self.tree.selection()
+        if not selected:
+            return
+        tag = selected[0]
+        paths = self.tag_paths(tag)
+        extra = f" (showing {PREVIEW_COUNT})" if len(paths) > PREVIEW_COUNT else ""
+        self.preview_label.config(text=f"{tag}: {len(paths)} files{extra}")
+        self.wanted.put(paths[:PREVIEW_COUNT])
+        self.draw_preview()
+
+    def draw_preview(self):
+        for widget in self.preview_row.winfo_children():
+            widget.destroy()
+        self.photo_images = []
+
+        selected = self.tree.selection()
+        if not selected:
+            return
+        for path in self.tag_paths(selected[0])[:PREVIEW_COUNT]:
+            cell = ttk.Frame(self.preview_row)
+            cell.pack(side=tk.LEFT, padx=(0, 8))
+            if path in self.thumbnails and self.thumbnails[path] is not None:
+                photo_image = ImageTk.PhotoImage(self.thumbnails[path])
+                self.photo_images.append(photo_image)
+                ttk.Label(cell, image=photo_image).pack()
+            else:
+                text = "Loading..." if path not in self.thumbnails else "Unreadable"
+                ttk.Label(cell, text=text, width=20, anchor=tk.CENTER).pack(ipady=PREVIEW_SIZE // 3)
+            ttk.Label(cell, text=os.path.basename(path)[:28]).pack()
+
+    def load_thumbnails(self, preload):
+        """Background thread: decode the selected tag's thumbnails, then keep preloading"""
+        pending = list(preload)
+        while not self.stopping.is_set():
+            try:
+                request = self.wanted.get(timeout=0.2 if not pending else 0)
+                # Only the latest selection matters when rows are skipped through quickly
+                while not self.wanted.empty():
+                    request = self.wanted.get_nowait()
+                pending = request + pending
+            except queue.Empty:
+                pass
+            if not pending:
+                continue
+
+            path = pending.pop(0)
+            if path in self.thumbnails:
+                continue
+            try:
+                with Image.open(path) as image:
+                    image.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))
+                    thumbnail = image.convert('RGB')
+                    thumbnail.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+            except Exception:
+                thumbnail = None
+            self.thumbnails[path] = thumbnail
+            self.loaded.put(path)
+
+    def poll_thumbnails(self):
+        if not self.window.winfo_exists():
+            return
+
+        selected = self.tree.selection()
+        shown = set(self.tag_paths(selected[0])[:PREVIEW_COUNT]) if selected else set()
+        refresh = False
+        while True:
+            try:
+                refresh |= self.loaded.get_nowait() in shown
+            except queue.Empty:
+                break
+        if refresh:
+            self.draw_preview()
+
+        self.window.after(PREVIEW_POLL_MS, self.poll_thumbnails)
+
+    def decisions_dict(self):
+        """{old tag: new tag, or None to skip}, undecided tags are skipped"""
+        return {tag: new_tag if decision in ('keep', 'rename') else None
+                for tag, (decision, new_tag) in self.decisions.items()}
+
+    def apply(self):
+        undecided = sum(1 for decision, _ in self.decisions.values() if decision is None)
+        if undecided and not messagebox.askyesno(
+                "Undecided Tags", f"{undecided} tags have no decision, their photos will be skipped.\n\nApply anyway?",
+                parent=self.window):
+            return
+        self.result = self.decisions_dict()
+        self.close()
+
+    def cancel(self):
+        if not messagebox.askyesno("Cancel Review", "Skip the photos of every unusual tag?", parent=self.window):
+            return
+        self.result = {tag: None for tag in self.tags}
+        self.close()
+
+    def close(self):
+        self.stopping.set()
+        self.window.destroy()
+
+    def run(self):
+        """Show the table until it is applied or cancelled, returns the decisions"""
+        self.window.grab_set()
+        self.root.wait_window(self.window)
+        return self.result if self.result is not None else {tag: None for tag in self.tags}
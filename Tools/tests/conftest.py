@@ -0,0 +1,10 @@
+# Unit tests for the Tools package, run with
+#
+#   python -m pytest Tools/tests
+#
+# Speed is checked separately by the benchmarks in Tools/benchmarks.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import os
+
+from PIL import Image
+
+from mapCache import open_map_image, prune_cache
+
+
+def make_map(path, color):
+    Image.new('RGB', (64, 48), color).save(path)
+
+
+def test_cached_image_matches_source(tmp_path):
+    source = tmp_path / 'map.png'
+    make_map(source, (10, 20, 30))
+
+    cached = open_map_image(str(source), str(tmp_path / 'cache'))
+    again = open_map_image(str(source), str(tmp_path / 'cache'))
+
+    assert cached.size == (64, 48)
+    assert cached.getpixel((5, 5)) == (10, 20, 30, 255)
+    assert again.tobytes() == cached.tobytes()
+
+
+def test_prune_deletes_least_recently_used(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    for i, key in enumerate(['old', 'mid', 'new']):
+        os.makedirs(cache_dir, exist_ok=True)
+        (cache_dir / f"{key}.raw").write_bytes(b'x' * 100)
+        (cache_dir / f"{key}.json").write_text('{}')
+        os.utime(cache_dir / f"{key}.raw", (1000 + i, 1000 + i))
+
+    assert prune_cache(str(cache_dir), 200, keep=('old',)) == 1
+    assert sorted(os.listdir(cache_dir)) == ['new.json', 'new.raw', 'old.json', 'old.raw']
+
+
+def test_opening_a_new_map_prunes_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('PHOTOMAP_CACHE_MAX_MB', '0')
+    cache_dir = str(tmp_path / 'cache')
+    for i, color in enumerate(['red', 'blue']):
+        make_map(tmp_path / f"map{i}.png", color)
+        open_map_image(str(tmp_path / f"map{i}.png"), cache_dir)
+
+    # Only the entry just written survives a zero limit
+    assert len([name for name in os.listdir(cache_dir) if name.endswith('.raw')]) == 1
@@ -0,0 +1,106 @@
+import math
+
+import pytest
+
+from mapGeometry import calculate_field_radius
+
+MAP_WIDTH = 4000
+MAP_HEIGHT = 3000
+
+
+def raycast_field_radius(pinpoint, field_points, map_width, map_height):
+    """The old calculate_field_radius: longest of 20 rays from the pin to the nearest edge"""
+    map_max_size = max(map_width, map_height)
+    if not pinpoint or not field_points or len(field_points) < 3:
+        return map_max_size / 20
+
+    pin_x, pin_y = pinpoint
+    polygon_points = field_points + [field_points[0]]
+    max_distance = 0
+    hit_count = 0
+    for i in range(20):
+        angle = (i / 20) * 2 * math.pi
+        dx = math.cos(angle)
+        dy = math.sin(angle)
+        min_distance = float('inf')
+        for j in range(len(polygon_points) - 1):
+            x1, y1 = polygon_points[j]
+            x2, y2 = polygon_points[j + 1]
+            edge_dx = x2 - x1
+            edge_dy = y2 - y1
+            denominator = dx * edge_dy - dy * edge_dx
+            if abs(denominator) < 1e-10:
+                continue
+            t = ((x1 - pin_x) * edge_dy - (y1 - pin_y) * edge_dx) / denominator
+            s = ((x1 - pin_x) * dy - (y1 - pin_y) * dx) / denominator
+            if t > 0 and 0 <= s <= 1:
+                min_distance = min(min_distance, t)
+        if min_distance != float('inf'):
+            max_distance = max(max_distance, min_distance)
+            hit_count += 1
+
+    if hit_count == 0 or max_distance < map_max_size / 100:
+        return map_max_size / 20
+    return max_distance * 1.1
+
+
+def regular_polygon(center_x, center_y, radius, count, stretch=1.0):
+    return [[center_x + radius * stretch * math.cos(2 * math.pi * i / count),
+             center_y + radius * math.sin(2 * math.pi * i / count)] for i in range(count)]
+
+
+FIELDS = {
+    'square': ([500, 500], [[400, 400], [600, 400], [600, 600], [400, 600]]),
+    'off center pin': ([450, 420], [[400, 400], [600, 400], [600, 600], [400, 600]]),
+    'circle': ([1000, 1000], regular_polygon(1000, 1000, 300, 60)),
+    'ellipse': ([2000, 1500], regular_polygon(2000, 1500, 200, 48, stretch=3.0)),
+    # Long and narrow at an angle that falls between the old rays
+    'narrow strip': ([1500, 1500], [[1500 + 900 * math.cos(0.16) + dx, 1500 + 900 * math.sin(0.16) + dy]
+                                    for dx, dy in ((0, -8), (0, 8))] +
+                     [[1500 - 900 * math.cos(0.16) + dx, 1500 - 900 * math.sin(0.16) + dy]
+                      for dx, dy in ((0, 8), (0, -8))]),
+    'horseshoe': ([1200, 800], [[1000, 600], [1400, 600], [1400, 1000], [1300, 1000], [1300, 700],
+                                [1100, 700], [1100, 1000], [1000, 1000]]),
+}
+
+
+@pytest.mark.parametrize('name', FIELDS)
+def test_radius_contains_every_vertex(name):
+    pinpoint, points = FIELDS[name]
+    radius = calculate_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT)
+    farthest = max(math.hypot(x - pinpoint[0], y - pinpoint[1]) for x, y in points)
+    assert radius == pytest.approx(farthest * 1.1)
+
+
+@pytest.mark.parametrize('name', FIELDS)
+def test_radius_never_smaller_than_raycast(name):
+    pinpoint, points = FIELDS[name]
+    radius = calculate_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT)
+    assert radius >= raycast_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT) - 1e-9
+
+
+def test_radius_matches_raycast_on_round_field():
+    # Where the old rays reach the farthest points the two agree
+    pinpoint, points = FIELDS['circle']
+    radius = calculate_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT)
+    assert radius == pytest.approx(raycast_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT), rel=0.01)
+
+
+def test_radius_of_narrow_strip_reaches_its_ends():
+    pinpoint, points = FIELDS['narrow strip']
+    radius = calculate_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT)
+    assert radius >= 900 * 1.1
+    assert raycast_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT) < 900
+
+
+@pytest.mark.parametrize('pinpoint, points', [
+    (None, [[0, 0], [10, 0], [10, 10]]),
+    ([5, 5], []),
+    ([5, 5], [[0, 0], [10, 0]]),
+    # Smaller than a hundredth of the map
+    ([5, 5], [[0, 0], [10, 0], [10, 10], [0, 10]]),
+])
+def test_radius_defaults_like_raycast(pinpoint, points):
+    radius = calculate_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT)
+    assert radius == MAP_WIDTH / 20
+    assert radius == raycast_field_radius(pinpoint, points, MAP_WIDTH, MAP_HEIGHT)
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+import mapTiles
+from mapTiles import export_tiles, halve_level
+
+
+def random_image(mode, size):
+    pixels = np.random.RandomState(0).randint(0, 255, (size[1], size[0], 4), dtype=np.uint8)
+    return Image.fromarray(pixels, 'RGBA').convert(mode)
+
+
+def test_halve_level_matches_converting_first(monkeypatch):
+    # Small strips so the odd-sized image is split into several of them
+    monkeypatch.setattr(mapTiles, 'HALVE_STRIP_HEIGHT', 64)
+    for mode in ('RGB', 'RGBA', 'L', 'P'):
+        image = random_image(mode, (301, 203))
+        assert halve_level(image).tobytes() == image.convert('RGB').reduce(2).tobytes()
+
+
+def test_export_tiles_writes_every_level(tmp_path):
+    manifest = export_tiles(random_image('RGBA', (600, 300)), str(tmp_path), 'jpeg')
+
+    assert manifest['max_zoom'] == 2
+    assert manifest['levels']['1'] == {'width': 300, 'height': 150, 'columns': 2, 'rows': 1}
+    for z, level in manifest['levels'].items():
+        for x in range(level['columns']):
+            for y in range(level['rows']):
+                with Image.open(os.path.join(tmp_path, z, str(x), f"{y}.jpg")) as tile:
+                    assert tile.size == (256, 256) and tile.mode == 'RGB'
@@ -0,0 +1,76 @@
+from PIL import Image
+
+from photoIngest import rewrite_jpeg_metadata, slim_exif
+
+DATE_TIME_ORIGINAL = 0x9003
+EXIF_IFD_TAG = 0x8769
+
+
+def jpeg_segments(path):
+    """(marker, payload start) of every segment before the scan"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    segments = []
+    position = 2
+    while data[position + 1] != 0xDA:
+        length = int.from_bytes(data[position + 2:position + 4], 'big')
+        segments.append((data[position + 1], data[position + 4:position + 2 + length]))
+        position += 2 + length
+    return segments
+
+
+def make_cmyk_jpeg(path):
+    """CMYK JPEG the way Photoshop-style tools write them, with an Adobe APP14 segment and EXIF"""
+    image = Image.new('CMYK', (32, 24))
+    for x in range(32):
+        for y in range(24):
+            image.putpixel((x, y), (x * 8, y * 10, 255 - x * 8, (x + y) * 4))
+    exif = Image.Exif()
+    exif.get_ifd(EXIF_IFD_TAG)[DATE_TIME_ORIGINAL] = '2026:05:04 10:11:12'
+    exif[0x010F] = 'Camera maker that gets dropped'
+    image.save(path, 'JPEG', quality=95, exif=exif.tobytes())
+
+
+def test_rewrite_keeps_adobe_segment(tmp_path):
+    source = str(tmp_path / 'cmyk.jpg')
+    destination = str(tmp_path / 'out.jpg')
+    make_cmyk_jpeg(source)
+
+    adobe = [payload for marker, payload in jpeg_segments(source) if marker == 0xEE]
+    assert adobe and adobe[0].startswith(b'Adobe')
+
+    with Image.open(source) as image:
+        exif_bytes = slim_exif(image.getexif())
+    rewrite_jpeg_metadata(source, destination, exif_bytes)
+
+    assert [payload for marker, payload in jpeg_segments(destination) if marker == 0xEE] == adobe
+
+
+def make_ycck_jpeg(path):
+    """The CMYK JPEG with its Adobe transform flag set to YCCK, which only the APP14 segment says"""
+    make_cmyk_jpeg(path)
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    position = data.index(b'\xff\xee')
+    # Marker, length, "Adobe", version, flags0 and flags1 come before the transform byte
+    data[position + 15] = 2
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_rewrite_leaves_ycck_pixels_unchanged(tmp_path):
+    source = str(tmp_path / 'ycck.jpg')
+    destination = str(tmp_path / 'out.jpg')
+    make_ycck_jpeg(source)
+
+    with Image.open(source) as image:
+        exif_bytes = slim_exif(image.getexif())
+        original = image.convert('RGB').tobytes()
+    rewrite_jpeg_metadata(source, destination, exif_bytes)
+
+    with Image.open(destination) as image:
+        assert image.mode == 'CMYK'
+        assert image.convert('RGB').tobytes() == original
+        exif = image.getexif()
+        assert exif.get_ifd(EXIF_IFD_TAG)[DATE_TIME_ORIGINAL] == '2026:05:04 10:11:12'
+        assert 0x010F not in exif
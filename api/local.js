@@ -4,6 +4,7 @@ const path = require('path');
 const multer = require('multer');
 const { param } = require('express-validator');
 const sharp = require('sharp');
+const { findField } = require('./mapFields');
 require('dotenv').config();
 
 /**
@@ -232,6 +233,35 @@ class LocalFileOperations {
         return this.parseDateFromFilename(filename);
     }
 
+    /**
+     * Best scored image from the cow folder's photoScores.json, or null if there is none
+     * or a newer photo was added since it was picked (beyond the window it was picked in)
+     * @param {string} cowDir - Cow photo folder
+     * @param {string} imageType - 'headshot' or 'bodyshot'
+     * @param {Array} imagesWithDates - { filename, filePath, date }, newest first
+     */
+    async getBestScoredImage(cowDir, imageType, imagesWithDates) {
+        const fs = require('fs').promises;
+
+        let scores;
+        try {
+            scores = JSON.parse(await fs.readFile(path.join(cowDir, 'photoScores.json'), 'utf8'));
+        } catch (error) {
+            return null;  // Not scored (yet)
+        }
+
+        const view = imageType === 'headshot' ? 'HEAD' : 'BODY';
+        const bestName = scores.best && scores.best[view];
+        const best = imagesWithDates.find(image => image.filename === bestName);
+        const newest = imagesWithDates[0];
+        if (!best || !best.date || !newest.date) {
+            return null;
+        }
+
+        const windowMs = (scores.best_window_days || 0) * 24 * 60 * 60 * 1000;
+        return newest.date - best.date <= windowMs ? best : null;
+    }
+
     /**
      * Get the nth most recent image file (sorted by EXIF date, then filename date)
      * @param {Object} params - { cowTag, imageType, n }
@@ -299,8 +329,12 @@ class LocalFileOperations {
                 };
             }
 
-            // Get the nth image (1-indexed)
-            const targetImage = imagesWithDates[n - 1];
+            // Get the nth image (1-indexed). The latest one is swapped for the sharpest
+            // recent shot when Tools/photoQuality.py has scored the folder
+            let targetImage = imagesWithDates[n - 1];
+            if (n === 1) {
+                targetImage = await this.getBestScoredImage(cowDir, imageType, imagesWithDates) || targetImage;
+            }
             const fileBuffer = await fs.readFile(targetImage.filePath);
             const stats = await fs.stat(targetImage.filePath);
 
@@ -974,11 +1008,16 @@ class LocalFileOperations {
                 fieldData = JSON.parse(mapDataContent);
 
                 if (pastureName && fieldData.fields) {
-                    const field = fieldData.fields.find(f =>
-                        f.fieldname.toLowerCase() === pastureName.toLowerCase()
-                    );
+                    // pinpoint_normalized is precomputed by the map tools;
+                    // fall back to pinpoint for MapData.json files saved before it existed
+                    const field = findField(fieldData, pastureName);
 
-                    if (field && field.pinpoint && fieldData.map_size) {
+                    if (field && field.pinpoint_normalized) {
+                        normalizedCoordinates = {
+                            x: field.pinpoint_normalized[0],
+                            y: field.pinpoint_normalized[1]
+                        };
+                    } else if (field && field.pinpoint && fieldData.map_size) {
                         normalizedCoordinates = {
                             x: field.pinpoint[0] / fieldData.map_size.width,
                             y: field.pinpoint[1] / fieldData.map_size.height
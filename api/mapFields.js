@@ -0,0 +1,26 @@
+/**
+ * Field lookups on a parsed MapData.json
+ * Kept free of other requires so it can be tested with `node --test`
+ */
+
+/**
+ * Find a field by name (case-insensitive), or undefined
+ * field_index is precomputed by the map tools, but is only trusted when the field
+ * it points at has that name; MapData.json files saved before it existed, or whose
+ * fields were edited without rebuilding it, fall back to a search
+ */
+function findField(fieldData, name) {
+    const fields = fieldData.fields || [];
+    const key = name.toLowerCase();
+
+    // Own keys only, so names like "constructor" don't hit Object.prototype
+    const fieldIndex = fieldData.field_index;
+    const index = fieldIndex && Object.hasOwn(fieldIndex, key) ? fieldIndex[key] : undefined;
+    if (Number.isInteger(index) && fields[index]?.fieldname?.toLowerCase() === key) {
+        return fields[index];
+    }
+
+    return fields.find(f => f.fieldname?.toLowerCase() === key);
+}
+
+module.exports = { findField };
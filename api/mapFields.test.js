@@ -0,0 +1,31 @@
+const test = require('node:test');
+const assert = require('node:assert');
+const { findField } = require('./mapFields');
+
+const fields = [
+    { fieldname: 'North' },
+    { fieldname: 'South Pasture' },
+    { fieldname: 'Creek' },
+];
+
+test('uses field_index when it points at the named field', () => {
+    const fieldData = { fields, field_index: { north: 0, 'south pasture': 1, creek: 2 } };
+    assert.strictEqual(findField(fieldData, 'South PASTURE'), fields[1]);
+});
+
+test('falls back to a search when field_index is stale', () => {
+    // Fields reordered after the index was built
+    const fieldData = { fields, field_index: { north: 2, creek: 0, 'south pasture': 7 } };
+    assert.strictEqual(findField(fieldData, 'north'), fields[0]);
+    assert.strictEqual(findField(fieldData, 'Creek'), fields[2]);
+    assert.strictEqual(findField(fieldData, 'south pasture'), fields[1]);
+});
+
+test('works without field_index', () => {
+    assert.strictEqual(findField({ fields }, 'creek'), fields[2]);
+});
+
+test('ignores Object.prototype names', () => {
+    assert.strictEqual(findField({ fields, field_index: {} }, 'constructor'), undefined);
+    assert.strictEqual(findField({ fields, field_index: {} }, 'missing'), undefined);
+});